@@ -1,5 +1,6 @@
 import functools
 import logging
+from django.http.response import HttpResponseBase
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import APIException
@@ -23,6 +24,10 @@ def standard_response(success_message=None):
         def wrapper(self, request, *args, **kwargs):
             # 获取原始响应
             response = func(self, request, *args, **kwargs)
+
+            # 文件等非 DRF 响应（如流式导出）原样返回
+            if isinstance(response, HttpResponseBase) and not isinstance(response, Response):
+                return response
             
             # 如果已经是标准格式，直接返回
             if isinstance(response, Response) and isinstance(response.data, dict) and 'data' in response.data and 'message' in response.data:
@@ -47,7 +52,8 @@ def standard_response(success_message=None):
             if isinstance(response, Response):
                 data = response.data
                 status_code = response.status_code
-                headers = response._headers if hasattr(response, '_headers') else {}
+                # Content-Type 由渲染时决定，其余头部（如 ETag）保留到标准响应
+                headers = {name: value for name, value in response.items() if name.lower() != 'content-type'}
             else:
                 data = response
                 status_code = status.HTTP_200_OK
@@ -56,6 +62,9 @@ def standard_response(success_message=None):
             # 如果是 204 状态码，直接返回空响应
             if status_code == status.HTTP_204_NO_CONTENT:
                 return Response(status=status.HTTP_204_NO_CONTENT)
+            # 304 没有响应体，原样返回
+            if status_code == status.HTTP_304_NOT_MODIFIED:
+                return response
                 
             # 创建标准响应
             standardized_response = Response(
@@ -0,0 +1,14 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class IgnoreFormatContentNegotiation(DefaultContentNegotiation):
+    """
+    不处理 format 查询参数的内容协商
+
+    DRF 默认把 ?format= 当作渲染器后缀，找不到对应渲染器时返回 404；
+    导出接口用 format 选择导出格式，自行返回文件，错误信息仍以 JSON 渲染
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderer = renderers[0]
+        return renderer, renderer.media_type
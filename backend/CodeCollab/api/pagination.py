@@ -0,0 +1,170 @@
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from functools import reduce
+from operator import or_
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination:
+    """
+    键集（游标）分页
+    按 ordering 中的多个字段（如 ('-created_at', '-id')）生成游标，
+    下一页通过 WHERE (created_at, id) < (?, ?) 直接定位，不做 COUNT 和 OFFSET，任意页的代价与第一页相同
+
+    响应格式：{"next": ..., "previous": ..., "results": [...]}
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = '无效的游标'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+
+    # region 游标编解码
+    @staticmethod
+    def _dump_value(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    def encode_cursor(self, values, reverse=False):
+        payload = json.dumps({'v': [self._dump_value(v) for v in values], 'r': reverse})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, model, encoded):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = payload['v']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, values)
+            ]
+            return values, bool(payload.get('r', False))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+    # endregion
+
+    # region 分页
+    def _keyset_condition(self, values, reverse):
+        """构造 (f1, f2, ...) 大于/小于 (v1, v2, ...) 的行比较条件"""
+        conditions = []
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            descending = name.startswith('-')
+            lookup = 'gt' if descending == reverse else 'lt'
+            equal = {self.ordering[i].lstrip('-'): values[i] for i in range(index)}
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': values[index]}))
+        return reduce(or_, conditions)
+
+    @staticmethod
+    def _invert(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        encoded = request.query_params.get(self.cursor_query_param)
+        values, reverse = (None, False)
+        if encoded:
+            values, reverse = self.decode_cursor(queryset.model, encoded)
+
+        ordering = [self._invert(name) for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._keyset_condition(values, reverse))
+
+        # 多取一条用于判断是否还有下一页
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else values is not None
+        return rows
+
+    def _position(self, row):
+        return [getattr(row, name.lstrip('-')) for name in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.page:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self._position(self.page[0]), reverse=True)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+    # endregion
+
+
+class CustomPagination(PageNumberPagination):
+    """
+    自定义分页类
+    默认使用页码分页；请求带 ?pagination=cursor（或 cursor 参数）时切换为键集分页，
+    键集字段取视图的 get_cursor_ordering() 或 cursor_ordering，默认 ('-created_at', '-id')
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    pagination_mode_query_param = 'pagination'
+    default_cursor_ordering = ('-created_at', '-id')
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.pagination_mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def get_cursor_ordering(self, view):
+        if hasattr(view, 'get_cursor_ordering'):
+            return view.get_cursor_ordering()
+        return getattr(view, 'cursor_ordering', self.default_cursor_ordering)
+
+    def get_cursor_page_size(self, request):
+        """page_size 必须是正整数，超过 max_page_size 时取上限，缺省或无效时使用默认值"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_cursor(request):
+            self.keyset = KeysetPagination(self.get_cursor_ordering(view), self.get_cursor_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
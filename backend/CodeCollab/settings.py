@@ -132,6 +132,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "course.middleware.CourseStatusSyncMiddleware",
 ]
 
 # 配置允许的域名
@@ -150,12 +151,16 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "if-none-match",
     "origin",
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
 ]
 
+# 前端读取 ETag，之后以 If-None-Match 获取文件内容
+CORS_EXPOSE_HEADERS = ["etag"]
+
 CORS_ALLOW_METHODS = [
     "DELETE",
     "GET",
@@ -252,3 +257,29 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # 配置外部域名
 EXTERNAL_DOMAIN = os.getenv("EXTERNAL_DOMAIN", "http://localhost:8000")
+
+# 课程码配置
+COURSE_CODE_LENGTH = int(os.getenv("COURSE_CODE_LENGTH", 6))
+COURSE_CODE_ALPHABET = os.getenv("COURSE_CODE_ALPHABET", "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789")
+
+# 课程统计缓存时间（秒），数据变化时数据库中的统计版本号加一，各进程随即改用新的缓存键
+COURSE_STATS_CACHE_TIMEOUT = int(os.getenv("COURSE_STATS_CACHE_TIMEOUT", 300))
+
+# 代码版本后台处理：超过该时间（秒）没有进度的版本视为处理进程已中断，会被重新领取
+CODE_INGESTION_STALE_SECONDS = int(os.getenv("CODE_INGESTION_STALE_SECONDS", 600))
+
+# 缓存：code-diff 保存版本比较结果，按 LRU 淘汰
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "code-diff": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "code-diff",
+        "TIMEOUT": int(os.getenv("CODE_DIFF_CACHE_TIMEOUT", 3600)),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CODE_DIFF_CACHE_MAX_ENTRIES", 2000))},
+    },
+}
+
+# 课程导出后台构建：超过该时间（秒）没有进度的导出视为构建进程已中断，会被重新领取
+COURSE_EXPORT_STALE_SECONDS = int(os.getenv("COURSE_EXPORT_STALE_SECONDS", 600))
@@ -1,5 +1,14 @@
 from rest_framework import permissions
 from rest_framework.exceptions import PermissionDenied, AuthenticationFailed
+from course.models import CourseMembership
+
+
+def is_course_member(user, course_id, group_id=None):
+    """通过课程成员表的 (course, user) 唯一索引判断学生是否在课程（及指定小组）中"""
+    memberships = CourseMembership.objects.filter(course_id=course_id, user_id=user.pk)
+    if group_id is not None:
+        memberships = memberships.filter(group_id=group_id)
+    return memberships.exists()
 
 
 # region 基础权限
@@ -133,7 +142,7 @@ class CanLeaveCourse(permissions.BasePermission):
             return obj.teacher == request.user
         # 学生只能退出自己加入的未结束的课程
         if request.user.role == 'STUDENT':
-            return request.user in obj.students.all()
+            return is_course_member(request.user, obj.pk)
         return False
     
 class CanSeeStudents(permissions.BasePermission):
@@ -147,7 +156,7 @@ class CanSeeStudents(permissions.BasePermission):
             return obj.teacher == request.user
         # 学生可以查看自己加入的课程的学生列表
         if request.user.role == 'STUDENT':
-            return request.user in obj.students.all()
+            return is_course_member(request.user, obj.pk)
         return False
     
 class CanAddSubjectToCourse(permissions.BasePermission):
@@ -173,9 +182,53 @@ class CanSeeSubjects(permissions.BasePermission):
             return obj.teacher == request.user
         # 学生可以查看自己加入的课程的课题列表
         if request.user.role == 'STUDENT':
-            return request.user in obj.students.all()
+            return is_course_member(request.user, obj.pk)
         return False
     
+class CanImportRoster(permissions.BasePermission):
+    """检查用户是否可以批量导入课程名单"""
+    def has_object_permission(self, request, view, obj):
+        # 管理员可以导入任何课程的名单
+        if request.user.role == 'ADMIN':
+            return True
+        # 教师只能导入自己创建的课程的名单
+        if request.user.role == 'TEACHER':
+            return obj.teacher == request.user
+        return False
+
+class CanAutoGroup(permissions.BasePermission):
+    """检查用户是否可以对课程自动分组"""
+    def has_object_permission(self, request, view, obj):
+        # 管理员可以对任何课程自动分组
+        if request.user.role == 'ADMIN':
+            return True
+        # 教师只能对自己创建的课程自动分组
+        if request.user.role == 'TEACHER':
+            return obj.teacher == request.user
+        return False
+
+class CanAllocateSubjects(permissions.BasePermission):
+    """检查用户是否可以按志愿分配课题"""
+    def has_object_permission(self, request, view, obj):
+        # 管理员可以为任何课程分配课题
+        if request.user.role == 'ADMIN':
+            return True
+        # 教师只能为自己创建的课程分配课题
+        if request.user.role == 'TEACHER':
+            return obj.teacher == request.user
+        return False
+
+class CanSeeCourseStats(permissions.BasePermission):
+    """检查用户是否可以查看课程统计"""
+    def has_object_permission(self, request, view, obj):
+        # 管理员可以查看任何课程的统计
+        if request.user.role == 'ADMIN':
+            return True
+        # 教师只能查看自己创建的课程的统计
+        if request.user.role == 'TEACHER':
+            return obj.teacher == request.user
+        return False
+
 class CanDeleteSubjectFromCourse(permissions.BasePermission):
     """检查用户是否可以删除课程课题"""
     def has_object_permission(self, request, view, obj):
@@ -197,10 +250,10 @@ class CanSeeGroupDetail(permissions.BasePermission):
             return True
         # 教师可以查看自己创建的课程的小组
         if request.user.role == 'TEACHER':
-            return obj.course.teacher == request.user
+            return obj.course.teacher_id == request.user.pk
         # 学生可以查看自己加入的小组
         if request.user.role == 'STUDENT':
-            return request.user in obj.students.all()
+            return is_course_member(request.user, obj.course_id, group_id=obj.pk)
         return False
 class CanJoinGroup(permissions.BasePermission):
     """检查用户是否可以加入小组"""
@@ -215,7 +268,7 @@ class CanLeaveGroup(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # 学生可以退出自己加入的小组
         if request.user.role == 'STUDENT':
-            return obj.students.filter(user_id=request.user.user_id).exists()
+            return is_course_member(request.user, obj.course_id, group_id=obj.pk)
         # 老师可以踢出自己课程的所有学生
         elif request.user.role == 'TEACHER':
             return True
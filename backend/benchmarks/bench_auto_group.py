@@ -0,0 +1,77 @@
+"""
+自动分组基准测试：一门课程中大量未分组学生，分别统计预览与正式分组的耗时和查询数
+
+示例：
+    python benchmarks/bench_auto_group.py --students 5000 --min-size 3 --max-size 5
+    # 带约束
+    python benchmarks/bench_auto_group.py --students 5000 --together 200 --apart 200
+"""
+import argparse
+import datetime
+import random
+import time
+from harness import benchmark_database, peak_rss_mb
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--min-size', type=int, default=3)
+    parser.add_argument('--max-size', type=int, default=5)
+    parser.add_argument('--together', type=int, default=0, help='随机生成的两人同组约束数量')
+    parser.add_argument('--apart', type=int, default=0, help='随机生成的两人分开约束数量')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        from accounts.models import User
+        from course.models import Course, Group
+        from course.grouping import form_groups
+
+        teacher = User.objects.create_user(
+            user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+            school='bench', role='TEACHER', password='bench'
+        )
+        students = User.objects.bulk_create([
+            User(user_id=f'bench_{i:05d}', email=f'bench_{i:05d}@example.com', name=f'bench_{i}',
+                 school='bench', role='STUDENT', password='!')
+            for i in range(args.students)
+        ])
+        today = datetime.date.today()
+        course = Course.objects.create(
+            name='bench', teacher=teacher,
+            start_date=today + datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=30),
+            min_group_size=args.min_size, max_group_size=args.max_size,
+        )
+        Course.students.through.objects.bulk_create(
+            [Course.students.through(course_id=course.pk, user_id=s.user_id) for s in students], batch_size=1000
+        )
+
+        rng = random.Random(args.seed)
+        ids = [s.user_id for s in students]
+        pairs = [rng.sample(ids, 2) for _ in range(args.together + args.apart)]
+        options = {'together': pairs[:args.together], 'apart': pairs[args.together:], 'seed': args.seed}
+
+        for dry_run in (True, False):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                report = form_groups(course, dry_run=dry_run, **options)
+                elapsed = time.perf_counter() - started
+            summary = report['summary']
+            print(
+                f"{'dry_run' if dry_run else 'commit '} elapsed={elapsed * 1000:.1f}ms "
+                f"queries={len(context.captured_queries)} placed={summary['placed']} "
+                f"unplaced={summary['unplaced']} new_groups={summary['new_groups']} "
+                f"below_min={summary['below_min_groups']}"
+            )
+
+        sizes = Group.students.through.objects.filter(group__course=course).count()
+        print(f'groups={Group.objects.filter(course=course).count()} memberships={sizes}')
+        print(f'peak_rss={peak_rss_mb():.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
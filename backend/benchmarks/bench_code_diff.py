@@ -0,0 +1,103 @@
+"""
+版本比较基准测试：两个各有 files 个文件、只改动少数文件的版本，
+统计首次与缓存后比较文件列表的延迟，以及获取单个修改文件差异的延迟
+
+示例：
+    python benchmarks/bench_code_diff.py --files 5000 --changed 5 --requests 20
+"""
+import argparse
+import datetime
+import io
+import random
+import time
+import zipfile
+from harness import benchmark_database, latency_summary
+
+
+def make_archive(files, size, changed, seed):
+    """前 changed 个文件的内容随 seed 变化"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for index in range(files):
+            rng = random.Random(index)
+            lines = []
+            while sum(map(len, lines)) < size:
+                lines.append(f'v{rng.getrandbits(64):x} = f{rng.getrandbits(64):x}(a{rng.getrandbits(32):x})\n')
+            if index < changed:
+                lines[len(lines) // 2] = f'changed = {seed}\n'
+            archive.writestr(f'project/pkg_{index % 50}/module_{index}.py', ''.join(lines))
+    return buffer.getvalue()
+
+
+def timed(func, count):
+    latencies, response = [], None
+    for _ in range(count):
+        started = time.perf_counter()
+        response = func()
+        latencies.append(time.perf_counter() - started)
+    return latencies, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--size', type=int, default=2048, help='每个文件的字节数')
+    parser.add_argument('--changed', type=int, default=5, help='两个版本间改动的文件数')
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        import tempfile
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+        from accounts.models import User
+        from course.diffing import diff_cache
+        from course.ingestion import ingest_version
+        from course.models import Course, Group, GroupCodeVersion
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root, ALLOWED_HOSTS=['*']):
+            teacher = User.objects.create(
+                user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+                school='bench', role='TEACHER', password='!'
+            )
+            today = datetime.date.today()
+            course = Course.objects.create(
+                name='bench', teacher=teacher,
+                start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=30),
+            )
+            group = Group.objects.create(course=course, creator=teacher)
+            versions = []
+            for seed in range(2):
+                version = GroupCodeVersion.objects.create(
+                    group=group, version=f'v{seed}',
+                    zip_file=SimpleUploadedFile('code.zip', make_archive(args.files, args.size, args.changed, seed)),
+                )
+                ingest_version(version)
+                versions.append(version)
+
+            client = APIClient()
+            client.force_authenticate(teacher)
+            url = f'/api/v1/groups/{group.id}/versions/{versions[0].id}/diff/{versions[1].id}/'
+
+            def cold():
+                diff_cache().clear()
+                return client.get(url)
+
+            latencies, response = timed(cold, args.requests)
+            data = response.json()['data']
+            print(f'files={args.files} modified={len(data["modified"])} unchanged={data["unchanged"]} '
+                  f'bytes={len(response.content)}')
+            print(f'compare cold {latency_summary(latencies)}')
+            latencies, _ = timed(lambda: client.get(url), args.requests)
+            print(f'compare cached {latency_summary(latencies)}')
+
+            path = data['modified'][0]['path']
+            latencies, response = timed(lambda: cold() and client.get(url, {'path': path}), args.requests)
+            print(f'file hunks cold hunks={len(response.json()["data"]["hunks"])} {latency_summary(latencies)}')
+            latencies, _ = timed(lambda: client.get(url, {'path': path}), args.requests)
+            print(f'file hunks cached {latency_summary(latencies)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+代码版本 ZIP 入库基准测试：对比原有的解压到 MEDIA_ROOT + os.walk + 逐条 create 与流式批量入库，
+统计文件/秒与峰值常驻内存
+
+每种方式在独立的子进程中运行，峰值内存互不影响；不指定 --mode 时依次运行两种方式
+
+示例：
+    python benchmarks/bench_code_ingestion.py --files 5000 --size 4096
+    python benchmarks/bench_code_ingestion.py --mode streaming --files 20000
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+MODES = ('legacy', 'streaming')
+
+
+def make_archive(files, size, binary_ratio, seed):
+    """生成含源码、二进制文件和 Mac 隐藏文件的 ZIP"""
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    line = b'value = compute(alpha, beta)  # \xe4\xb8\xad\xe6\x96\x87\n'
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for index in range(files):
+            directory = f'project/pkg_{index % 50}'
+            if rng.random() < binary_ratio:
+                archive.writestr(f'{directory}/asset_{index}.bin', bytes(rng.getrandbits(8) for _ in range(size)))
+            else:
+                archive.writestr(f'{directory}/module_{index}.py', (line * (size // len(line) + 1))[:size])
+            if index % 100 == 0:
+                archive.writestr(f'__MACOSX/{directory}/._module_{index}.py', b'\x00' * 64)
+                archive.writestr(f'{directory}/.DS_Store', b'\x00' * 64)
+    return buffer.getvalue()
+
+
+def legacy_ingest(version):
+    """原有实现：解压到 MEDIA_ROOT/temp，遍历目录后逐个文件 create"""
+    from django.conf import settings
+    from course.models import GroupCodeFile
+
+    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp', str(version.id))
+    os.makedirs(temp_dir, exist_ok=True)
+    with zipfile.ZipFile(version.zip_file, 'r') as zip_ref:
+        zip_ref.extractall(temp_dir)
+    total_files = total_size = 0
+    for root, _, files in os.walk(temp_dir):
+        for file in files:
+            file_path = os.path.join(root, file)
+            relative_path = os.path.relpath(file_path, temp_dir)
+            if '__MACOSX' in relative_path or relative_path.startswith('._') or '.DS_Store' in relative_path:
+                continue
+            file_size = os.path.getsize(file_path)
+            total_size += file_size
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except UnicodeDecodeError:
+                content = None
+            GroupCodeFile.objects.create(version=version, path=relative_path, content=content, size=file_size)
+            total_files += 1
+    version.total_files = total_files
+    version.total_size = total_size
+    version.save()
+    shutil.rmtree(temp_dir)
+    return total_files, total_size
+
+
+def run_mode(args):
+    from harness import benchmark_database, peak_rss_mb
+
+    media_root = tempfile.mkdtemp(prefix='bench_media_')
+    try:
+        with benchmark_database():
+            import datetime
+            from django.core.files.uploadedfile import SimpleUploadedFile
+            from django.test import override_settings
+            from accounts.models import User
+            from course.ingestion import ingest_version
+            from course.models import Course, Group, GroupCodeFile, GroupCodeVersion
+
+            with override_settings(MEDIA_ROOT=media_root):
+                teacher = User.objects.create(
+                    user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+                    school='bench', role='TEACHER', password='!'
+                )
+                today = datetime.date.today()
+                course = Course.objects.create(
+                    name='bench', teacher=teacher,
+                    start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=30),
+                )
+                group = Group.objects.create(course=course, creator=teacher)
+                data = make_archive(args.files, args.size, args.binary_ratio, args.seed)
+                version = GroupCodeVersion.objects.create(
+                    group=group, version='bench', zip_file=SimpleUploadedFile('code.zip', data)
+                )
+                del data
+                baseline = peak_rss_mb()
+
+                started = time.perf_counter()
+                total_files, total_size = (legacy_ingest if args.mode == 'legacy' else ingest_version)(version)
+                elapsed = time.perf_counter() - started
+
+                rows = GroupCodeFile.objects.filter(version=version).count()
+                print(f'mode={args.mode} files={total_files} rows={rows} bytes={total_size} elapsed={elapsed:.2f}s '
+                      f'files_per_sec={total_files / elapsed:.0f} peak_rss={peak_rss_mb():.1f}MB '
+                      f'peak_rss_delta={peak_rss_mb() - baseline:.1f}MB')
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--size', type=int, default=4096, help='每个文件的字节数')
+    parser.add_argument('--binary-ratio', type=float, default=0.1, help='二进制文件的比例')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mode', choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+    for mode in MODES:
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode,
+                   '--files', str(args.files), '--size', str(args.size),
+                   '--binary-ratio', str(args.binary_ratio), '--seed', str(args.seed)]
+        subprocess.run(command, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+课程提交导出基准测试：已结束的课程中每个小组提交一个代码 ZIP，下载全部提交，
+统计首字节时间、总耗时、吞吐量与峰值常驻内存
+
+- stream：没有预构建的压缩包，下载时流式生成
+- prebuilt：先由后台任务构建压缩包，下载 --downloads 次已保存的文件
+
+每种方式在独立的子进程中运行，峰值内存互不影响；不指定 --mode 时依次运行两种方式
+
+示例：
+    python benchmarks/bench_course_export.py --groups 50 --size 20
+    python benchmarks/bench_course_export.py --mode prebuilt --downloads 10
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ('stream', 'prebuilt')
+
+
+def write_random_file(path, size_mb):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+
+def run(args):
+    from harness import benchmark_database, latency_summary, peak_rss_mb
+
+    media_root = tempfile.mkdtemp(prefix='bench_media_')
+    try:
+        with benchmark_database():
+            import datetime
+            from django.test import override_settings
+            from rest_framework.test import APIClient
+            from accounts.models import User
+            from course.exports import process_pending_exports, request_course_export
+            from course.models import Course, CourseSubject, Group, GroupCodeVersion, GroupSubject, GroupSubmission, GroupSubmissionContribution
+            from subject.models import Subject
+
+            with override_settings(MEDIA_ROOT=media_root, ALLOWED_HOSTS=['*']):
+                teacher = User.objects.create(
+                    user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+                    school='bench', role='TEACHER', password='!'
+                )
+                today = datetime.date.today()
+                course = Course.objects.create(
+                    name='bench', teacher=teacher,
+                    start_date=today - datetime.timedelta(days=30), end_date=today - datetime.timedelta(days=1),
+                )
+                subject = Subject.objects.create(
+                    title='bench', description='bench', creator=teacher, languages=['PYTHON'], status='APPROVED'
+                )
+                course_subject = CourseSubject.objects.create(course=course, subject_type='PRIVATE', private_subject=subject)
+                students = User.objects.bulk_create([
+                    User(user_id=f'bench_{i}', email=f'bench_{i}@example.com', name=f'student{i}',
+                         school='bench', role='STUDENT', password='!')
+                    for i in range(args.groups * 3)
+                ])
+                for index in range(args.groups):
+                    group = Group.objects.create(course=course, creator=students[index * 3])
+                    GroupSubject.objects.create(group=group, course_subject=course_subject)
+                    name = f'group_codes/zip/bench/{index}.zip'
+                    write_random_file(os.path.join(media_root, name), args.size)
+                    version = GroupCodeVersion.objects.create(group=group, version='v1', zip_file=name)
+                    submission = GroupSubmission.objects.create(group=group, code_version=version, is_submitted=True)
+                    GroupSubmissionContribution.objects.bulk_create([
+                        GroupSubmissionContribution(submission=submission, student=student, contribution=33)
+                        for student in students[index * 3:index * 3 + 3]
+                    ])
+                if args.mode == 'prebuilt':
+                    request_course_export(course)
+                    started = time.perf_counter()
+                    process_pending_exports()
+                    print(f'build elapsed={time.perf_counter() - started:.2f}s')
+                baseline = peak_rss_mb()
+
+                client = APIClient()
+                client.force_authenticate(teacher)
+                downloads = args.downloads if args.mode == 'prebuilt' else 1
+                first_bytes, latencies = [], []
+                for _ in range(downloads):
+                    started = time.perf_counter()
+                    response = client.get(f'/api/v1/courses/{course.id}/download_submissions/')
+                    first_byte, total = None, 0
+                    for chunk in response.streaming_content:
+                        if first_byte is None:
+                            first_byte = time.perf_counter() - started
+                        total += len(chunk)
+                    latencies.append(time.perf_counter() - started)
+                    first_bytes.append(first_byte)
+                    response.close()
+                elapsed = sum(latencies) / len(latencies)
+                print(f'mode={args.mode} groups={args.groups} zip_size={args.size}MB archive={total / 2 ** 20:.0f}MB '
+                      f'etag={response.get("ETag", "-")} first_byte={min(first_bytes):.2f}s elapsed={elapsed:.2f}s '
+                      f'throughput={total / 2 ** 20 / elapsed:.0f}MB/s '
+                      f'peak_rss={peak_rss_mb():.1f}MB peak_rss_delta={peak_rss_mb() - baseline:.1f}MB')
+                print(f'download latency {latency_summary(latencies)}')
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--size', type=int, default=20, help='每个代码 ZIP 的大小(MB)')
+    parser.add_argument('--downloads', type=int, default=5, help='prebuilt 方式的下载次数')
+    parser.add_argument('--mode', choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args)
+        return
+    for mode in MODES:
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode, '--groups', str(args.groups),
+                   '--size', str(args.size), '--downloads', str(args.downloads)]
+        subprocess.run(command, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+加入课程基准测试：大量学生同时通过课程码加入同一门课程，统计吞吐量并校验结果
+
+每个学生默认重复提交两次加入请求，用于同时检验重复加入的并发安全性
+
+示例：
+    python benchmarks/bench_course_join.py --students 500 --threads 32
+"""
+import argparse
+import datetime
+from harness import benchmark_database, run_concurrently, latency_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=2, help='每个学生提交加入请求的次数')
+    args = parser.parse_args()
+
+    with benchmark_database():
+        from django.urls import reverse
+        from rest_framework.test import APIClient
+        from accounts.models import User
+        from course.models import Course
+
+        teacher = User.objects.create_user(
+            user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+            school='bench', role='TEACHER', password='bench'
+        )
+        students = User.objects.bulk_create([
+            User(user_id=f'bench_{i:05d}', email=f'bench_{i:05d}@example.com', name=f'bench_{i}',
+                 school='bench', role='STUDENT', password='!')
+            for i in range(args.students)
+        ])
+        today = datetime.date.today()
+        course = Course.objects.create(
+            name='bench', teacher=teacher,
+            start_date=today + datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=30),
+        )
+        updated_at = course.updated_at
+        url = f"{reverse('course-list')}join/"
+
+        def join(student):
+            client = APIClient()
+            client.force_authenticate(student)
+            return client.post(url, {'course_code': course.course_code}, format='json').status_code
+
+        calls = [(student,) for student in students for _ in range(args.repeat)]
+        results, elapsed = run_concurrently(join, calls, args.threads)
+        codes = [r for r, _ in results]
+        joined = codes.count(200)
+        rejected = codes.count(400)
+        errors = [r for r in codes if r not in (200, 400)]
+
+        Membership = Course.students.through
+        rows = Membership.objects.filter(course=course).count()
+        distinct = Membership.objects.filter(course=course).values('user_id').distinct().count()
+        course.refresh_from_db()
+
+        print(f'requests={len(calls)} joined={joined} already_joined={rejected} errors={len(errors)} threads={args.threads}')
+        print(f'membership_rows={rows} distinct_students={distinct} expected={args.students}')
+        print(f'course_row_untouched={course.updated_at == updated_at}')
+        print(f'latency {latency_summary([t for _, t in results])}')
+        print(f'throughput={len(calls) / elapsed:.1f} req/s elapsed={elapsed:.2f}s')
+        for error in errors[:5]:
+            print(f'error: {error!r}')
+
+
+if __name__ == '__main__':
+    main()
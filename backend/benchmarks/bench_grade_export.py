@@ -0,0 +1,129 @@
+"""
+成绩导出基准测试：教师的多门课程共 --rows 条贡献度记录，跨课程导出全部成绩，
+统计首字节时间、总耗时、吞吐量与峰值常驻内存
+
+- csv / jsonl / xlsx：接口流式导出，成绩以服务端游标分批读取
+- list：把同样的成绩查询一次性读入列表，作为内存占用的对照
+
+每种方式在独立的子进程中运行，峰值内存互不影响；不指定 --mode 时依次运行全部方式
+
+示例：
+    python benchmarks/bench_grade_export.py --rows 100000
+    python benchmarks/bench_grade_export.py --mode xlsx --rows 20000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+MODES = ('csv', 'jsonl', 'xlsx', 'list')
+GROUP_SIZE = 4
+GROUPS_PER_COURSE = 500
+
+
+def create_data(rows):
+    """按每组 GROUP_SIZE 人、每门课程 GROUPS_PER_COURSE 个小组批量创建选课、小组成员、提交与贡献度"""
+    import datetime
+    from django.utils import timezone
+    from accounts.models import User
+    from course.models import (
+        Course, CourseMembership, Group, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution,
+    )
+
+    teacher = User.objects.create(
+        user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+        school='bench', role='TEACHER', password='!'
+    )
+    students = User.objects.bulk_create([
+        User(user_id=f'bench_{i}', email=f'bench_{i}@example.com', name=f'student{i}',
+             school='bench', role='STUDENT', password='!')
+        for i in range(GROUP_SIZE * GROUPS_PER_COURSE)
+    ])
+    groups = rows // GROUP_SIZE
+    today = datetime.date.today()
+    now = timezone.now()
+    for start in range(0, groups, GROUPS_PER_COURSE):
+        course = Course.objects.create(
+            name=f'bench{start}', teacher=teacher,
+            start_date=today - datetime.timedelta(days=120), end_date=today - datetime.timedelta(days=1),
+        )
+        count = min(GROUPS_PER_COURSE, groups - start)
+        course_groups = Group.objects.bulk_create([
+            Group(course=course, name=f'group{i}', creator=students[i * GROUP_SIZE]) for i in range(count)
+        ])
+        members = [
+            (group, student) for i, group in enumerate(course_groups)
+            for student in students[i * GROUP_SIZE:(i + 1) * GROUP_SIZE]
+        ]
+        Group.students.through.objects.bulk_create([
+            Group.students.through(group=group, user=student) for group, student in members
+        ], batch_size=5000)
+        CourseMembership.objects.bulk_create([
+            CourseMembership(course=course, user=student, group=group) for group, student in members
+        ], batch_size=5000)
+        versions = GroupCodeVersion.objects.bulk_create([
+            GroupCodeVersion(group=group, version='v1', zip_file='v1.zip') for group in course_groups
+        ])
+        submissions = GroupSubmission.objects.bulk_create([
+            GroupSubmission(group=group, code_version=version, is_submitted=True, submitted_at=now)
+            for group, version in zip(course_groups, versions)
+        ])
+        GroupSubmissionContribution.objects.bulk_create([
+            GroupSubmissionContribution(submission=submission, student=student, contribution=25)
+            for i, submission in enumerate(submissions)
+            for student in students[i * GROUP_SIZE:(i + 1) * GROUP_SIZE]
+        ], batch_size=5000)
+    return teacher
+
+
+def run(args):
+    from harness import benchmark_database, peak_rss_mb, reset_peak_rss
+
+    with benchmark_database():
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+        from course.exports import grade_rows
+        from course.models import Course
+
+        with override_settings(ALLOWED_HOSTS=['*']):
+            teacher = create_data(args.rows)
+            reset_peak_rss()
+            baseline = peak_rss_mb()
+            started = time.perf_counter()
+            if args.mode == 'list':
+                rows = list(grade_rows(Course.objects.filter(teacher=teacher)))
+                first_byte, total = time.perf_counter() - started, len(rows)
+                unit = 'rows'
+            else:
+                client = APIClient()
+                client.force_authenticate(teacher)
+                response = client.get('/api/v1/courses/export/', {'format': args.mode})
+                first_byte, total = None, 0
+                for chunk in response.streaming_content:
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    total += len(chunk)
+                total, unit = total / 2 ** 20, 'MB'
+            elapsed = time.perf_counter() - started
+            print(f'mode={args.mode} rows={args.rows} output={total:.1f}{unit} first_byte={first_byte:.2f}s '
+                  f'elapsed={elapsed:.2f}s rows_per_sec={args.rows / elapsed:.0f} '
+                  f'peak_rss={peak_rss_mb():.1f}MB peak_rss_delta={peak_rss_mb() - baseline:.1f}MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='贡献度记录数（导出的行数）')
+    parser.add_argument('--mode', choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args)
+        return
+    for mode in MODES:
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode, '--rows', str(args.rows)]
+        subprocess.run(command, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+加入小组基准测试：大量学生同时加入同一门课程的少数几个小组，统计吞吐量并校验人数上限和一人一组
+
+每个学生依次向所有小组提交加入请求（起始小组按学生错开），同一学生的请求也会并发到达
+
+示例：
+    python benchmarks/bench_group_join.py --students 500 --groups 1 --size 10 --threads 32
+"""
+import argparse
+import datetime
+from harness import benchmark_database, run_concurrently, latency_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--groups', type=int, default=1)
+    parser.add_argument('--size', type=int, default=10, help='课程的小组人数上限')
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        from django.db.models import Count
+        from django.urls import reverse
+        from rest_framework.test import APIClient
+        from accounts.models import User
+        from course.models import Course, Group
+
+        teacher = User.objects.create_user(
+            user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+            school='bench', role='TEACHER', password='bench'
+        )
+        students = User.objects.bulk_create([
+            User(user_id=f'bench_{i:05d}', email=f'bench_{i:05d}@example.com', name=f'bench_{i}',
+                 school='bench', role='STUDENT', password='!')
+            for i in range(args.students)
+        ])
+        today = datetime.date.today()
+        course = Course.objects.create(
+            name='bench', teacher=teacher, max_group_size=args.size, min_group_size=1,
+            start_date=today + datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=30),
+        )
+        course.students.add(*students)
+        groups = [Group.objects.create(course=course, creator=teacher) for _ in range(args.groups)]
+
+        def join(student, group):
+            client = APIClient()
+            client.force_authenticate(student)
+            return client.post(f"{reverse('group-list')}{group.id}/join/").status_code
+
+        calls = [
+            (student, groups[(index + offset) % len(groups)])
+            for offset in range(len(groups))
+            for index, student in enumerate(students)
+        ]
+        results, elapsed = run_concurrently(join, calls, args.threads)
+        codes = [r for r, _ in results]
+        errors = [r for r in codes if r not in (200, 400)]
+
+        Membership = Group.students.through
+        sizes = dict(
+            Membership.objects.filter(group__course=course).values_list('group_id').annotate(n=Count('id'))
+        )
+        per_student = Membership.objects.filter(group__course=course).values('user_id').annotate(n=Count('id'))
+        multi = sum(1 for row in per_student if row['n'] > 1)
+        expected = min(args.students, args.groups * args.size)
+
+        print(f'requests={len(calls)} joined={codes.count(200)} rejected={codes.count(400)} '
+              f'errors={len(errors)} threads={args.threads}')
+        print(f'members={sum(sizes.values())} expected={expected} max_group={max(sizes.values(), default=0)} '
+              f'limit={args.size} overflow={any(n > args.size for n in sizes.values())} multi_group_students={multi}')
+        print(f'latency {latency_summary([t for _, t in results])}')
+        print(f'throughput={len(calls) / elapsed:.1f} req/s elapsed={elapsed:.2f}s')
+        for error in errors[:5]:
+            print(f'error: {error!r}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+课题志愿分配基准测试：大量小组与课题，志愿按热度偏斜生成，统计求解耗时与志愿满足情况
+
+默认只在内存中运行求解器；加 --db 时在临时数据库中执行完整的 allocate_subjects（读取、求解、批量写入）
+
+示例：
+    python benchmarks/bench_subject_allocation.py --groups 5000 --subjects 1000 --choices 10
+    python benchmarks/bench_subject_allocation.py --groups 2000 --subjects 400 --db
+"""
+import argparse
+import datetime
+import json
+import random
+import time
+from harness import benchmark_database, peak_rss_mb
+
+from course.allocation import satisfaction, solve  # noqa: E402
+
+
+def make_preferences(groups, subjects, choices, skew, rng):
+    """按 Zipf 式热度生成志愿，热门课题更常出现在前面"""
+    weights = [1 / (rank + 1) ** skew for rank in range(len(subjects))]
+    preferences = {}
+    for group in groups:
+        picked = []
+        seen = set()
+        while len(picked) < min(choices, len(subjects)):
+            subject = rng.choices(subjects, weights)[0]
+            if subject not in seen:
+                seen.add(subject)
+                picked.append(subject)
+        preferences[group] = picked
+    return preferences
+
+
+def print_summary(summary):
+    distribution = {row['rank']: row['groups'] for row in summary.pop('rank_distribution')}
+    print(json.dumps(summary, ensure_ascii=False))
+    print(f'rank_distribution={distribution}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=5000)
+    parser.add_argument('--subjects', type=int, default=1000)
+    parser.add_argument('--capacity', type=int, default=5, help='每个课题的名额（max_subject_selections）')
+    parser.add_argument('--choices', type=int, default=10, help='每个小组的志愿数')
+    parser.add_argument('--skew', type=float, default=1.0, help='热度偏斜程度，0 为均匀')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', action='store_true', help='在临时数据库中执行完整分配')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if not args.db:
+        groups = list(range(args.groups))
+        subjects = list(range(args.subjects))
+        preferences = make_preferences(groups, subjects, args.choices, args.skew, rng)
+        order = groups[:]
+        rng.shuffle(order)
+        started = time.perf_counter()
+        assignment, _ = solve({subject: args.capacity for subject in subjects}, preferences, order)
+        elapsed = time.perf_counter() - started
+        print(f'solver elapsed={elapsed * 1000:.1f}ms preferences={sum(map(len, preferences.values()))}')
+        print_summary(satisfaction(assignment, preferences, groups))
+        return
+
+    with benchmark_database():
+        from accounts.models import User
+        from course.allocation import allocate_subjects
+        from course.models import Course, CourseSubject, Group, GroupSubjectPreference
+        from subject.models import Subject
+
+        teacher = User.objects.create_user(
+            user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+            school='bench', role='TEACHER', password='bench'
+        )
+        today = datetime.date.today()
+        course = Course.objects.create(
+            name='bench', teacher=teacher, subject_selection_mode='preference',
+            start_date=today + datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=30),
+            max_subject_selections=args.capacity,
+        )
+        private = Subject.objects.bulk_create([
+            Subject(title=f'bench_{i}', description='bench', creator=teacher, languages=['PYTHON'], status='APPROVED')
+            for i in range(args.subjects)
+        ])
+        subjects = CourseSubject.objects.bulk_create([
+            CourseSubject(course=course, subject_type='PRIVATE', private_subject=subject) for subject in private
+        ])
+        groups = Group.objects.bulk_create([
+            Group(course=course, name=f'bench {i}') for i in range(args.groups)
+        ])
+        preferences = make_preferences([g.id for g in groups], [s.id for s in subjects], args.choices, args.skew, rng)
+        GroupSubjectPreference.objects.bulk_create([
+            GroupSubjectPreference(group_id=group, course_subject_id=subject, rank=rank)
+            for group, ranked in preferences.items()
+            for rank, subject in enumerate(ranked, 1)
+        ], batch_size=5000)
+
+        started = time.perf_counter()
+        report = allocate_subjects(course, seed=args.seed)
+        elapsed = time.perf_counter() - started
+        print(f'allocate_subjects elapsed={elapsed * 1000:.1f}ms')
+        print_summary(report['summary'])
+        print(f'peak_rss={peak_rss_mb():.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+课题搜索基准测试：课题库逐步增长到 --sizes 中的各个规模，每个规模下测量课题列表接口的延迟
+
+- word：整词搜索（英文词）
+- partial：部分匹配（中文词的一部分）
+- languages：按适用语言组合过滤
+- rank：整词搜索并按相关度排序
+
+每种查询只命中固定的 --matches 个课题，与课题库规模无关；延迟应不随规模增长。
+部分匹配依赖 pg_trgm 扩展，数据库没有该扩展时会打印提示，此时部分匹配需要扫描全表
+
+示例：
+    python benchmarks/bench_subject_search.py --sizes 10000 100000
+    python benchmarks/bench_subject_search.py --sizes 1000 10000 --requests 50
+"""
+import argparse
+import random
+import time
+
+QUERIES = {
+    'word': {'search': 'compilers'},
+    'partial': {'search': '图书馆'},
+    'languages': {'languages': 'C,JAVA'},
+    'rank': {'search': 'compilers', 'ordering': '-rank'},
+}
+WORDS = ['array', 'tree', 'graph', 'network', 'queue', 'parser', 'matrix', 'socket', 'thread', 'cache']
+PHRASES = ['学生管理系统', '在线商城', '聊天室', '文件服务器', '计算器', '贪吃蛇游戏']
+
+
+def filler(rng, count, creator):
+    from subject.models import Subject
+
+    return [
+        Subject(
+            title=f'{rng.choice(PHRASES)} {rng.choice(WORDS)} {rng.randrange(10 ** 6)}',
+            description=' '.join(rng.choices(WORDS, k=30)) + rng.choice(PHRASES),
+            creator=creator, languages=['PYTHON'], status='APPROVED',
+        )
+        for _ in range(count)
+    ]
+
+
+def matching(count, creator):
+    """每种查询都能命中的课题"""
+    from subject.models import Subject
+
+    return [
+        Subject(
+            title=f'Compilers 图书馆管理 {i}', description='Writing compilers for a tiny language',
+            creator=creator, languages=['C', 'JAVA'], status='APPROVED',
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='依次增长到的课题数')
+    parser.add_argument('--matches', type=int, default=20, help='每种查询命中的课题数')
+    parser.add_argument('--requests', type=int, default=30, help='每种查询在每个规模下的请求次数')
+    args = parser.parse_args()
+
+    from harness import benchmark_database, latency_summary
+
+    with benchmark_database():
+        from django.db import connection
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+        from accounts.models import User
+        from subject.models import Subject
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'subject_title_trgm_idx'")
+            if cursor.fetchone() is None:
+                print('提示：没有 pg_trgm 三元组索引，部分匹配需要扫描全表')
+
+        admin = User.objects.create(
+            user_id='bench_admin', email='bench_admin@example.com', name='bench',
+            school='bench', role='ADMIN', password='!'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        rng = random.Random(0)
+        Subject.objects.bulk_create(matching(args.matches, admin))
+        total = args.matches
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for size in sorted(args.sizes):
+                started = time.perf_counter()
+                while total < size:
+                    batch = min(5000, size - total)
+                    Subject.objects.bulk_create(filler(rng, batch, admin))
+                    total += batch
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE subject_subject')
+                print(f'subjects={total} (insert {time.perf_counter() - started:.1f}s)')
+                for name, params in QUERIES.items():
+                    latencies = []
+                    for _ in range(args.requests):
+                        started = time.perf_counter()
+                        response = client.get('/api/v1/subjects/', params)
+                        latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.content
+                    found = response.data['data']['count']
+                    print(f'  query={name} matches={found} {latency_summary(latencies)}')
+
+
+if __name__ == '__main__':
+    main()
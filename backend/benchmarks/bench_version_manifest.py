@@ -0,0 +1,90 @@
+"""
+版本详情基准测试：统计获取一个版本详情的响应大小与延迟，以及获取单个文件内容（200 与 If-None-Match 命中的 304）的延迟
+
+示例：
+    python benchmarks/bench_version_manifest.py --files 2000 --size 8192 --requests 20
+"""
+import argparse
+import datetime
+import io
+import random
+import time
+import zipfile
+from harness import benchmark_database, latency_summary
+
+
+def make_archive(files, size):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for index in range(files):
+            rng = random.Random(index)
+            lines, length = [], 0
+            while length < size:
+                line = f'v{rng.getrandbits(64):x} = f{rng.getrandbits(64):x}(a{rng.getrandbits(32):x})\n'
+                lines.append(line)
+                length += len(line)
+            archive.writestr(f'project/pkg_{index % 50}/module_{index}.py', ''.join(lines))
+    return buffer.getvalue()
+
+
+def timed(func, count):
+    latencies, response = [], None
+    for _ in range(count):
+        started = time.perf_counter()
+        response = func()
+        latencies.append(time.perf_counter() - started)
+    return latencies, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=8192, help='每个文件的字节数')
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        import tempfile
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+        from accounts.models import User
+        from course.ingestion import ingest_version
+        from course.models import Course, Group, GroupCodeVersion
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root, ALLOWED_HOSTS=['*']):
+            teacher = User.objects.create(
+                user_id='bench_teacher', email='bench_teacher@example.com', name='bench',
+                school='bench', role='TEACHER', password='!'
+            )
+            today = datetime.date.today()
+            course = Course.objects.create(
+                name='bench', teacher=teacher,
+                start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=30),
+            )
+            group = Group.objects.create(course=course, creator=teacher)
+            version = GroupCodeVersion.objects.create(
+                group=group, version='v1', zip_file=SimpleUploadedFile('code.zip', make_archive(args.files, args.size))
+            )
+            ingest_version(version)
+
+            client = APIClient()
+            client.force_authenticate(teacher)
+            url = f'/api/v1/groups/{group.id}/versions/{version.id}/'
+            latencies, response = timed(lambda: client.get(url), args.requests)
+            print(f'retrieve bytes={len(response.content)} {latency_summary(latencies)}')
+
+            file_id = response.json()['data']['files'][0]['id']
+            file_url = f'{url}files/{file_id}/'
+            latencies, response = timed(lambda: client.get(file_url), args.requests)
+            if response.status_code == 404:
+                print('file endpoint not available')
+                return
+            print(f'file 200 bytes={len(response.content)} {latency_summary(latencies)}')
+            etag = response['ETag']
+            latencies, response = timed(lambda: client.get(file_url, HTTP_IF_NONE_MATCH=etag), args.requests)
+            print(f'file {response.status_code} bytes={len(response.content)} {latency_summary(latencies)}')
+
+
+if __name__ == '__main__':
+    main()
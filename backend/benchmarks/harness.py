@@ -0,0 +1,111 @@
+"""
+基准测试公共工具
+
+在独立的测试数据库中运行（与 manage.py test 相同的建库方式），结束后自动销毁，不会影响开发数据库。
+用法：在 backend 目录下执行 python benchmarks/<脚本>.py [参数]
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CodeCollab.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connections  # noqa: E402
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases  # noqa: E402
+
+
+@contextmanager
+def benchmark_database():
+    """创建临时测试数据库，退出时销毁"""
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        teardown_databases(old_config, verbosity=0)
+
+
+def run_concurrently(func, args_list, threads):
+    """
+    用 threads 个线程并发执行 func(*args)，所有线程就绪后同时开始
+    返回 [(结果或异常, 耗时秒数), ...] 以及总耗时
+    """
+    results = [None] * len(args_list)
+    barrier = threading.Barrier(threads)
+    lock = threading.Lock()
+    cursor = {'next': 0}
+
+    def worker():
+        barrier.wait()
+        try:
+            while True:
+                with lock:
+                    index = cursor['next']
+                    cursor['next'] += 1
+                if index >= len(args_list):
+                    return
+                started = time.perf_counter()
+                try:
+                    outcome = func(*args_list[index])
+                except Exception as e:  # 记录异常供调用方统计
+                    outcome = e
+                results[index] = (outcome, time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def latency_summary(seconds):
+    """返回毫秒级的延迟统计字符串"""
+    if not seconds:
+        return 'n/a'
+    ms = sorted(s * 1000 for s in seconds)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f'p50={statistics.median(ms):.2f}ms p95={p95:.2f}ms max={ms[-1]:.2f}ms'
+
+
+def reset_peak_rss():
+    """
+    把峰值常驻内存重置为当前值（仅 Linux），之后的 peak_rss_mb 不再包含准备数据时的峰值
+    返回是否成功重置
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB）"""
+    # Linux 上读取 VmHWM，可由 reset_peak_rss 重置；getrusage 的峰值不能重置
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
@@ -1,12 +1,17 @@
 from django.contrib import admin
-from .models import Course, Group
+from .models import Course, CourseMembership, Group
+
+class CourseMembershipInline(admin.TabularInline):
+    model = CourseMembership
+    raw_id_fields = ('user', 'group')
+    extra = 0
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ('name', 'teacher', 'status', 'course_code', 'start_date', 'end_date')
     list_filter = ('status', 'teacher')
     search_fields = ('name', 'course_code', 'teacher__username')
-    filter_horizontal = ('students',)
+    inlines = (CourseMembershipInline,)
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
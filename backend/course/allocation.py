@@ -0,0 +1,159 @@
+"""
+课题志愿批量分配
+
+志愿分配模式下，小组在截止前提交按顺序排列的课程课题志愿，由教师统一触发分配，
+不再由组长在开放瞬间抢占名额。
+
+分配以抽签顺序作为所有课题对小组的共同优先级，此时小组提议的延迟接受算法
+等价于按抽签顺序依次让每个小组取得其最靠前且仍有名额的志愿：
+结果稳定（不存在互相更愿意匹配却未匹配的小组和课题），如实填报志愿也是小组的最优策略。
+算法复杂度与志愿总数成线性关系
+"""
+import heapq
+import random
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Value, When
+from .models import Course, CourseSubject, Group, GroupSubject, GroupSubjectPreference
+from .stats import invalidate_course_stats
+
+
+# region 求解
+def solve(capacity, preferences, order, assign_unmatched=False):
+    """
+    capacity: {课题: 剩余名额}
+    preferences: {小组: [课题, ...]}，按志愿顺序
+    order: 小组的抽签顺序
+
+    返回 ({小组: (课题, 志愿序号)}, {课题: 分配后剩余名额})；
+    assign_unmatched 时志愿全部落空的小组按抽签顺序分到剩余名额最多的课题，志愿序号为 None
+    """
+    remaining = dict(capacity)
+    assignment = {}
+    unmatched = []
+    for group in order:
+        for rank, subject in enumerate(preferences.get(group, ()), 1):
+            if remaining.get(subject, 0) > 0:
+                remaining[subject] -= 1
+                assignment[group] = (subject, rank)
+                break
+        else:
+            unmatched.append(group)
+
+    if assign_unmatched and unmatched:
+        heap = [(-slots, index, subject) for index, (subject, slots) in enumerate(remaining.items()) if slots > 0]
+        heapq.heapify(heap)
+        for group in unmatched:
+            if not heap:
+                break
+            slots, index, subject = heapq.heappop(heap)
+            assignment[group] = (subject, None)
+            remaining[subject] = -slots - 1
+            if remaining[subject] > 0:
+                heapq.heappush(heap, (slots + 1, index, subject))
+    return assignment, remaining
+
+
+def satisfaction(assignment, preferences, groups):
+    """志愿满足情况统计"""
+    ranks = Counter(rank for _, rank in assignment.values())
+    ranked = [rank for rank in ranks.elements() if rank is not None]
+    total = len(groups)
+    return {
+        'groups': total,
+        'with_preferences': sum(1 for group in groups if preferences.get(group)),
+        'assigned': len(assignment),
+        'unassigned': total - len(assignment),
+        'first_choice': ranks.get(1, 0),
+        'first_choice_rate': round(ranks.get(1, 0) / total, 4) if total else 0,
+        'top3': sum(ranks.get(rank, 0) for rank in (1, 2, 3)),
+        'average_rank': round(sum(ranked) / len(ranked), 3) if ranked else None,
+        'outside_preferences': ranks.get(None, 0),
+        'rank_distribution': [
+            {'rank': rank, 'groups': ranks[rank]} for rank in sorted(rank for rank in ranks if rank is not None)
+        ],
+    }
+# endregion
+
+
+# region 执行分配
+def allocate_subjects(course, seed=None, dry_run=False, assign_unmatched=False):
+    """
+    为尚未选题的小组按志愿分配课题；dry_run 时只返回预览
+
+    正式执行时依次锁住课程行、课程的小组行（按主键顺序）和课题行，在同一事务中重新读取名额和志愿并批量写入选题。
+    逐个选题先锁小组再占用课题名额，这里同样先锁小组，分配期间小组不会再被单独选题，两者也不会互相等待
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 31)
+    if dry_run:
+        return _allocate(course, seed, assign_unmatched, dry_run=True)
+    with transaction.atomic():
+        Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True).first()
+        list(Group.objects.select_for_update().filter(course_id=course.pk).order_by('pk').values_list('pk', flat=True))
+        report = _allocate(course, seed, assign_unmatched, dry_run=False)
+        invalidate_course_stats(course.pk)
+    return report
+
+
+def _allocate(course, seed, assign_unmatched, dry_run):
+    subjects = CourseSubject.objects.filter(course_id=course.pk).order_by('created_at', 'id')
+    if not dry_run:
+        # 锁住课题行，分配期间逐个选题的请求不能占用名额
+        subjects = subjects.select_for_update()
+    subjects = list(subjects.values_list('id', 'selected_count'))
+    selected = dict(subjects)
+    capacity = {subject: max(course.max_subject_selections - count, 0) for subject, count in subjects}
+
+    pending = list(
+        Group.objects.filter(course_id=course.pk)
+        .exclude(Exists(GroupSubject.objects.filter(group_id=OuterRef('pk'))))
+        .order_by('created_at', 'id')
+        .values_list('id', flat=True)
+    )
+    pending_set = set(pending)
+    preferences = defaultdict(list)
+    rows = (
+        GroupSubjectPreference.objects.filter(group__course_id=course.pk)
+        .order_by('group_id', 'rank')
+        .values_list('group_id', 'course_subject_id')
+    )
+    for group, subject in rows:
+        if group in pending_set:
+            preferences[group].append(subject)
+
+    order = list(pending)
+    random.Random(seed).shuffle(order)
+    assignment, remaining = solve(capacity, preferences, order, assign_unmatched)
+
+    assigned = Counter(subject for subject, _ in assignment.values())
+    if not dry_run and assignment:
+        GroupSubject.objects.bulk_create(
+            [GroupSubject(group_id=group, course_subject_id=subject) for group, (subject, _) in assignment.items()],
+            batch_size=1000,
+        )
+        CourseSubject.objects.filter(pk__in=assigned).update(selected_count=F('selected_count') + Case(
+            *[When(pk=subject, then=Value(count)) for subject, count in assigned.items()],
+            output_field=IntegerField(),
+        ))
+
+    return {
+        'dry_run': dry_run,
+        'seed': seed,
+        'summary': satisfaction(assignment, preferences, pending),
+        'subjects': [
+            {
+                'id': subject,
+                'selected_before': selected[subject],
+                'assigned': assigned.get(subject, 0),
+                'remaining': remaining[subject],
+            }
+            for subject, _ in subjects
+        ],
+        'assignments': [
+            {'group_id': group, 'course_subject_id': assignment[group][0], 'rank': assignment[group][1]}
+            for group in order if group in assignment
+        ],
+        'unassigned': [group for group in order if group not in assignment],
+    }
+# endregion
@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from ..models import Course, Group, CourseSubject, GroupSubject, GroupCodeFile, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution
+from ..models import Course, CourseExport, Group, CourseSubject, GroupSubject, GroupSubjectPreference, GroupCodeFile, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution
 from accounts.models import User
 from django.http import Http404
 from subject.api.serializers import SubjectSerializer, PublicSubjectSerializer
 import uuid
 import json
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from ..roster import parse_roster_rows, RosterFormatError
 
 
 
@@ -35,7 +38,8 @@ class CourseSerializer(serializers.ModelSerializer):
         model = Course
         fields = ['id', 'name', 'description', 'teacher', 'students', 
                  'course_code', 'status', 'current_status', 'created_at', 'updated_at',
-                 'start_date', 'end_date', 'max_group_size', 'min_group_size', 'max_subject_selections']
+                 'start_date', 'end_date', 'max_group_size', 'min_group_size', 'max_subject_selections',
+                 'subject_selection_mode', 'preference_deadline']
         read_only_fields = ['id', 'course_code', 'status', 'created_at', 'updated_at', 'teacher', 'max_group_size', 'min_group_size', 'max_subject_selections'] 
 
     def validate(self, data):
@@ -45,16 +49,25 @@ class CourseSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("开始时间不得比结束时间迟")
         return data
     def get_current_status(self, obj):
-        """获取当前状态"""
-        return obj.calculate_status()
-
-    def to_representation(self, instance):
-        """在序列化时更新状态"""
-        data = super().to_representation(instance)
-        # 更新数据库中的状态
-        instance.status = instance.calculate_status()
-        instance.save(update_fields=['status'])
-        return data
+        """获取当前状态，只读计算，不写数据库"""
+        # 查询集已通过 with_current_status 注解时直接使用注解结果
+        return getattr(obj, 'computed_status', None) or obj.calculate_status()
+    # endregion
+
+
+
+    # region 课程列表序列化器
+class CourseListSerializer(CourseSerializer):
+    '''课程列表序列化器，不嵌套学生名单，只返回成员统计'''
+    student_count = serializers.IntegerField(read_only=True)
+    group_count = serializers.IntegerField(read_only=True)
+    subject_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CourseSerializer.Meta):
+        fields = ['id', 'name', 'description', 'teacher', 'student_count', 'group_count', 'subject_count',
+                 'course_code', 'status', 'current_status', 'created_at', 'updated_at',
+                 'start_date', 'end_date', 'max_group_size', 'min_group_size', 'max_subject_selections',
+                 'subject_selection_mode', 'preference_deadline']
     # endregion
 
 
@@ -64,7 +77,8 @@ class CourseCreateSerializer(serializers.ModelSerializer):
     '''课程创建序列化器'''
     class Meta:
         model = Course
-        fields = ['name', 'description', 'start_date', 'end_date', 'max_group_size', 'min_group_size', 'max_subject_selections']
+        fields = ['name', 'description', 'start_date', 'end_date', 'max_group_size', 'min_group_size', 'max_subject_selections',
+                  'subject_selection_mode', 'preference_deadline']
         extra_kwargs = {
             'name': {'required': True},
             'description': {'required': False},  # 修改为可选
@@ -101,11 +115,13 @@ class JoinCourseSerializer(serializers.Serializer):
         fields = ['course_code']
         read_only_fields = ['course_code']
 
-    def validate_course_code(self, value):
-        '''验证课程码'''
-        if not Course.objects.filter(course_code=value).exists():
-            raise serializers.ValidationError("课程码不存在")
-        return value
+    def validate(self, data):
+        '''验证课程码，并取出加入课程所需的最少字段'''
+        course = Course.objects.only('id', 'start_date', 'end_date').filter(course_code=data['course_code']).first()
+        if course is None:
+            raise serializers.ValidationError({'course_code': "课程码不存在"})
+        data['course'] = course
+        return data
     
 class LeaveCourseSerializer(serializers.Serializer):
     '''退出课程序列化器'''
@@ -120,6 +136,58 @@ class LeaveCourseSerializer(serializers.Serializer):
         if not User.objects.filter(user_id=value).exists():
             raise serializers.ValidationError("学生用户ID不存在")
         return value
+
+
+class CourseExportSerializer(serializers.ModelSerializer):
+    """课程导出构建状态序列化器"""
+
+    class Meta:
+        model = CourseExport
+        fields = ['status', 'size', 'hash', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class RemoveStudentsSerializer(serializers.Serializer):
+    '''批量移出学生序列化器'''
+    student_user_ids = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=5000)
+
+
+class AutoGroupSerializer(serializers.Serializer):
+    '''自动分组序列化器'''
+    seed = serializers.IntegerField(required=False, min_value=0, help_text="随机种子，相同种子得到相同分组")
+    together = serializers.ListField(
+        child=serializers.ListField(child=serializers.CharField(), min_length=2),
+        required=False, default=list, help_text="需要分在同一小组的学号列表"
+    )
+    apart = serializers.ListField(
+        child=serializers.ListField(child=serializers.CharField(), min_length=2),
+        required=False, default=list, help_text="不能分在同一小组的学号列表"
+    )
+    fill_existing = serializers.BooleanField(required=False, default=True, help_text="是否优先补满已有小组")
+    dry_run = serializers.BooleanField(required=False, default=False, help_text="只预览，不创建小组")
+    # endregion
+
+
+
+    # region 导入名单序列化器
+class ImportRosterSerializer(serializers.Serializer):
+    '''批量导入名单序列化器，支持上传 CSV/JSON 文件或直接提交学号列表'''
+    file = serializers.FileField(required=False, help_text="CSV 或 JSON 名单文件")
+    user_ids = serializers.ListField(child=serializers.CharField(), required=False, help_text="学号列表")
+
+    def validate(self, data):
+        '''解析名单，统一转换为学号列表'''
+        if data.get('file'):
+            try:
+                rows = parse_roster_rows(data['file'].read(), data['file'].name)
+            except RosterFormatError as e:
+                raise serializers.ValidationError(str(e))
+            user_ids = [row['user_id'] for row in rows]
+        else:
+            user_ids = [user_id.strip() for user_id in data.get('user_ids', [])]
+        if not user_ids:
+            raise serializers.ValidationError("名单不能为空")
+        return {'user_ids': user_ids}
     # endregion
 
 
@@ -167,6 +235,17 @@ class CourseSubjectSerializer(serializers.Serializer):
         else:
             return PublicSubjectSerializer(obj.public_subject, context=self.context).data
 
+class CourseSubjectSlotsSerializer(CourseSubjectSerializer):
+    """课程课题列表序列化器，附带已选次数和剩余名额（context 中需提供 course）"""
+    selected_count = serializers.IntegerField(read_only=True)
+    remaining_slots = serializers.SerializerMethodField()
+
+    class Meta(CourseSubjectSerializer.Meta):
+        fields = CourseSubjectSerializer.Meta.fields + ['selected_count', 'remaining_slots']
+
+    def get_remaining_slots(self, obj):
+        return max(self.context['course'].max_subject_selections - obj.selected_count, 0)
+
 class DeleteSubjectSerializer(serializers.Serializer):
     """删除课题序列化器"""
     course_subject_id = serializers.UUIDField(required=True, help_text="要删除的课程课题ID")
@@ -195,6 +274,34 @@ class GroupSubjectSerializer(serializers.ModelSerializer):
         fields = ['id', 'group', 'course_subject', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class SubjectPreferenceSerializer(serializers.ModelSerializer):
+    """小组课题志愿序列化器"""
+    title = serializers.SerializerMethodField()
+    class Meta:
+        model = GroupSubjectPreference
+        fields = ['rank', 'course_subject', 'title']
+
+    def get_title(self, obj):
+        subject = obj.course_subject.private_subject or obj.course_subject.public_subject
+        return subject.title if subject else None
+
+class SubmitPreferencesSerializer(serializers.Serializer):
+    """提交课题志愿序列化器"""
+    course_subject_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=True, max_length=50, help_text="按志愿顺序排列的课程课题ID"
+    )
+
+    def validate_course_subject_ids(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("志愿中不能有重复的课题")
+        return value
+
+class AllocateSubjectsSerializer(serializers.Serializer):
+    """课题志愿分配序列化器"""
+    seed = serializers.IntegerField(required=False, min_value=0, help_text="抽签随机种子")
+    dry_run = serializers.BooleanField(required=False, default=False, help_text="只预览，不写入选题")
+    assign_unmatched = serializers.BooleanField(required=False, default=False, help_text="志愿全部落空的小组是否分配到剩余课题")
+
 class SelectSubjectSerializer(serializers.Serializer):
     """选题序列化器"""
     course_subject_id = serializers.UUIDField(required=True, help_text="要选择的课程课题ID")
@@ -225,12 +332,15 @@ class GroupSerializer(serializers.ModelSerializer):
                           'max_students', 'min_students', 'group_subjects', 'submission']
     
     def get_submission(self, obj):
-        """获取小组提交信息"""
-        submission = GroupSubmission.objects.filter(group=obj, is_submitted=True).first()
+        """获取小组提交信息，优先使用 Group.objects.with_detail() 预取的结果"""
+        if hasattr(obj, 'submitted_submissions'):
+            submission = obj.submitted_submissions[0] if obj.submitted_submissions else None
+        else:
+            submission = GroupSubmission.objects.filter(group=obj, is_submitted=True).first()
         if submission:
             return {
                 'is_submitted': True,
-                'version_id': submission.code_version.id
+                'version_id': submission.code_version_id
             }
         return {
             'is_submitted': False,
@@ -290,19 +400,40 @@ class GroupListSerializer(serializers.ModelSerializer):
 # region 代码序列化器
 class GroupCodeFileSerializer(serializers.ModelSerializer):
     """代码文件序列化器"""
+    content = serializers.CharField(read_only=True, allow_null=True)
+    hash = serializers.CharField(source='blob_id', read_only=True, allow_null=True)
+
     class Meta:
         model = GroupCodeFile
-        fields = ['id', 'path', 'content', 'size', 'is_previewable', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'content', 'size', 'is_previewable', 'created_at', 'updated_at']
+        fields = ['id', 'path', 'content', 'size', 'is_previewable', 'hash', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'content', 'size', 'is_previewable', 'hash', 'created_at', 'updated_at']
+
+class GroupCodeFileManifestSerializer(serializers.ModelSerializer):
+    """代码文件清单序列化器，不含文件内容"""
+    hash = serializers.CharField(source='blob_id', read_only=True, allow_null=True)
+
+    class Meta:
+        model = GroupCodeFile
+        fields = ['id', 'path', 'size', 'is_previewable', 'hash']
+        read_only_fields = fields
 
 class GroupCodeVersionSerializer(serializers.ModelSerializer):
-    """代码版本序列化器"""
-    files = GroupCodeFileSerializer(many=True, read_only=True)
+    """代码版本序列化器，文件只返回清单，内容通过文件接口按需获取"""
+    files = GroupCodeFileManifestSerializer(many=True, read_only=True)
     
     class Meta:
         model = GroupCodeVersion
-        fields = ['id', 'version', 'description', 'total_files', 'total_size', 'files', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'total_files', 'total_size', 'files', 'created_at', 'updated_at']
+        fields = ['id', 'version', 'description', 'status', 'total_files', 'total_size', 'files', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'status', 'total_files', 'total_size', 'files', 'created_at', 'updated_at']
+
+class GroupCodeVersionStatusSerializer(serializers.ModelSerializer):
+    """代码版本处理状态序列化器"""
+
+    class Meta:
+        model = GroupCodeVersion
+        fields = ['id', 'version', 'status', 'processed_files', 'total_files', 'processed_size', 'total_size',
+                  'error', 'created_at', 'updated_at']
+        read_only_fields = fields
 
 class GroupCodeVersionCreateSerializer(serializers.ModelSerializer):
     """代码版本创建序列化器"""
@@ -315,7 +446,7 @@ class GroupCodeVersionCreateSerializer(serializers.ModelSerializer):
     def validate_version(self, value):
         """验证版本号是否已存在"""
         group = self.context['group']
-        if GroupCodeVersion.objects.filter(group=group, version=value).exists():
+        if GroupCodeVersion.objects.filter(group=group, version=value).exclude(status='failed').exists():
             raise serializers.ValidationError("该版本号已存在")
         return value
     
@@ -330,8 +461,8 @@ class GroupCodeVersionListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = GroupCodeVersion
-        fields = ['id', 'version']
-        read_only_fields = ['id', 'version']
+        fields = ['id', 'version', 'status']
+        read_only_fields = ['id', 'version', 'status']
 # endregion
 
 # region 小组提交序列化器
@@ -354,13 +485,53 @@ class GroupSubmissionSerializer(serializers.ModelSerializer):
         fields = ['id', 'code_version', 'is_submitted', 'submitted_at', 'created_at', 'updated_at', 'contributions']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class ContributionField(serializers.Field):
+    """
+    单个成员的贡献度：{"student_id": ..., "contribution": ...}
+
+    也接受 JSON 编码的字符串（旧版前端逐项 JSON.stringify 后提交）
+    """
+    default_error_messages = {
+        'invalid': "贡献度数据格式错误，必须是有效的 JSON 对象",
+        'missing': "贡献度数据格式错误，必须包含 student_id 和 contribution 字段",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                self.fail('invalid')
+        if not isinstance(data, dict):
+            self.fail('invalid')
+        if 'student_id' not in data or 'contribution' not in data:
+            self.fail('missing')
+        return {'student_id': str(data['student_id']), 'contribution': data['contribution']}
+
+    def to_representation(self, value):
+        return value
+
+
+class ContributionListField(serializers.ListField):
+    """贡献度列表，表单提交时也可以是一个 JSON 数组字符串"""
+    child = ContributionField()
+
+    def to_internal_value(self, data):
+        # 表单中只有一个值时，它可能是整个 JSON 数组
+        if isinstance(data, list) and len(data) == 1 and isinstance(data[0], str) and data[0].lstrip().startswith('['):
+            data = data[0]
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                raise serializers.ValidationError("贡献度数据格式错误，必须是 JSON 数组")
+        return super().to_internal_value(data)
+
+
 class GroupSubmissionCreateSerializer(serializers.ModelSerializer):
     """小组提交创建序列化器"""
     code_version_id = serializers.UUIDField(required=True)
-    contributions = serializers.ListField(
-        child=serializers.CharField(),
-        required=True
-    )
+    contributions = ContributionListField(required=True)
     
     class Meta:
         model = GroupSubmission
@@ -369,87 +540,77 @@ class GroupSubmissionCreateSerializer(serializers.ModelSerializer):
     def validate_code_version_id(self, value):
         """验证代码版本是否存在且属于该小组"""
         group = self.context['group']
-        if not GroupCodeVersion.objects.filter(id=value, group=group).exists():
+        code_status = GroupCodeVersion.objects.filter(id=value, group=group).values_list('status', flat=True).first()
+        if code_status is None:
             raise serializers.ValidationError("该代码版本不存在或不属于该小组")
+        if code_status != 'ready':
+            raise serializers.ValidationError("该代码版本尚未处理完成")
         return value
     
     def validate_contributions(self, value):
-        """验证贡献度数据"""
+        """按小组成员名单验证贡献度，返回 [{'student': User, 'contribution': Decimal}, ...]"""
         group = self.context['group']
-        group_students = set(group.students.all())
-        submitted_students = set()
-        total_contribution = 0
-        
-        # 验证每个贡献度数据
-        for contribution_str in value:
-            try:
-                # 将字符串转换为字典
-                contribution = eval(contribution_str)
-                if not isinstance(contribution, dict):
-                    raise serializers.ValidationError("贡献度数据格式错误，必须是对象格式")
-            except (SyntaxError, NameError):
-                raise serializers.ValidationError("贡献度数据格式错误，必须是有效的字典格式")
-            
-            if 'student_id' not in contribution or 'contribution' not in contribution:
-                raise serializers.ValidationError("贡献度数据格式错误，必须包含 student_id 和 contribution 字段")
-            
-            try:
-                student = User.objects.get(user_id=contribution['student_id'])
-            except User.DoesNotExist:
-                raise serializers.ValidationError(f"学生 {contribution['student_id']} 不存在")
-            
-            if student not in group_students:
-                raise serializers.ValidationError(f"学生 {student.name} 不在该小组中")
-            
-            if student in submitted_students:
+        # 一次查询得到小组成员，只有提交了名单外的学号时才再查询这些学生
+        members = {student.user_id: student for student in group.students.all()}
+        outsiders = {item['student_id'] for item in value} - members.keys()
+        others = dict(User.objects.filter(user_id__in=outsiders).values_list('user_id', 'name')) if outsiders else {}
+
+        contributions = []
+        submitted = set()
+        total_contribution = Decimal(0)
+        for item in value:
+            student_id = item['student_id']
+            if student_id not in members:
+                if student_id not in others:
+                    raise serializers.ValidationError(f"学生 {student_id} 不存在")
+                raise serializers.ValidationError(f"学生 {others[student_id]} 不在该小组中")
+            student = members[student_id]
+
+            if student_id in submitted:
                 raise serializers.ValidationError(f"学生 {student.name} 的贡献度重复提交")
-            
+
             try:
-                contribution_value = float(contribution['contribution'])
-            except (TypeError, ValueError):
+                contribution = Decimal(str(item['contribution']))
+            except InvalidOperation:
+                contribution = None
+            if isinstance(item['contribution'], bool) or contribution is None or not contribution.is_finite():
                 raise serializers.ValidationError(f"学生 {student.name} 的贡献度必须是数字")
-            
-            if contribution_value < 0 or contribution_value > 100:
+
+            if contribution < 0 or contribution > 100:
                 raise serializers.ValidationError(f"学生 {student.name} 的贡献度必须在0-100之间")
-            
-            submitted_students.add(student)
-            total_contribution += contribution_value
-        
+
+            submitted.add(student_id)
+            total_contribution += contribution
+            contributions.append({'student': student, 'contribution': contribution})
+
         # 验证是否包含所有小组成员
-        if submitted_students != group_students:
-            missing_students = group_students - submitted_students
-            raise serializers.ValidationError(f"缺少以下学生的贡献度: {', '.join(s.name for s in missing_students)}")
-        
+        if submitted != members.keys():
+            missing_students = [student.name for user_id, student in members.items() if user_id not in submitted]
+            raise serializers.ValidationError(f"缺少以下学生的贡献度: {', '.join(missing_students)}")
+
         # 验证贡献度总和是否为100
-        if abs(total_contribution - 100) > 0.01:  # 允许0.01的误差
+        if abs(total_contribution - 100) > Decimal('0.01'):  # 允许0.01的误差
             raise serializers.ValidationError("所有学生的贡献度之和必须为100")
-        
-        return value
+
+        return contributions
     
     def create(self, validated_data):
-        """创建提交记录和贡献度记录"""
+        """在同一事务中创建提交记录与全部贡献度记录"""
         group = self.context['group']
-        code_version = GroupCodeVersion.objects.get(id=validated_data['code_version_id'])
-        contributions = validated_data.pop('contributions')
-        
-        # 创建提交记录
-        submission = GroupSubmission.objects.create(
-            group=group,
-            code_version=code_version,
-            is_submitted=True
-        )
-        
-        # 创建贡献度记录
-        for contribution_str in contributions:
-            # 将字符串转换为字典
-            contribution = eval(contribution_str)
-            student = User.objects.get(user_id=contribution['student_id'])
-            GroupSubmissionContribution.objects.create(
-                submission=submission,
-                student=student,
-                contribution=contribution['contribution']
+        with transaction.atomic():
+            submission = GroupSubmission.objects.create(
+                group=group,
+                code_version_id=validated_data['code_version_id'],
+                is_submitted=True
             )
-        
+            GroupSubmissionContribution.objects.bulk_create([
+                GroupSubmissionContribution(
+                    submission=submission,
+                    student=item['student'],
+                    contribution=item['contribution']
+                )
+                for item in validated_data['contributions']
+            ])
         return submission
 # endregion
 
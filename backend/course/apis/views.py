@@ -1,38 +1,58 @@
 from django.shortcuts import render
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from ..models import Course, Group, GroupCodeVersion, GroupCodeFile, GroupSubmission, GroupSubmissionContribution
-from .serializers import CourseSerializer, JoinCourseSerializer, LeaveCourseSerializer, UserSerializer, GroupCodeVersionSerializer, GroupCodeVersionCreateSerializer, GroupCodeVersionListSerializer
-import random
-import string
+from ..models import Course, CourseExport, Group, GroupCodeVersion, GroupCodeFile, GroupSubmission
+from .serializers import CourseSerializer, CourseListSerializer, JoinCourseSerializer, LeaveCourseSerializer, UserSerializer, GroupCodeVersionSerializer, GroupCodeVersionCreateSerializer, GroupCodeVersionListSerializer, GroupCodeVersionStatusSerializer, GroupCodeFileSerializer, CourseExportSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from rest_framework.pagination import PageNumberPagination
-from accounts.permissions import IsStudent, IsTeacherOrAdmin, CanUpdateCourse, CanDeleteCourse, CanLeaveCourse, CanSeeStudents, CanJoinGroup, CanLeaveGroup, CanAddSubjectToCourse, CanSeeSubjects, CanDeleteSubjectFromCourse, CanSelectSubject, CanUnselectSubject, CanSeeGroupDetail, CanSubmitCode
+from CodeCollab.api.pagination import CustomPagination
+from accounts.permissions import IsStudent, IsTeacherOrAdmin, CanUpdateCourse, CanDeleteCourse, CanLeaveCourse, CanSeeStudents, CanJoinGroup, CanLeaveGroup, CanAddSubjectToCourse, CanSeeSubjects, CanDeleteSubjectFromCourse, CanSelectSubject, CanUnselectSubject, CanSeeGroupDetail, CanSubmitCode, CanImportRoster, CanSeeCourseStats, CanAutoGroup, CanAllocateSubjects
 from CodeCollab.api.decorators import standard_response
-from .serializers import CourseCreateSerializer, GroupSerializer, GroupCreateSerializer, LeaveGroupSerializer, AddSubjectSerializer, CourseSubjectSerializer, DeleteSubjectSerializer, SelectSubjectSerializer, GroupSubmissionCreateSerializer
+from CodeCollab.api.negotiation import IgnoreFormatContentNegotiation
+from .serializers import CourseCreateSerializer, GroupSerializer, GroupCreateSerializer, LeaveGroupSerializer, AddSubjectSerializer, CourseSubjectSerializer, CourseSubjectSlotsSerializer, DeleteSubjectSerializer, SelectSubjectSerializer, GroupSubmissionCreateSerializer, ImportRosterSerializer, RemoveStudentsSerializer, AutoGroupSerializer, SubjectPreferenceSerializer, SubmitPreferencesSerializer, AllocateSubjectsSerializer
 from rest_framework.exceptions import ValidationError
 from accounts.models import User
 from django.http import Http404
-from django.db.models import Q
+from django.utils.http import content_disposition_header, parse_etags
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 import logging
 from subject.models import Subject, PublicSubject
-from course.models import CourseSubject, GroupSubject
+from course.models import CourseMembership, CourseSubject, GroupSubject, GroupSubjectPreference
 import os
-from io import BytesIO
-from django.http import FileResponse
+import re
+import uuid
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django_filters import FilterSet, ChoiceFilter, DateFilter
+from .. import roster, selection
+from ..stats import get_course_stats
+from ..blobs import storage_stats
+from ..exports import GRADE_FORMATS, read_file_range, request_course_export, stream_archive, stream_grades, submission_entries
+from ..diffing import DEFAULT_CONTEXT, MAX_CONTEXT, compare_versions, diff_hunks
+from ..grouping import form_groups, GroupingError
+from ..allocation import allocate_subjects
 
 logger = logging.getLogger(__name__)
 # Create your views here.
 
-class CustomPagination(PageNumberPagination):
-    """自定义分页类"""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+class CourseFilter(FilterSet):
+    """课程过滤器，状态按开始/结束日期实时计算，不依赖已存储的状态"""
+    status = ChoiceFilter(choices=Course.STATUS_CHOICES, method='filter_status')
+    # 学期范围：开始日期不早于 term_start、结束日期不晚于 term_end 的课程
+    term_start = DateFilter(field_name='start_date', lookup_expr='gte')
+    term_end = DateFilter(field_name='end_date', lookup_expr='lte')
+
+    def filter_status(self, queryset, name, value):
+        return queryset.filter_current_status(value)
+
+    class Meta:
+        model = Course
+        fields = ['status']
 
 # region 课程视图集
 class CourseViewSet(viewsets.ModelViewSet):
@@ -42,7 +62,7 @@ class CourseViewSet(viewsets.ModelViewSet):
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['status']
+    filterset_class = CourseFilter
     search_fields = ['name', 'course_code', 'teacher__name', 'students__name']
     search_param = 'search'  # 指定搜索参数名为 search
     ordering_fields = ['created_at', 'updated_at']
@@ -59,7 +79,7 @@ class CourseViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated, CanUpdateCourse]
         elif self.action == 'destroy':
             permission_classes = [IsTeacherOrAdmin, CanDeleteCourse]
-        elif self.action in ['join']:
+        elif self.action in ['join', 'me']:
             permission_classes = [IsStudent]
         elif self.action in ['leave']:
             permission_classes = [IsAuthenticated, CanLeaveCourse]
@@ -71,16 +91,38 @@ class CourseViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated, CanSeeSubjects]
         elif self.action in ['delete_subject']:
             permission_classes = [IsAuthenticated, CanDeleteSubjectFromCourse]
+        elif self.action in ['remove_students']:
+            permission_classes = [IsTeacherOrAdmin, CanLeaveCourse]
+        elif self.action in ['allocate_subjects']:
+            permission_classes = [IsTeacherOrAdmin, CanAllocateSubjects]
+        elif self.action in ['auto_group']:
+            permission_classes = [IsTeacherOrAdmin, CanAutoGroup]
+        elif self.action in ['stats', 'storage', 'export']:
+            permission_classes = [IsTeacherOrAdmin, CanSeeCourseStats]
+        elif self.action in ['export_grades']:
+            permission_classes = [IsTeacherOrAdmin]
+        elif self.action in ['import_roster']:
+            permission_classes = [IsTeacherOrAdmin, CanImportRoster]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
     # endregion
 
+    # region 分页
+    def get_cursor_ordering(self):
+        """键集分页使用的排序字段"""
+        if self.action == 'students':
+            return ('user_id',)
+        return ('-created_at', '-id')
+    # endregion
+
     # region 序列化器
     def get_serializer_class(self):
         """根据不同的操作设置不同的序列化器"""
         if self.action == 'create':
             return CourseCreateSerializer
+        elif self.action == 'list':
+            return CourseListSerializer
         return super().get_serializer_class()
     # endregion
 
@@ -88,14 +130,17 @@ class CourseViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """根据不同的操作设置不同的查询集"""
         user = self.request.user
-        queryset = Course.objects.all()
+        queryset = Course.objects.with_current_status().select_related('teacher')
+        if self.action == 'list':
+            # 列表只返回成员统计，学生名单仅在详情和 students 接口中提供
+            queryset = queryset.with_member_counts()
 
         # 根据用户角色过滤数据
         if user.is_anonymous:
             return queryset.none()
         elif user.role == 'STUDENT':
             # 学生只能看到自己加入的课程
-            return queryset.filter(students=user)
+            return queryset.filter(memberships__user=user)
         elif user.role == 'TEACHER':
             # 教师可以看到自己创建的课程
             return queryset.filter(teacher=user)
@@ -138,13 +183,8 @@ class CourseViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
     # endregion
     def perform_create(self, serializer):
-        # 生成唯一的课程码
-        while True:
-            course_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            if not Course.objects.filter(course_code=course_code).exists():
-                break
-        
-        serializer.save(teacher=self.request.user, course_code=course_code)
+        # 课程码由 Course.save 在插入时分配，冲突时自动重试
+        serializer.save(teacher=self.request.user)
 
     # region 加入课程
     @action(detail=False, methods=['post'])
@@ -153,23 +193,17 @@ class CourseViewSet(viewsets.ModelViewSet):
         # 验证请求参数
         serializer = JoinCourseSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        course_code = serializer.validated_data['course_code']
-        # 获取课程
-        course = get_object_or_404(Course, course_code=course_code)
+        course = serializer.validated_data['course']
+        # 条件插入：课程未开始且尚未加入时才写入关联表
+        result = roster.join_course(course, request.user)
         # 验证用户是否已经加入课程
-        if request.user in course.students.all():
+        if result == roster.ALREADY_ENROLLED:
             raise ValidationError("您已经加入该课程")
-        # 更新课程状态
-        course.calculate_status()
         # 如果课程已结束，则无法加入
-        if course.status == "completed":
+        if result == "completed":
             raise ValidationError("该课程已结束，无法加入")
-        if course.status == "in_progress":
+        if result == "in_progress":
             raise ValidationError("该课程正在进行中，无法加入")
-        # 加入课程
-        course.students.add(request.user)
-        # 保存课程
-        course.save()
         return Response(None, status=status.HTTP_200_OK)
     # endregion
 
@@ -185,57 +219,181 @@ class CourseViewSet(viewsets.ModelViewSet):
             
         # 如果是学生退出自己的课程
         if request.user.role == "STUDENT":
-            # 更新课程状态
-            course.calculate_status()
-            # 如果课程已结束，则无法退出
-            if course.status == "completed":
+            # 如果课程已结束或进行中，则无法退出
+            course_status = course.calculate_status()
+            if course_status == "completed":
                 raise ValidationError("该课程已结束，无法退出")
-            # 如果课程进行中，则无法退出
-            if course.status == "in_progress":
+            if course_status == "in_progress":
                 raise ValidationError("该课程正在进行中，无法退出")
-            # 退出课程
-            course.students.remove(request.user)
-            # 同步退出所有相关小组
-            groups = Group.objects.filter(course=course, students=request.user)
-            if groups.exists():
-                for group in groups:
-                    # 如果是组长退出课程
-                    if group.creator == request.user:
-                        group.students.remove(request.user)
-                        # 如果小组没有学生了，则删除小组，否则重新指定组长
-                        if group.students.count() == 0:
-                            group.delete()
-                        else:
-                            group.creator = group.students.first()
-                            group.save()
-                    else:
-                        group.students.remove(request.user)
-                        group.save()
-            # 保存课程
-            course.save()
+            # 退出课程并同步退出所有相关小组
+            roster.remove_students(course, [request.user.pk])
         else:
             # 验证请求参数
             serializer = LeaveCourseSerializer(data=request.data)
             serializer.is_valid(raise_exception=True)
             student_user_id = serializer.validated_data['student_user_id']
-            student_user = get_object_or_404(User, user_id=student_user_id)
+            # 移出课程并同步退出所有相关小组
+            report = roster.remove_students(course, [student_user_id])
             # 验证用户是否已经加入课程
-            if student_user not in course.students.all():
+            if not report['removed']:
                 raise ValidationError("该学生未加入该课程")
-            # 退出课程
-            course.students.remove(student_user)
-            # 同步退出所有相关小组
-            groups = Group.objects.filter(course=course, students=student_user)
-            for group in groups:
-                group.students.remove(student_user)
-                # 如果小组没有学生了，且不是教师创建的小组，则删除小组
-                if group.students.count() == 0 and group.creator != course.teacher:
-                    group.delete()
-            # 保存课程
-            course.save()
         return Response(None, status=status.HTTP_200_OK)
     # endregion
 
+    # region 批量移出学生
+    @action(detail=True, methods=['post'])
+    @standard_response("移出学生成功")
+    def remove_students(self, request, pk=None):
+        """一次移出多名学生，返回实际移出与未加入课程的学号"""
+        try:
+            course = self.get_object()
+        except Http404:
+            raise Http404("课程不存在")
+        serializer = RemoveStudentsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = roster.remove_students(course, serializer.validated_data['student_user_ids'])
+        return Response(report, status=status.HTTP_200_OK)
+    # endregion
+
+    # region 自动分组
+    @action(detail=True, methods=['post'])
+    @standard_response("自动分组成功")
+    def auto_group(self, request, pk=None):
+        """把未分组的学生自动分入小组，dry_run 时只返回预览"""
+        try:
+            course = self.get_object()
+        except Http404:
+            raise Http404("课程不存在")
+        # 与手动创建小组一致，课程开始后不能再分组
+        course_status = course.calculate_status()
+        if course_status == "in_progress":
+            raise ValidationError("课程已开始")
+        if course_status == "completed":
+            raise ValidationError("课程已结束")
+        serializer = AutoGroupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            report = form_groups(course, **serializer.validated_data)
+        except GroupingError as e:
+            raise ValidationError(str(e))
+        return Response(report, status=status.HTTP_200_OK)
+    # endregion
+
+    # region 课题志愿分配
+    @action(detail=True, methods=['post'])
+    @standard_response("课题分配成功")
+    def allocate_subjects(self, request, pk=None):
+        """按小组提交的课题志愿批量分配课题，dry_run 时只返回预览"""
+        try:
+            course = self.get_object()
+        except Http404:
+            raise Http404("课程不存在")
+        if course.subject_selection_mode != "preference":
+            raise ValidationError("本课程未开启志愿分配")
+        course_status = course.calculate_status()
+        if course_status == "in_progress":
+            raise ValidationError("课程正在进行中，无法分配课题")
+        if course_status == "completed":
+            raise ValidationError("课程已结束，无法分配课题")
+        serializer = AllocateSubjectsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = allocate_subjects(course, **serializer.validated_data)
+        return Response(report, status=status.HTTP_200_OK)
+    # endregion
+
+    # region 课程统计
+    @action(detail=True, methods=['get'])
+    @standard_response("获取课程统计成功")
+    def stats(self, request, pk=None):
+        """课程概览：学生、小组、选题、版本与提交的聚合统计"""
+        try:
+            course = self.get_object()
+        except Http404:
+            raise Http404("课程不存在")
+        return Response(get_course_stats(course), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    @standard_response("获取代码存储统计成功")
+    def storage(self, request, pk=None):
+        """课程代码内容的去重比例与节省的存储空间"""
+        try:
+            course = self.get_object()
+        except Http404:
+            raise Http404("课程不存在")
+        return Response(storage_stats(course.pk), status=status.HTTP_200_OK)
+    # endregion
+
+    # region 我的小组
+    @action(detail=True, methods=['get'])
+    @standard_response("获取我的课程信息成功")
+    def me(self, request, pk=None):
+        """当前学生在课程中的小组、所选课题和最新代码版本，一次查询完成"""
+        try:
+            course_id = uuid.UUID(str(pk))
+        except ValueError:
+            raise Http404("未查询到该课程")
+        subject = GroupSubject.objects.filter(group_id=OuterRef('group_id')).order_by('created_at')
+        version = GroupCodeVersion.objects.filter(group_id=OuterRef('group_id'), status='ready').order_by('-created_at', '-id')
+        size = (
+            Group.students.through.objects.filter(group_id=OuterRef('group_id'))
+            .order_by().values('group_id').annotate(total=Count('*')).values('total')
+        )
+        row = (
+            CourseMembership.objects.filter(course_id=course_id, user=request.user)
+            .values('group_id', group_name=F('group__name'), group_creator_id=F('group__creator_id'))
+            .annotate(
+                group_size=Subquery(size),
+                course_subject_id=Subquery(subject.values('course_subject_id')[:1]),
+                subject_title=Subquery(subject.values(title=Coalesce(
+                    'course_subject__private_subject__title', 'course_subject__public_subject__title'
+                ))[:1]),
+                version_id=Subquery(version.values('id')[:1]),
+                version_name=Subquery(version.values('version')[:1]),
+                version_created_at=Subquery(version.values('created_at')[:1]),
+            )
+            .first()
+        )
+        if row is None:
+            raise Http404("未查询到该课程")
+
+        data = {'course_id': course_id, 'group': None, 'subject': None, 'latest_version': None}
+        if row['group_id'] is not None:
+            data['group'] = {
+                'id': row['group_id'],
+                'name': row['group_name'],
+                'creator': row['group_creator_id'],
+                'is_creator': row['group_creator_id'] == request.user.pk,
+                'size': row['group_size'] or 0,
+            }
+        if row['course_subject_id'] is not None:
+            data['subject'] = {'course_subject_id': row['course_subject_id'], 'title': row['subject_title']}
+        if row['version_id'] is not None:
+            data['latest_version'] = {
+                'id': row['version_id'],
+                'version': row['version_name'],
+                'created_at': row['version_created_at'],
+            }
+        return Response(data, status=status.HTTP_200_OK)
+    # endregion
+
+    # region 批量导入名单
+    @action(detail=True, methods=['post'])
+    @standard_response("导入名单成功")
+    def import_roster(self, request, pk=None):
+        """批量导入课程学生名单，返回逐行导入结果"""
+        try:
+            course = self.get_object()
+        except Http404:
+            raise Http404("课程不存在")
+        if course.status == "completed":
+            raise ValidationError("该课程已结束，无法导入名单")
+
+        serializer = ImportRosterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = roster.import_roster(course, serializer.validated_data['user_ids'])
+        return Response(report, status=status.HTTP_200_OK)
+    # endregion
+
     # region 获取学生列表
     @action(detail=True, methods=['get'])
     @standard_response("获取学生列表成功")
@@ -394,16 +552,20 @@ class CourseViewSet(viewsets.ModelViewSet):
     def subjects_list(self, request, pk=None):
         """获取课程的所有课题"""
         course = self.get_object()
-        course_subjects = CourseSubject.objects.filter(course=course)
+        # 剩余名额由已选次数计数得出，不再逐个课题统计选题记录
+        course_subjects = CourseSubject.objects.filter(course=course).select_related(
+            'private_subject__creator', 'private_subject__reviewer', 'public_subject__creator'
+        )
+        context = {'request': request, 'course': course}
         
         # 分页
         page = self.paginate_queryset(course_subjects)
         if page is not None:
-            serializer = CourseSubjectSerializer(page, many=True, context={'request': request})
+            serializer = CourseSubjectSlotsSerializer(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
         
         # 如果没有分页，返回所有数据
-        serializer = CourseSubjectSerializer(course_subjects, many=True, context={'request': request})
+        serializer = CourseSubjectSlotsSerializer(course_subjects, many=True, context=context)
         return Response(serializer.data)
     # endregion
 
@@ -446,93 +608,113 @@ class CourseViewSet(viewsets.ModelViewSet):
         if course.status != 'completed':
             raise ValidationError("课程未结束，无法下载提交信息")
         
-        # 获取所有小组
-        groups = Group.objects.filter(course=course)
-        
-        # 创建内存缓冲区
-        buffer = BytesIO()
-        
-        try:
-            # 创建ZIP文件
-            import zipfile
-            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # 创建CSV内容
-                import csv
-                from io import StringIO
-                csv_buffer = StringIO()
-                writer = csv.writer(csv_buffer)
-                writer.writerow(['小组名称', '课题名称', '成员贡献'])
-                
-                # 遍历所有小组
-                for group in groups:
-                    try:
-                        submission = GroupSubmission.objects.get(group=group)
-                        group_subject = GroupSubject.objects.get(group=group)
-                        
-                        # 获取课题名称
-                        if group_subject.course_subject.subject_type == 'PRIVATE':
-                            subject_title = group_subject.course_subject.private_subject.title
-                        else:
-                            subject_title = group_subject.course_subject.public_subject.title
-                        
-                        # 获取成员贡献
-                        contributions = GroupSubmissionContribution.objects.filter(submission=submission)
-                        contribution_str = ', '.join([f"{c.student.name}({c.contribution}%)" for c in contributions])
-                        
-                        # 写入CSV
-                        writer.writerow([
-                            group.name,
-                            subject_title,
-                            contribution_str
-                        ])
-                        
-                        # 添加代码文件到ZIP
-                        code_version = submission.code_version
-                        if code_version.zip_file:
-                            from django.core.files.storage import default_storage
-                            with default_storage.open(code_version.zip_file.name) as f:
-                                zipf.writestr(
-                                    f"code/{group.name}/{group.name}.zip",
-                                    f.read()
-                                )
-                    except (GroupSubmission.DoesNotExist, GroupSubject.DoesNotExist):
-                        # 如果小组未提交或未选题，写入默认值
-                        writer.writerow([
-                            group.name,
-                            '未选题',
-                            '未提交(-1)'
-                        ])
-                
-                # 将CSV内容添加到ZIP
-                zipf.writestr('submissions.csv', csv_buffer.getvalue())
-        except Exception as e:
-            buffer.close()
-            raise e
-        
-        # 重置缓冲区位置
-        buffer.seek(0)
-        
-        # 创建支持关闭回调的FileResponse子类
-        class CleanupFileResponse(FileResponse):
-            def __init__(self, *args, buffer, **kwargs):
-                super().__init__(*args, **kwargs)
-                self.buffer = buffer
-            
-            def close(self):
-                super().close()
-                if not self.buffer.closed:
-                    self.buffer.close()
-
-        response = CleanupFileResponse(
-            buffer,
-            as_attachment=True,
-            filename=f"submissions_{course.name}.zip",
-            content_type='application/zip',
-            buffer=buffer  # 传递buffer引用
-        )
-        response['Content-Length'] = buffer.getbuffer().nbytes
-        
+        filename = f"submissions_{course.name}.zip"
+        export = CourseExport.objects.filter(course=course, status='ready').first()
+        if export is not None:
+            return self.export_file_response(request, export, filename)
+
+        # 还没有构建好的压缩包时请求后台构建，本次流式输出
+        request_course_export(course)
+        # 提交信息在开始输出前一次查询完成，输出过程中只读取存储中的代码 ZIP
+        csv_content, files = submission_entries(course)
+        response = StreamingHttpResponse(stream_archive(csv_content, files), content_type='application/zip')
+        response['Content-Disposition'] = content_disposition_header(True, filename)
         return response
+
+    @staticmethod
+    def parse_byte_range(request, size, etag):
+        """
+        解析 Range 请求头中的单个字节范围，返回 (start, end)，不需要按范围返回时返回 None
+
+        If-Range 与 ETag 不一致、格式无法解析或包含多个范围时返回整个文件；范围无法满足时返回 False
+        """
+        header = request.headers.get('Range')
+        if not header or request.headers.get('If-Range', etag) != etag:
+            return None
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', header.strip())
+        if not match or match.groups() == ('', ''):
+            return None
+        start, end = match.groups()
+        if not start:
+            # 后缀范围：最后 N 个字节
+            length = int(end)
+            return (max(size - length, 0), size - 1) if length and size else False
+        start, end = int(start), int(end) if end else None
+        if end is not None and end < start:
+            return None
+        if start >= size:
+            return False
+        return start, size - 1 if end is None else min(end, size - 1)
+
+    def export_file_response(self, request, export, filename):
+        """返回已构建的压缩包，支持 If-None-Match 与 Range 断点续传"""
+        etag = f'"{export.hash}"'
+        headers = {'ETag': etag, 'Accept-Ranges': 'bytes', 'Cache-Control': 'private, no-cache'}
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if '*' in if_none_match or etag in [value.removeprefix('W/') for value in if_none_match]:
+            return HttpResponseNotModified(headers=headers)
+
+        byte_range = self.parse_byte_range(request, export.size, etag)
+        if byte_range is False:
+            headers['Content-Range'] = f'bytes */{export.size}'
+            return HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+        file = export.file.open('rb')
+        if byte_range is None:
+            response = FileResponse(file, as_attachment=True, filename=filename, content_type='application/zip')
+        else:
+            start, end = byte_range
+            file.seek(start)
+            response = StreamingHttpResponse(
+                read_file_range(file, end - start + 1), status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type='application/zip',
+            )
+            response['Content-Disposition'] = content_disposition_header(True, filename)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{export.size}'
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def grade_export_response(self, courses, filename):
+        """按 ?format= 流式导出课程的成绩，每个学生一行"""
+        export_format = self.request.query_params.get('format')
+        if export_format not in GRADE_FORMATS:
+            raise ValidationError(f"不支持的导出格式，可选：{', '.join(GRADE_FORMATS)}")
+        content_type, _ = GRADE_FORMATS[export_format]
+        response = StreamingHttpResponse(stream_grades(courses, export_format), content_type=content_type)
+        response['Content-Disposition'] = content_disposition_header(True, f"{filename}.{export_format}")
+        return response
+
+    @action(detail=True, methods=['get', 'post'], content_negotiation_class=IgnoreFormatContentNegotiation)
+    @standard_response("获取课程导出状态成功")
+    def export(self, request, pk=None):
+        """
+        查询课程导出的构建状态；POST 请求构建（课程需已结束）
+
+        GET 带 ?format=csv|jsonl|xlsx 时改为流式导出课程的成绩
+        """
+        course = self.get_object()
+        if request.method == 'GET' and 'format' in request.query_params:
+            return self.grade_export_response(Course.objects.filter(pk=course.pk), f"grades_{course.name}")
+        if request.method == 'POST':
+            if course.status != 'completed':
+                raise ValidationError("课程未结束，无法导出提交信息")
+            export = request_course_export(course)
+            return Response(CourseExportSerializer(export).data, status=status.HTTP_202_ACCEPTED)
+        export = CourseExport.objects.filter(course=course).first()
+        if export is None:
+            raise Http404("课程导出不存在")
+        return Response(CourseExportSerializer(export).data)
+
+    @action(detail=False, methods=['get'], url_path='export', content_negotiation_class=IgnoreFormatContentNegotiation)
+    def export_grades(self, request):
+        """
+        跨课程导出成绩（?format=csv|jsonl|xlsx），教师导出自己的课程，管理员导出全部课程
+
+        支持课程列表的过滤参数，如 ?term_start=2025-02-01&term_end=2025-07-31 导出一个学期的课程
+        """
+        courses = self.filter_queryset(self.get_queryset())
+        return self.grade_export_response(courses, f"grades_{timezone.localdate():%Y%m%d}")
     # endregion
 
 # endregion
@@ -558,6 +740,12 @@ class GroupViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated, CanLeaveGroup]
         elif self.action == 'select_subject':
             permission_classes = [IsAuthenticated, CanSelectSubject]
+        elif self.action == 'preferences':
+            # 查看志愿与查看小组详情权限一致，提交志愿与选题权限一致
+            if self.request.method == 'GET':
+                permission_classes = [IsAuthenticated, CanSeeGroupDetail]
+            else:
+                permission_classes = [IsAuthenticated, CanSelectSubject]
         elif self.action == 'unselect_subject':
             permission_classes = [IsAuthenticated, CanUnselectSubject]
         elif self.action == 'submit_code':
@@ -584,12 +772,17 @@ class GroupViewSet(viewsets.ModelViewSet):
         """根据不同的操作设置不同的查询集"""
         user = self.request.user
         queryset = Group.objects.all()
+        # 列表和详情按固定的预取方案加载序列化所需的关联数据
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.with_detail()
+        elif self.action == 'join':
+            queryset = queryset.select_related('course')
         # 教师查询集
         if user.role == "TEACHER":
             return queryset.filter(course__teacher=user)
         # 学生查询集
         elif user.role == "STUDENT":
-            return queryset.filter(course__students=user)
+            return queryset.filter(course__memberships__user=user)
         return queryset
     # endregion
     
@@ -600,14 +793,14 @@ class GroupViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         course = serializer.validated_data['course']
         user = request.user
-        groups = Group.objects.filter(course=course)
         # 学生权限
         if user.role == 'STUDENT':
-            # 学生必须在课程中
-            if user not in course.students.all():
+            # 学生必须在课程中，一次查询同时得到所在小组
+            membership = CourseMembership.objects.filter(course=course, user=user).values('group_id').first()
+            if membership is None:
                 raise Http404("未查询到该课程")
             # 如果已经加入了小组，则无法创建小组
-            if groups.filter(students=user).exists():
+            if membership['group_id'] is not None:
                 raise ValidationError("您已经加入了小组")
         # 教师权限
         if user.role == "TEACHER" or user.role == "ADMIN":
@@ -637,7 +830,7 @@ class GroupViewSet(viewsets.ModelViewSet):
         user = request.user
         if user.role == "STUDENT":
             # 学生只能查看自己加入的课程的小组列表
-            if user not in course.students.all():
+            if not CourseMembership.objects.filter(course=course, user=user).exists():
                 raise Http404("未查询到该课程")
         elif user.role == "TEACHER":
             # 教师只能查看自己教授的课程的小组列表
@@ -683,35 +876,21 @@ class GroupViewSet(viewsets.ModelViewSet):
             group = self.get_object()
         except Http404:
             raise Http404("未查询到该小组")
-        course = group.course
-        user = request.user
-
-        # 验证用户是否已加入课程
-        if user not in course.students.all():
+        # 锁定名单行和小组行后条件写入，人数上限与一人一组由数据库裁决
+        result = roster.join_group(group, request.user)
+        if result == roster.NOT_ENROLLED:
             raise ValidationError("您未加入该课程，无法加入小组")
-
-        # 验证课程状态
-        if course.status == "in_progress":
+        if result == "in_progress":
             raise ValidationError("课程已开始，无法加入小组")
-        if course.status == "completed":
+        if result == "completed":
             raise ValidationError("课程已结束，无法加入小组")
-
-        # 验证小组是否已满
-        if group.students.count() >= course.max_group_size:
+        if result == roster.GROUP_FULL:
             raise ValidationError("小组人数已满，无法加入")
-
-        # 验证用户是否已加入该小组
-        if user in group.students.all():
+        if result == roster.ALREADY_IN_GROUP:
             raise ValidationError("您已经加入该小组")
-
-        # 验证用户是否已加入其他小组
-        if Group.objects.filter(course=course, students=user).exists():
+        if result == roster.IN_OTHER_GROUP:
             raise ValidationError("您已经加入了其他小组，无法重复加入")
 
-        # 加入小组
-        group.students.add(user)
-        group.save()
-
         return Response(None, status=status.HTTP_200_OK)
     # endregion
 
@@ -762,20 +941,14 @@ class GroupViewSet(viewsets.ModelViewSet):
             else:
                 if request_user != group.creator:
                     raise ValidationError("您不是组长，无法踢出学生")
-                if request_user not in course.students.all():
+                if not CourseMembership.objects.filter(course=course, user=request_user).exists():
                     raise ValidationError("您未加入该课程，无法踢出学生")
-                if payload_user not in course.students.all():
-                    raise ValidationError("该学生未加入该课程")
-                if payload_user not in group.students.all():
-                    raise ValidationError("该学生未加入该小组")
+                self.check_payload_membership(course, group, payload_user)
                 group.students.remove(payload_user)
                 group.save()
         # 教师发出请求
         elif request_user.role == "TEACHER" or request_user.role == "ADMIN":
-            if payload_user not in course.students.all():
-                raise ValidationError("该学生未加入该课程")
-            if payload_user not in group.students.all():
-                raise ValidationError("该学生未加入该小组")
+            self.check_payload_membership(course, group, payload_user)
             # 如果是组长，则需要重新指定组长
             if payload_user == group.creator:
                 group.students.remove(payload_user)
@@ -791,6 +964,15 @@ class GroupViewSet(viewsets.ModelViewSet):
                 group.save()
             group.save()
         return Response(None, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def check_payload_membership(course, group, payload_user):
+        """一次查询课程成员行，校验被移出的学生在课程和该小组中"""
+        membership = CourseMembership.objects.filter(course=course, user=payload_user).values('group_id').first()
+        if membership is None:
+            raise ValidationError("该学生未加入该课程")
+        if membership['group_id'] != group.pk:
+            raise ValidationError("该学生未加入该小组")
     # endregion
 
     # region 小组选题
@@ -825,27 +1007,64 @@ class GroupViewSet(viewsets.ModelViewSet):
         if course.status == "completed":
             raise ValidationError("课程已结束，无法选题")
         
-        # 验证小组是否已经选择了课题
-        if GroupSubject.objects.filter(group=group).exists():
+        # 志愿分配模式下由教师统一分配，学生不能直接选题
+        if course.subject_selection_mode == "preference" and request.user.role == "STUDENT":
+            raise ValidationError("本课程采用志愿分配，请提交课题志愿")
+
+        # 条件更新已选次数占用名额，成功后写入选题记录
+        result = selection.select_subject(group, course_subject)
+        if result == selection.GROUP_HAS_SUBJECT:
             raise ValidationError("小组已经选择了课题")
-        
-        # 验证课题是否已被选择超过最大次数
-        current_selections = GroupSubject.objects.filter(course_subject=course_subject).count()
-        if current_selections >= course.max_subject_selections:
+        if result == selection.SUBJECT_FULL:
             raise ValidationError(f"该课题已被选择超过最大次数（{course.max_subject_selections}次）")
         
-        # 创建小组选题
-        try:
-            GroupSubject.objects.create(
-                group=group,
-                course_subject=course_subject
-            )
-        except ValidationError as e:
-            raise ValidationError(str(e))
-        
         return Response(None, status=status.HTTP_201_CREATED)
     # endregion
 
+    # region 课题志愿
+    @action(detail=True, methods=['get', 'put'])
+    @standard_response("课题志愿操作成功")
+    def preferences(self, request, *args, **kwargs):
+        """查看或整体替换小组的课题志愿"""
+        try:
+            group = self.get_object()
+        except Http404:
+            raise Http404("未查询到该小组")
+        queryset = GroupSubjectPreference.objects.filter(group=group).select_related(
+            'course_subject__private_subject', 'course_subject__public_subject'
+        )
+        if request.method == 'GET':
+            return Response(SubjectPreferenceSerializer(queryset, many=True).data, status=status.HTTP_200_OK)
+
+        course = group.course
+        if course.subject_selection_mode != "preference":
+            raise ValidationError("本课程未开启志愿分配")
+        course_status = course.calculate_status()
+        if course_status == "in_progress":
+            raise ValidationError("课程正在进行中，无法提交志愿")
+        if course_status == "completed":
+            raise ValidationError("课程已结束，无法提交志愿")
+        if course.preference_deadline and timezone.now() > course.preference_deadline:
+            raise ValidationError("志愿提交已截止")
+        if GroupSubject.objects.filter(group=group).exists():
+            raise ValidationError("小组已经选择了课题")
+
+        serializer = SubmitPreferencesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_subject_ids = serializer.validated_data['course_subject_ids']
+        found = CourseSubject.objects.filter(course=course, id__in=course_subject_ids).count()
+        if found != len(course_subject_ids):
+            raise ValidationError("志愿中包含不属于该课程的课题")
+
+        with transaction.atomic():
+            GroupSubjectPreference.objects.filter(group=group).delete()
+            GroupSubjectPreference.objects.bulk_create([
+                GroupSubjectPreference(group=group, course_subject_id=course_subject_id, rank=rank)
+                for rank, course_subject_id in enumerate(course_subject_ids, 1)
+            ])
+        return Response(SubjectPreferenceSerializer(queryset, many=True).data, status=status.HTTP_200_OK)
+    # endregion
+
     # region 退选课题
     @action(detail=True, methods=['delete'])
     @standard_response("退选课题成功")
@@ -864,13 +1083,10 @@ class GroupViewSet(viewsets.ModelViewSet):
         if course.status == "completed":
             raise ValidationError("课程已结束，无法退选课题")
         
-        # 验证小组是否已经选择了课题
-        if not GroupSubject.objects.filter(group=group).exists():
+        # 删除小组选题并归还名额
+        if not selection.unselect_subject(group):
             raise ValidationError("小组未选择课题")
         
-        # 删除小组选题
-        GroupSubject.objects.filter(group=group).delete()
-        
         return Response(None, status=status.HTTP_204_NO_CONTENT)
     # endregion
 
@@ -897,7 +1113,7 @@ class GroupViewSet(viewsets.ModelViewSet):
             raise ValidationError("小组未选择课题，无法提交代码")
         
         # 验证用户是否在小组中
-        if request.user not in group.students.all():
+        if not CourseMembership.objects.filter(course_id=group.course_id, user=request.user, group=group).exists():
             raise ValidationError("您不在该小组中，无法提交代码")
         
         # 验证小组是否已经提交过代码
@@ -907,7 +1123,12 @@ class GroupViewSet(viewsets.ModelViewSet):
         # 创建提交记录
         serializer = self.get_serializer(data=request.data, context={'group': group})
         serializer.is_valid(raise_exception=True)
-        serializer.save(group=group)
+        with transaction.atomic():
+            # 锁住小组行，同时提交的请求依次执行，后到的请求能看到已创建的提交记录
+            Group.objects.select_for_update().filter(pk=group.pk).values_list('pk', flat=True).first()
+            if GroupSubmission.objects.filter(group=group).exists():
+                raise ValidationError("小组已经提交过代码")
+            serializer.save(group=group)
         
         return Response(None, status=status.HTTP_201_CREATED)
     # endregion
@@ -928,15 +1149,20 @@ class GroupCodeVersionViewSet(viewsets.ModelViewSet):
         group_id = self.kwargs.get('group_pk')
         if user.role == "STUDENT":
             # 学生只能查看自己加入的小组
-            return GroupCodeVersion.objects.filter(group_id=group_id, group__students=user)
+            queryset = GroupCodeVersion.objects.filter(group_id=group_id, group__memberships__user=user)
         elif user.role == "TEACHER":
             # 教师可以查看自己教授的课程的小组
-            return GroupCodeVersion.objects.filter(group_id=group_id, group__course__teacher=user)
+            queryset = GroupCodeVersion.objects.filter(group_id=group_id, group__course__teacher=user)
         elif user.role == "ADMIN":
             # 管理员可以查看所有小组
-            return GroupCodeVersion.objects.filter(group_id=group_id)
+            queryset = GroupCodeVersion.objects.filter(group_id=group_id)
         else:
             raise Http404("未查询到该小组")
+        if self.action == 'retrieve':
+            # 详情只返回文件清单，不读取文件内容
+            manifest = GroupCodeFile.objects.only('id', 'version_id', 'path', 'size', 'is_previewable', 'blob_id')
+            queryset = queryset.prefetch_related(Prefetch('files', queryset=manifest))
+        return queryset
         
     def get_permissions(self):
         """根据不同的操作设置不同的权限"""
@@ -963,7 +1189,7 @@ class GroupCodeVersionViewSet(viewsets.ModelViewSet):
         group_id = self.kwargs.get('group_pk')
         if user.role == "STUDENT":
             # 学生只能查看自己加入的小组
-            context['group'] = get_object_or_404(Group, id=group_id, students=user)
+            context['group'] = get_object_or_404(Group, id=group_id, memberships__user=user)
         elif user.role == "TEACHER":
             # 教师可以查看自己教授的课程的小组
             context['group'] = get_object_or_404(Group, id=group_id, course__teacher=user)
@@ -998,70 +1224,12 @@ class GroupCodeVersionViewSet(viewsets.ModelViewSet):
         if GroupSubmission.objects.filter(group=group).exists():
             raise ValidationError("小组已经提交过代码，无法上传代码")
         
-        # 创建版本
-        version = serializer.save(group_id=group.id)
+        # 同名的失败版本不再保留，允许重新上传
+        GroupCodeVersion.objects.filter(group=group, version=serializer.validated_data['version'], status='failed').delete()
+        # 只保存 ZIP，解析由后台任务完成，客户端通过 status 接口轮询进度
+        version = serializer.save(group_id=group.id, status='processing')
         
-        try:
-            # 解压ZIP文件
-            import zipfile
-            import os
-            from django.conf import settings
-            
-            # 创建临时目录
-            temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp', str(version.id))
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # 解压文件
-            with zipfile.ZipFile(version.zip_file, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # 处理文件
-            total_files = 0
-            total_size = 0
-            
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, temp_dir)
-                    
-                    # 跳过Mac系统特有的隐藏文件
-                    if '__MACOSX' in relative_path or relative_path.startswith('._') or '.DS_Store' in relative_path:
-                        continue
-                    
-                    # 获取文件大小
-                    file_size = os.path.getsize(file_path)
-                    total_size += file_size
-                    
-                    # 创建文件记录
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                    except UnicodeDecodeError:
-                        content = None
-                    
-                    GroupCodeFile.objects.create(
-                        version=version,
-                        path=relative_path,
-                        content=content,
-                        size=file_size
-                    )
-                    total_files += 1
-            
-            # 更新版本信息
-            version.total_files = total_files
-            version.total_size = total_size
-            version.save()
-            
-            # 清理临时文件
-            import shutil
-            shutil.rmtree(temp_dir)
-            
-            return Response(GroupCodeVersionSerializer(version).data, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
-            # 如果处理失败，删除版本
-            version.delete()
-            raise ValidationError(f"处理ZIP文件失败: {str(e)}")
+        return Response(GroupCodeVersionStatusSerializer(version).data, status=status.HTTP_202_ACCEPTED)
     
     @standard_response("获取版本列表成功")
     def list(self, request, *args, **kwargs):
@@ -1076,4 +1244,137 @@ class GroupCodeVersionViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
     
     # endregion
+
+    # region 处理状态
+    @action(detail=True, methods=['get'], url_path='status')
+    @standard_response("获取版本处理状态成功")
+    def processing_status(self, request, *args, **kwargs):
+        """获取版本的处理状态、进度与失败原因"""
+        version = self.get_object()
+        return Response(GroupCodeVersionStatusSerializer(version).data)
+    # endregion
+
+    # region 版本比较
+    @action(detail=True, methods=['get'], url_path=r'diff/(?P<other_pk>[^/.]+)')
+    @standard_response("获取版本差异成功")
+    def diff(self, request, other_pk=None, *args, **kwargs):
+        """
+        比较两个版本：不带 path 时返回新增、删除、修改的文件列表；
+        带 path 时返回该文件的 unified diff（context 为上下文行数）
+        """
+        base = self.get_object()
+        try:
+            target = self.get_queryset().filter(pk=uuid.UUID(str(other_pk))).first()
+        except ValueError:
+            target = None
+        if target is None:
+            raise Http404("未查询到要比较的版本")
+        if base.status != 'ready' or target.status != 'ready':
+            raise ValidationError("只能比较处理完成的版本")
+
+        comparison = compare_versions(base.id, target.id)
+        path = request.query_params.get('path')
+        if path is None:
+            return Response({'base': str(base.id), 'target': str(target.id), **comparison})
+
+        entry = next(
+            (e for kind in ('modified', 'added', 'removed') for e in comparison[kind] if e['path'] == path), None
+        )
+        if entry is None:
+            raise Http404("两个版本中该文件没有变化")
+        try:
+            context = min(int(request.query_params.get('context', DEFAULT_CONTEXT)), MAX_CONTEXT)
+        except ValueError:
+            raise ValidationError("context 必须为整数")
+        if context < 0:
+            raise ValidationError("context 不能小于0")
+        # 没有内容 hash 的一侧若文件存在，说明不是文本文件
+        binary = (entry['old_file_id'] is not None and entry['old_hash'] is None) or \
+            (entry['new_file_id'] is not None and entry['new_hash'] is None)
+        return Response({
+            **entry,
+            'binary': binary,
+            'hunks': [] if binary else diff_hunks(entry['old_hash'], entry['new_hash'], context),
+        })
+    # endregion
+
+
+class GroupCodeFileViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """代码文件视图集，按需获取单个文件的内容"""
+    queryset = GroupCodeFile.objects.all()
+    serializer_class = GroupCodeFileSerializer
+    permission_classes = [IsAuthenticated]
+
+    # region 代码文件视图集配置
+    def get_queryset(self):
+        """根据小组ID与版本ID过滤文件，文件内容在 ETag 不匹配时才读取"""
+        user = self.request.user
+        try:
+            version_id = uuid.UUID(str(self.kwargs.get('version_pk')))
+            group_id = uuid.UUID(str(self.kwargs.get('group_pk')))
+        except ValueError:
+            raise Http404("未查询到该文件")
+        queryset = GroupCodeFile.objects.filter(version_id=version_id, version__group_id=group_id)
+        if user.role == "STUDENT":
+            # 学生只能查看自己加入的小组
+            queryset = queryset.filter(version__group__memberships__user=user)
+        elif user.role == "TEACHER":
+            # 教师可以查看自己教授的课程的小组
+            queryset = queryset.filter(version__group__course__teacher=user)
+        elif user.role != "ADMIN":
+            raise Http404("未查询到该文件")
+        return queryset.select_related('blob').defer('blob__content')
+
+    @staticmethod
+    def parse_line_range(request):
+        """读取 start_line、end_line（从 1 开始，包含两端），未指定时返回 None"""
+        bounds = []
+        for name in ('start_line', 'end_line'):
+            value = request.query_params.get(name)
+            if value in (None, ''):
+                bounds.append(None)
+                continue
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValidationError(f"{name} 必须是正整数")
+            if value < 1:
+                raise ValidationError(f"{name} 必须是正整数")
+            bounds.append(value)
+        start, end = bounds
+        if start is not None and end is not None and start > end:
+            raise ValidationError("start_line 不能大于 end_line")
+        return start, end
+    # endregion
+
+    # region 文件内容
+    @standard_response("获取文件内容成功")
+    def retrieve(self, request, *args, **kwargs):
+        """获取文件内容，支持 If-None-Match 与按行截取"""
+        start, end = self.parse_line_range(request)
+        file = self.get_object()
+        # 内容按 SHA-256 寻址，hash 不变内容就不变，可以作为强 ETag；非文本文件使用文件ID
+        tag = file.blob_id or str(file.id)
+        if start is not None or end is not None:
+            tag = f'{tag}:{start or 1}-{end or ""}'
+        etag = f'"{tag}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        # If-None-Match 使用弱比较
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if '*' in if_none_match or etag in [value.removeprefix('W/') for value in if_none_match]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = self.get_serializer(file).data
+        content = data['content']
+        data.update(total_lines=None, start_line=None, end_line=None)
+        if content is not None:
+            lines = content.splitlines(keepends=True)
+            data['total_lines'] = len(lines)
+            if start is not None or end is not None:
+                start = start or 1
+                end = min(end or len(lines), len(lines))
+                data['content'] = ''.join(lines[start - 1:end])
+                data.update(start_line=start, end_line=end)
+        return Response(data, headers=headers)
+    # endregion
 # endregion
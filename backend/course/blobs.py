@@ -0,0 +1,89 @@
+"""
+代码文件内容存储
+
+文件内容按 SHA-256 保存在 CodeBlob 中，GroupCodeFile 只引用内容，同一内容在所有版本、小组间只保存一份。
+不维护引用计数：删除版本只删除文件记录，不再被引用的内容由 collect_garbage 定期清理（manage.py gc_code_blobs）。
+
+写入与清理并发时：
+- 写入方在插入文件记录前以 FOR KEY SHARE 锁住本批引用的内容行，清理方以 FOR UPDATE SKIP LOCKED 跳过被锁的行
+- 加锁时发现内容刚被清理的，写入方在同一事务中重新插入
+"""
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.db.models.functions import Coalesce
+from .models import CodeBlob, GroupCodeFile
+
+GC_BATCH_SIZE = 1000
+
+
+# region 写入
+def store_blobs(blobs):
+    """
+    保存内容（已存在的跳过），并锁住这些内容行直到当前事务结束
+
+    须在事务中调用，之后在同一事务中插入引用它们的文件记录
+    """
+    pending = {blob.hash: blob for blob in blobs}
+    while pending:
+        # 按 hash 顺序插入，并发写入相同内容的事务不会互相死锁
+        CodeBlob.objects.bulk_create(sorted(pending.values(), key=lambda blob: blob.hash), ignore_conflicts=True)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT hash FROM {CodeBlob._meta.db_table} WHERE hash = ANY(%s) FOR KEY SHARE',
+                [list(pending)],
+            )
+            locked = {row[0] for row in cursor.fetchall()}
+        pending = {key: blob for key, blob in pending.items() if key not in locked}
+# endregion
+
+
+# region 清理
+def collect_garbage(batch_size=GC_BATCH_SIZE):
+    """按批删除不再被任何文件引用的内容，返回 (删除数, 释放的字节数)"""
+    blob_table = CodeBlob._meta.db_table
+    file_table = GroupCodeFile._meta.db_table
+    deleted = freed = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                DELETE FROM {blob_table} WHERE hash IN (
+                    SELECT b.hash FROM {blob_table} AS b
+                    WHERE NOT EXISTS (SELECT 1 FROM {file_table} AS f WHERE f.blob_id = b.hash)
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING size
+                """,
+                [batch_size],
+            )
+            sizes = [row[0] for row in cursor.fetchall()]
+        deleted += len(sizes)
+        freed += sum(sizes)
+        if len(sizes) < batch_size:
+            return deleted, freed
+# endregion
+
+
+# region 去重统计
+def storage_stats(course_id):
+    """
+    课程代码内容的去重统计，共 2 条查询
+
+    logical_size 为课程所有版本文件内容大小之和（不去重时需要保存的大小），
+    stored_size 为这些文件引用的不同内容的大小之和（与其他课程共享的内容也计入）
+    """
+    files = GroupCodeFile.objects.filter(version__group__course_id=course_id, blob__isnull=False)
+    logical = files.aggregate(files=Count('id'), size=Coalesce(Sum('blob__size'), 0))
+    stored = CodeBlob.objects.filter(Exists(files.filter(blob_id=OuterRef('pk')))).aggregate(
+        blobs=Count('pk'), size=Coalesce(Sum('size'), 0)
+    )
+    return {
+        'files': logical['files'],
+        'blobs': stored['blobs'],
+        'logical_size': logical['size'],
+        'stored_size': stored['size'],
+        'saved_size': logical['size'] - stored['size'],
+        'dedup_ratio': round(logical['size'] / stored['size'], 2) if stored['size'] else None,
+    }
+# endregion
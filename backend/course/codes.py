@@ -0,0 +1,61 @@
+"""
+课程码分配
+
+不再先查询再插入：直接生成随机码并在保存点中插入，只有撞上唯一约束时才回滚保存点换码重试。
+并发创建由数据库唯一约束裁决，正常情况下每门课程只需一次 INSERT
+"""
+import secrets
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+
+DEFAULT_LENGTH = 6
+DEFAULT_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+MAX_LENGTH = 10  # 与 Course.course_code 的 max_length 一致
+MAX_ATTEMPTS = 32
+
+
+class CourseCodeExhausted(Exception):
+    """多次重试后仍无法分配课程码（码空间接近耗尽）"""
+
+
+def get_code_config(length=None, alphabet=None):
+    """读取课程码长度和字符集配置"""
+    length = length or getattr(settings, 'COURSE_CODE_LENGTH', DEFAULT_LENGTH)
+    alphabet = alphabet or getattr(settings, 'COURSE_CODE_ALPHABET', DEFAULT_ALPHABET)
+    if not 0 < length <= MAX_LENGTH:
+        raise ImproperlyConfigured(f'COURSE_CODE_LENGTH 必须在 1 到 {MAX_LENGTH} 之间')
+    if len(set(alphabet)) < 2:
+        raise ImproperlyConfigured('COURSE_CODE_ALPHABET 至少需要两个不同的字符')
+    return length, alphabet
+
+
+def generate_course_code(length=None, alphabet=None):
+    """生成一个随机课程码"""
+    length, alphabet = get_code_config(length, alphabet)
+    return ''.join(secrets.choice(alphabet) for _ in range(length))
+
+
+def is_course_code_conflict(error):
+    """判断 IntegrityError 是否由课程码唯一约束引起"""
+    diag = getattr(error.__cause__, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None) or str(error)
+    return 'course_code' in constraint
+
+
+def allocate_course_code(insert, length=None, alphabet=None, max_attempts=MAX_ATTEMPTS):
+    """
+    调用 insert(code) 插入记录，课程码冲突时在保存点内回滚并换码重试
+
+    返回插入成功前的尝试次数（1 表示一次成功）
+    """
+    for attempt in range(1, max_attempts + 1):
+        code = generate_course_code(length, alphabet)
+        try:
+            with transaction.atomic():
+                insert(code)
+            return attempt
+        except IntegrityError as e:
+            if not is_course_code_conflict(e):
+                raise
+    raise CourseCodeExhausted(f'尝试 {max_attempts} 次后仍无法分配课程码')
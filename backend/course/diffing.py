@@ -0,0 +1,131 @@
+"""
+代码版本比较
+
+- 文件级比较在数据库中按路径连接两个版本的文件记录、比较内容 hash 与大小，只取回有变化的文件，不读取文件内容
+- 单个文件的差异（unified diff 的 hunk）在请求该文件时才生成，按两份内容的 hash 缓存，不同小组、版本间共享
+- 版本处理完成后不再变化，结果缓存在 code-diff 缓存中，由缓存的 MAX_ENTRIES 与 TIMEOUT 控制容量与过期（LRU）
+"""
+import difflib
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from django.db import connection
+from .models import CodeBlob, GroupCodeFile
+
+CACHE_ALIAS = 'code-diff'
+DEFAULT_CONTEXT = 3
+MAX_CONTEXT = 20
+
+
+def diff_cache():
+    try:
+        return caches[CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return cache
+
+
+# region 文件级比较
+COMPARE_SQL = """
+    SELECT COALESCE(o.path, n.path), o.id, n.id, o.blob_id, n.blob_id, o.size, n.size
+    FROM (SELECT path, id, blob_id, size FROM {file_table} WHERE version_id = %s) o
+    FULL JOIN (SELECT path, id, blob_id, size FROM {file_table} WHERE version_id = %s) n
+        ON o.path = n.path
+    WHERE o.id IS NULL OR n.id IS NULL OR o.blob_id IS DISTINCT FROM n.blob_id OR o.size <> n.size
+    ORDER BY 1
+"""
+
+
+def _side(file_id, blob_id, size):
+    return (str(file_id), blob_id, size) if file_id else None
+
+
+def _entry(path, old=None, new=None):
+    return {
+        'path': path,
+        'old_file_id': old[0] if old else None,
+        'new_file_id': new[0] if new else None,
+        'old_hash': old[1] if old else None,
+        'new_hash': new[1] if new else None,
+        'old_size': old[2] if old else None,
+        'new_size': new[2] if new else None,
+    }
+
+
+def compare_versions(old_version_id, new_version_id):
+    """
+    比较两个版本的文件列表，返回新增、删除、修改的文件与未变化的文件数
+
+    文本文件按内容 hash 判断是否修改；非文本文件没有 hash，按大小判断。
+    比较在数据库中按路径连接两个版本的文件记录完成，只返回有变化的文件
+    """
+    key = f'versions:{old_version_id}:{new_version_id}'
+    store = diff_cache()
+    result = store.get(key)
+    if result is not None:
+        return result
+
+    with connection.cursor() as cursor:
+        file_table = connection.ops.quote_name(GroupCodeFile._meta.db_table)
+        cursor.execute(COMPARE_SQL.format(file_table=file_table), [old_version_id, new_version_id])
+        rows = cursor.fetchall()
+    added, removed, modified = [], [], []
+    for path, old_id, new_id, old_hash, new_hash, old_size, new_size in rows:
+        old, new = _side(old_id, old_hash, old_size), _side(new_id, new_hash, new_size)
+        if old is None:
+            added.append(_entry(path, new=new))
+        elif new is None:
+            removed.append(_entry(path, old=old))
+        else:
+            modified.append(_entry(path, old, new))
+    total = GroupCodeFile.objects.filter(version_id=new_version_id).count()
+    result = {
+        'added': added, 'removed': removed, 'modified': modified,
+        'unchanged': total - len(added) - len(modified),
+    }
+    store.set(key, result)
+    return result
+# endregion
+
+
+# region 文件差异
+def _lines(content):
+    return content.splitlines() if content else []
+
+
+def diff_hunks(old_hash, new_hash, context=DEFAULT_CONTEXT):
+    """
+    生成两份内容之间的 unified diff，按 hunk 返回
+
+    每个 hunk 包含 @@ 行中的起止行号与带 ' '、'-'、'+' 前缀的行；hash 为 None 表示文件不存在或不是文本
+    """
+    key = f'hunks:{old_hash}:{new_hash}:{context}'
+    store = diff_cache()
+    hunks = store.get(key)
+    if hunks is not None:
+        return hunks
+
+    contents = dict(CodeBlob.objects.filter(pk__in=[h for h in (old_hash, new_hash) if h]).values_list('hash', 'content'))
+    old_lines, new_lines = _lines(contents.get(old_hash)), _lines(contents.get(new_hash))
+    hunks = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for group in matcher.get_grouped_opcodes(context):
+        first, last = group[0], group[-1]
+        old_count, new_count = last[2] - first[1], last[4] - first[3]
+        # 与 unified diff 相同：没有行时起始行号为前一行
+        hunk = {
+            'old_start': first[1] + 1 if old_count else first[1],
+            'old_lines': old_count,
+            'new_start': first[3] + 1 if new_count else first[3],
+            'new_lines': new_count,
+            'lines': [],
+        }
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                hunk['lines'].extend(' ' + line for line in old_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                hunk['lines'].extend('-' + line for line in old_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                hunk['lines'].extend('+' + line for line in new_lines[j1:j2])
+        hunks.append(hunk)
+    store.set(key, hunks)
+    return hunks
+# endregion
@@ -0,0 +1,463 @@
+"""
+课程提交导出
+
+- 提交信息 CSV 由一条带预取的查询生成，导出过程中不再按小组查询
+- 压缩包以生成器逐块输出：各小组的代码 ZIP 按固定大小分块从存储中复制，不整体读入内存，峰值内存与课程规模无关
+- 代码 ZIP 本身已压缩，按 STORED 写入；单个条目或整个压缩包超过 4GB 时使用 ZIP64
+
+已结束课程的压缩包由后台任务预先构建（manage.py build_course_exports），保存在媒体存储中：
+- 课程结束后自动加入队列，下载或 export 接口也可请求构建；待构建的 CourseExport 本身就是队列，以 SKIP LOCKED 领取
+- 文件名与 ETag 使用内容的 SHA-256，重复下载只读取一次文件，并支持 Range 断点续传
+- 提交、贡献度、选题或小组变化时由信号调用 invalidate_course_export，修订号加一并重新排队；
+  构建完成时修订号已变化的结果直接丢弃
+
+成绩导出（每个选课学生一行，未提交的学生对应列为空）以 csv、jsonl 或 xlsx 流式输出：
+- 所有关联在一条 SQL 中完成，以服务端游标（iterator）分批读取，内存占用与行数无关
+- xlsx 使用内联字符串逐行写入工作表，不依赖第三方库，也不需要先在内存中建好整个工作簿
+"""
+import csv
+import datetime
+import hashlib
+import io
+import itertools
+import json
+import logging
+import re
+import tempfile
+import time
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, FilteredRelation, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Course, CourseExport, CourseMembership, Group, GroupSubject, GroupSubmission, GroupSubmissionContribution
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+CSV_HEADER = ['小组名称', '课题名称', '成员贡献']
+
+PROCESSING, READY, FAILED = 'processing', 'ready', 'failed'
+DEFAULT_STALE_SECONDS = 600
+HEARTBEAT_SECONDS = 30
+MAX_ATTEMPTS = 3
+
+GRADE_FIELDS = [
+    ('course_id', '课程ID'),
+    ('course_name', '课程名称'),
+    ('student_id', '学号'),
+    ('student_name', '姓名'),
+    ('group', '小组名称'),
+    ('subject', '课题名称'),
+    ('submitted_at', '提交时间'),
+    ('contribution', '贡献度(%)'),
+    ('version_id', '代码版本ID'),
+]
+GRADE_CHUNK_SIZE = 2000
+
+
+class _StreamBuffer:
+    """只追加的输出缓冲，ZipFile 写入后由生成器取走已写入的数据"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+# region 导出内容
+def _subject_title(group_subject):
+    course_subject = group_subject.course_subject
+    if course_subject.subject_type == 'PRIVATE':
+        return course_subject.private_subject.title
+    return course_subject.public_subject.title
+
+
+def submission_entries(course):
+    """
+    返回提交信息 CSV 的内容与各小组代码 ZIP 的 [(压缩包内路径, 存储中的文件名), ...]
+
+    未提交或未选题的小组只写入默认值
+    """
+    groups = Group.objects.filter(course=course).prefetch_related(
+        Prefetch('submissions', queryset=GroupSubmission.objects.select_related('code_version').prefetch_related(
+            Prefetch('contributions', queryset=GroupSubmissionContribution.objects.select_related('student'))
+        )),
+        Prefetch('group_subjects', queryset=GroupSubject.objects.select_related(
+            'course_subject__private_subject', 'course_subject__public_subject'
+        )),
+    )
+    csv_buffer = io.StringIO()
+    writer = csv.writer(csv_buffer)
+    writer.writerow(CSV_HEADER)
+    files = []
+    for group in groups:
+        submissions, group_subjects = group.submissions.all(), group.group_subjects.all()
+        if not submissions or not group_subjects:
+            writer.writerow([group.name, '未选题', '未提交(-1)'])
+            continue
+        submission = submissions[0]
+        contributions = ', '.join(f"{c.student.name}({c.contribution}%)" for c in submission.contributions.all())
+        writer.writerow([group.name, _subject_title(group_subjects[0]), contributions])
+        if submission.code_version.zip_file:
+            files.append((f"code/{group.name}/{group.name}.zip", submission.code_version.zip_file.name))
+    return csv_buffer.getvalue(), files
+# endregion
+
+
+# region 流式压缩包
+def stream_archive(csv_content, files, storage=default_storage, chunk_size=CHUNK_SIZE):
+    """逐块生成包含各小组代码 ZIP 与 submissions.csv 的压缩包"""
+    output = _StreamBuffer()
+    date_time = time.localtime()[:6]
+    # 输出不可 seek，zipfile 会在每个条目的数据之后写入数据描述符
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+        for arcname, name in files:
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            # 预先给出大小，超过 4GB 的条目在本地文件头中使用 ZIP64
+            info.file_size = storage.size(name)
+            with storage.open(name, 'rb') as source, archive.open(info, 'w') as target:
+                while chunk := source.read(chunk_size):
+                    target.write(chunk)
+                    yield output.drain()
+        info = zipfile.ZipInfo('submissions.csv', date_time=date_time)
+        archive.writestr(info, csv_content, compress_type=zipfile.ZIP_DEFLATED)
+    yield output.drain()
+
+
+def read_file_range(file, length, chunk_size=CHUNK_SIZE):
+    """从文件当前位置分块读取 length 个字节，读完或响应关闭时关闭文件"""
+    with file:
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+# endregion
+
+
+# region 后台构建
+def update_export(export, **fields):
+    """只更新指定字段，同时同步到实例"""
+    fields.setdefault('updated_at', timezone.now())
+    CourseExport.objects.filter(pk=export.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(export, name, value)
+
+
+def request_course_export(course):
+    """请求构建课程的导出，已在队列中或已完成时不做改动；失败过的导出重新排队"""
+    export, created = CourseExport.objects.get_or_create(course=course)
+    if not created and export.status == FAILED:
+        CourseExport.objects.filter(pk=export.pk, status=FAILED).update(
+            status=PROCESSING, attempts=0, error='', heartbeat_at=None, updated_at=timezone.now()
+        )
+        export.refresh_from_db()
+    return export
+
+
+def invalidate_course_export(*course_ids):
+    """课程的提交信息变化后重新排队构建"""
+    CourseExport.objects.filter(course_id__in=[pk for pk in course_ids if pk]).update(
+        status=PROCESSING, revision=F('revision') + 1, attempts=0, error='', heartbeat_at=None,
+        updated_at=timezone.now(),
+    )
+
+
+def enqueue_completed_courses(today=None):
+    """已结束、有提交且还没有导出的课程加入队列，返回加入的课程数"""
+    courses = (
+        Course.objects.filter_current_status('completed', today)
+        .filter(export__isnull=True, course_groups__submissions__isnull=False)
+        .values_list('pk', flat=True)
+        .distinct()
+    )
+    created = CourseExport.objects.bulk_create(
+        [CourseExport(course_id=pk) for pk in courses], ignore_conflicts=True
+    )
+    return len(created)
+
+
+def claim_export(now=None):
+    """
+    领取一个待构建的导出，没有时返回 None
+
+    心跳超过 COURSE_EXPORT_STALE_SECONDS 的导出会被重新领取
+    """
+    now = now or timezone.now()
+    stale_seconds = getattr(settings, 'COURSE_EXPORT_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+    stale = now - datetime.timedelta(seconds=stale_seconds)
+    with transaction.atomic():
+        export = (
+            CourseExport.objects.select_for_update(skip_locked=True)
+            .filter(Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=stale), status=PROCESSING)
+            .order_by('updated_at')
+            .first()
+        )
+        if export is None:
+            return None
+        update_export(export, attempts=export.attempts + 1, heartbeat_at=now)
+    return export
+
+
+def build_export(export):
+    """
+    构建压缩包并保存到媒体存储，返回是否标记为 ready
+
+    构建期间修订号变化（提交信息已改变）时丢弃本次结果，导出保持排队状态
+    """
+    revision = export.revision
+    csv_content, files = submission_entries(export.course)
+    digest, size = hashlib.sha256(), 0
+    with tempfile.TemporaryFile() as output:
+        heartbeat = time.monotonic()
+        for chunk in stream_archive(csv_content, files):
+            output.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            if time.monotonic() - heartbeat > HEARTBEAT_SECONDS:
+                update_export(export, heartbeat_at=timezone.now())
+                heartbeat = time.monotonic()
+        # 按内容命名，内容没有变化时沿用已保存的文件
+        name = f'course_exports/{export.course_id}/{digest.hexdigest()}.zip'
+        saved = not default_storage.exists(name)
+        if saved:
+            output.seek(0)
+            name = default_storage.save(name, File(output))
+
+    previous = export.file.name
+    updated = CourseExport.objects.filter(pk=export.pk, revision=revision).update(
+        status=READY, file=name, size=size, hash=digest.hexdigest(), error='', heartbeat_at=None,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        if saved:
+            default_storage.delete(name)
+        return False
+    if previous and previous != name:
+        default_storage.delete(previous)
+    export.refresh_from_db()
+    return True
+
+
+def process_export(export):
+    """构建已领取的导出，返回是否成功"""
+    if export.attempts > MAX_ATTEMPTS:
+        update_export(export, status=FAILED, error="构建导出失败: 多次构建均未完成", heartbeat_at=None)
+        return False
+    try:
+        return build_export(export)
+    except Exception as e:
+        logger.exception('构建课程 %s 的导出失败', export.course_id)
+        update_export(export, status=FAILED, error=f"构建导出失败: {str(e)}", heartbeat_at=None)
+        return False
+
+
+def process_pending_exports(limit=None):
+    """依次领取并构建待构建的导出，直到队列为空或达到 limit，返回处理的导出数"""
+    processed = 0
+    while limit is None or processed < limit:
+        export = claim_export()
+        if export is None:
+            break
+        process_export(export)
+        processed += 1
+    return processed
+# endregion
+
+
+# region 成绩导出
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="成绩" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+# XML 1.0 不允许的控制字符
+XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def grade_rows(courses, chunk_size=GRADE_CHUNK_SIZE):
+    """
+    按课程、小组、学号顺序逐行返回成绩，每个选课学生一行，各列与 GRADE_FIELDS 对应
+
+    courses 为课程查询集。以课程成员为主表，左连接所在小组、小组最近一次提交与该学生在这次提交中的贡献度，
+    未分组、未提交或没有贡献度记录的学生也导出，缺少的列为 None；
+    课题取小组最近的选题，与提交压缩包中的 CSV 一致。
+    所有关联在一条 SQL 中完成，PostgreSQL 上 iterator 使用服务端游标，每次只取 chunk_size 行
+    """
+    subject = (
+        GroupSubject.objects.filter(group_id=OuterRef('group_id'))
+        .order_by('-created_at')
+        .values(title=Coalesce('course_subject__private_subject__title', 'course_subject__public_subject__title'))[:1]
+    )
+    latest_submission = (
+        GroupSubmission.objects.filter(group_id=OuterRef('group_id'), is_submitted=True)
+        .order_by(F('submitted_at').desc(nulls_last=True), '-created_at')
+        .values('pk')[:1]
+    )
+    return (
+        CourseMembership.objects
+        .filter(course__in=courses.values('pk'))
+        .annotate(
+            submission=FilteredRelation(
+                'group__submissions', condition=Q(group__submissions__pk=Subquery(latest_submission)),
+            ),
+            contribution=FilteredRelation(
+                'user__submission_contributions',
+                condition=Q(user__submission_contributions__submission_id=F('submission__pk')),
+            ),
+            subject_title=Subquery(subject),
+        )
+        .order_by('course__start_date', 'course_id', F('group__name').asc(nulls_last=True), 'user__user_id')
+        .values_list(
+            'course_id', 'course__name', 'user__user_id', 'user__name', 'group__name', 'subject_title',
+            'submission__submitted_at', 'contribution__contribution', 'submission__code_version_id',
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _grade_values(row):
+    """
+    把查询结果转换为可直接输出的值：UUID 转为字符串，提交时间转为本地时间的 ISO 格式，
+    缺少的小组、课题、提交时间与版本为空字符串；贡献度保留 None，由各格式分别输出为空
+    """
+    course_id, course_name, student_id, student_name, group, subject, submitted_at, contribution, version_id = row
+    if submitted_at is not None:
+        submitted_at = timezone.localtime(submitted_at).isoformat()
+    return [
+        str(course_id), course_name, student_id, student_name, group or '', subject or '',
+        submitted_at or '', contribution, str(version_id) if version_id else '',
+    ]
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+
+def stream_grades_csv(rows, chunk_size=GRADE_CHUNK_SIZE):
+    """逐批生成 CSV，首行为 GRADE_FIELDS 的中文列名"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([label for _, label in GRADE_FIELDS])
+    yield buffer.getvalue().encode()
+    for batch in _batches(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_grade_values(row) for row in batch)
+        yield buffer.getvalue().encode()
+
+
+def stream_grades_jsonl(rows, chunk_size=GRADE_CHUNK_SIZE):
+    """逐批生成 JSON Lines，每行一个以 GRADE_FIELDS 为键的对象，贡献度为数字"""
+    keys = [key for key, _ in GRADE_FIELDS]
+    for batch in _batches(rows, chunk_size):
+        lines = []
+        for row in batch:
+            record = dict(zip(keys, _grade_values(row)))
+            if record['contribution'] is not None:
+                record['contribution'] = float(record['contribution'])
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        yield ''.join(lines).encode()
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(XML_ILLEGAL_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_grades_xlsx(rows, chunk_size=GRADE_CHUNK_SIZE):
+    """逐批生成只有一个工作表的 xlsx，首行为 GRADE_FIELDS 的中文列名"""
+    output = _StreamBuffer()
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in (
+            ('[Content_Types].xml', XLSX_CONTENT_TYPES),
+            ('_rels/.rels', XLSX_ROOT_RELS),
+            ('xl/workbook.xml', XLSX_WORKBOOK),
+            ('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS),
+        ):
+            archive.writestr(zipfile.ZipInfo(name, date_time=date_time), content, compress_type=zipfile.ZIP_DEFLATED)
+        info = zipfile.ZipInfo('xl/worksheets/sheet1.xml', date_time=date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, 'w') as sheet:
+            sheet.write((XLSX_SHEET_HEAD + _xlsx_row(label for _, label in GRADE_FIELDS)).encode())
+            for batch in _batches(rows, chunk_size):
+                sheet.write(''.join(_xlsx_row(_grade_values(row)) for row in batch).encode())
+                yield output.drain()
+            sheet.write(XLSX_SHEET_TAIL.encode())
+    yield output.drain()
+
+
+GRADE_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', stream_grades_csv),
+    'jsonl': ('application/x-ndjson', stream_grades_jsonl),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', stream_grades_xlsx),
+}
+
+
+def stream_grades(courses, export_format, chunk_size=GRADE_CHUNK_SIZE):
+    """以 GRADE_FORMATS 中的格式逐批生成课程的成绩导出"""
+    _, writer = GRADE_FORMATS[export_format]
+    return writer(grade_rows(courses, chunk_size), chunk_size)
+# endregion
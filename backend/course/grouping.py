@@ -0,0 +1,300 @@
+"""
+自动分组
+
+把课程中尚未分组的学生一次性分入满足 min_group_size/max_group_size 的小组：
+
+- 先把已有的未满小组补到最小人数，剩余学生按最少小组数均衡切分，仍放不下的再填入有空位的小组
+- together 中的学生视为一个整体分配；若其中有人已在某个小组，整体加入该小组
+- apart 中的学生不会被分到同一小组（包括已有小组中的成员）
+- seed 决定学生的打乱顺序，相同输入和 seed 得到相同结果，预览后可用同一 seed 正式执行
+
+读取固定数量的查询，写入在一个事务中批量完成，与学生人数无关
+"""
+import heapq
+import random
+from collections import defaultdict
+from django.db import transaction
+from .models import Course, CourseMembership, Group, group_name_prefix, next_group_number, sync_membership_groups
+from .stats import invalidate_course_stats
+
+
+class GroupingError(ValueError):
+    """分组约束无法满足"""
+
+
+class _Bin:
+    """分组过程中的一个小组（已有或新建）"""
+    __slots__ = ('group_id', 'name', 'existing', 'size', 'target', 'capacity', 'apart', 'added', 'order')
+
+    def __init__(self, order, size, target, capacity, group_id=None, name=None, apart=None):
+        self.order = order
+        self.existing = group_id is not None
+        self.group_id = group_id
+        self.name = name
+        self.size = size
+        self.target = target
+        self.capacity = capacity
+        self.apart = set(apart or ())
+        self.added = []
+
+    def fits(self, unit, limit):
+        return self.size + len(unit.members) <= limit and not (self.apart & unit.apart)
+
+    def add(self, unit):
+        self.added.extend(unit.members)
+        self.size += len(unit.members)
+        self.apart |= unit.apart
+
+
+class _Unit:
+    """必须分在同一小组的一组学生"""
+    __slots__ = ('members', 'apart', 'pinned')
+
+    def __init__(self, members, apart, pinned=None):
+        self.members = members
+        self.apart = apart
+        self.pinned = pinned
+
+
+# region 分组规划
+def _split_count(students, min_size, max_size):
+    """把 students 名学生切成若干新组：优先最少组数且每组不低于最小人数，返回 (组数, 各组目标人数)"""
+    if students <= 0:
+        return 0, []
+    fewest = -(-students // max_size)
+    most = students // min_size
+    count = fewest if fewest <= most else most
+    if count == 0:
+        return 0, []
+    base, extra = divmod(students, count)
+    return count, [min(base + (index < extra), max_size) for index in range(count)]
+
+
+def _build_units(pool, grouped, together, apart_of):
+    """按 together 约束合并学生（并查集），返回分配单元列表，顺序与 pool 一致"""
+    pool_set = set(pool)
+    parent = {}
+
+    def find(user_id):
+        while parent.get(user_id, user_id) != user_id:
+            user_id = parent[user_id]
+        return user_id
+
+    pinned = {}
+    for members in together:
+        members = [user_id for user_id in dict.fromkeys(members) if user_id in pool_set or user_id in grouped]
+        groups = {grouped[user_id] for user_id in members if user_id in grouped}
+        if len(groups) > 1:
+            raise GroupingError('同组约束中的学生已分属不同小组')
+        free = [user_id for user_id in members if user_id in pool_set]
+        if not free:
+            continue
+        root = find(free[0])
+        for user_id in free[1:]:
+            other = find(user_id)
+            if other != root:
+                parent[other] = root
+                if other in pinned:
+                    pinned.setdefault(root, pinned.pop(other))
+        if groups:
+            group_id = groups.pop()
+            if pinned.setdefault(root, group_id) != group_id:
+                raise GroupingError('同组约束中的学生已分属不同小组')
+
+    members_of = defaultdict(list)
+    for user_id in pool:
+        members_of[find(user_id)].append(user_id)
+
+    units = []
+    for root, members in members_of.items():
+        apart = set()
+        for user_id in members:
+            tags = apart_of.get(user_id, frozenset())
+            if apart & tags:
+                raise GroupingError('同组约束与分开约束冲突')
+            apart |= tags
+        units.append(_Unit(members, apart, pinned.get(root)))
+    return units
+
+
+def plan_groups(course, together=(), apart=(), seed=0, fill_existing=True):
+    """计算分组方案，不写数据库"""
+    min_size, max_size = course.min_group_size, course.max_group_size
+    if min_size > max_size:
+        raise GroupingError('课程的最小小组人数大于最大小组人数')
+
+    enrolled = Course.students.through.objects.filter(course_id=course.pk).order_by('user_id')
+    pool = list(enrolled.values_list('user_id', flat=True))
+    grouped = dict(
+        Group.students.through.objects.filter(group__course_id=course.pk).values_list('user_id', 'group_id')
+    )
+    pool = [user_id for user_id in pool if user_id not in grouped]
+
+    apart_of = defaultdict(set)
+    for index, members in enumerate(apart):
+        for user_id in set(members):
+            apart_of[user_id].add(index)
+
+    units = _build_units(pool, grouped, together, apart_of)
+    oversized = [unit for unit in units if len(unit.members) > max_size]
+    if oversized:
+        raise GroupingError(f'同组约束人数超过小组人数上限（{max_size}人）')
+
+    # 已有小组
+    bins, bins_by_id = [], {}
+    if fill_existing:
+        members_of = defaultdict(list)
+        for user_id, group_id in grouped.items():
+            members_of[group_id].append(user_id)
+        existing = Group.objects.filter(course_id=course.pk).order_by('created_at', 'id').values_list('id', 'name')
+        for group_id, name in existing:
+            members = members_of.get(group_id, [])
+            size = len(members)
+            tags = set().union(*(apart_of.get(user_id, frozenset()) for user_id in members))
+            item = _Bin(len(bins), size, max(size, min_size), max_size, group_id, name, tags)
+            bins.append(item)
+            bins_by_id[group_id] = item
+
+    # 新建小组数量：补足已有小组最小人数后剩余的学生
+    top_up = sum(item.target - item.size for item in bins)
+    _, targets = _split_count(len(pool) - top_up, min_size, max_size)
+    for target in targets:
+        bins.append(_Bin(len(bins), 0, target, max_size))
+
+    if not fill_existing:
+        for unit in units:
+            unit.pinned = None
+    # 打乱后按人数从多到少分配，需加入指定小组的单元优先，同人数时有分开约束的单元优先
+    random.Random(seed).shuffle(units)
+    units.sort(key=lambda unit: (unit.pinned is None, -len(unit.members), not unit.apart))
+
+    unplaced = []
+    heap = [(-(item.target - item.size), item.order) for item in bins]
+    heapq.heapify(heap)
+    for unit in units:
+        if unit.pinned is not None:
+            item = bins_by_id.get(unit.pinned)
+            if item is not None and item.fits(unit, item.capacity):
+                item.add(unit)
+                heapq.heappush(heap, (-(item.target - item.size), item.order))
+            else:
+                unplaced.extend(unit.members)
+            continue
+        item = _take(heap, bins, unit)
+        if item is None:
+            # 目标人数内放不下时，放入仍有空位的小组
+            item = next((candidate for candidate in bins if candidate.fits(unit, candidate.capacity)), None)
+        if item is None:
+            unplaced.extend(unit.members)
+            continue
+        item.add(unit)
+        heapq.heappush(heap, (-(item.target - item.size), item.order))
+
+    return {
+        'seed': seed,
+        'students': len(pool),
+        'bins': [item for item in bins if item.added],
+        'unplaced': unplaced,
+        'min_size': min_size,
+        'max_size': max_size,
+    }
+
+
+def _take(heap, bins, unit):
+    """取目标空位最多且满足约束的小组，跳过的小组放回堆中"""
+    skipped, found = [], None
+    while heap:
+        key, order = heapq.heappop(heap)
+        item = bins[order]
+        if -key != item.target - item.size:
+            continue  # 过期条目
+        if item.fits(unit, item.target):
+            found = item
+            break
+        skipped.append((key, order))
+        if -key < len(unit.members):
+            break  # 剩余小组的目标空位都更少
+    for entry in skipped:
+        heapq.heappush(heap, entry)
+    return found
+# endregion
+
+
+# region 执行分组
+def form_groups(course, together=(), apart=(), seed=None, fill_existing=True, dry_run=False):
+    """
+    自动分组；dry_run 时只返回预览，不写数据库
+
+    正式执行时先锁住课程行，与手动建组、其他自动分组互斥，
+    再锁住课程成员行和已有小组行，与学生加入小组互斥，之后在同一事务中批量写入小组和成员
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 31)
+    options = {'together': together, 'apart': apart, 'seed': seed, 'fill_existing': fill_existing}
+    if dry_run:
+        return _report(course, plan_groups(course, **options), dry_run=True)
+
+    with transaction.atomic():
+        Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True).first()
+        # 与加入小组相同的加锁顺序：先课程成员行，再小组行
+        list(CourseMembership.objects.select_for_update().filter(course_id=course.pk).values_list('pk', flat=True))
+        list(Group.objects.select_for_update().filter(course_id=course.pk).values_list('pk', flat=True))
+        plan = plan_groups(course, **options)
+        new_bins = [item for item in plan['bins'] if item.group_id is None]
+        if new_bins:
+            last = next_group_number(course.pk, len(new_bins))
+            groups = []
+            for number, item in enumerate(new_bins, last - len(new_bins) + 1):
+                group = Group(
+                    course_id=course.pk,
+                    name=f'{group_name_prefix(course)}{number}',
+                    creator_id=item.added[0],
+                    max_students=plan['max_size'],
+                    min_students=plan['min_size'],
+                )
+                item.group_id, item.name = group.id, group.name
+                groups.append(group)
+            Group.objects.bulk_create(groups, batch_size=1000)
+        Membership = Group.students.through
+        memberships = [Membership(group_id=item.group_id, user_id=user_id) for item in plan['bins'] for user_id in item.added]
+        Membership.objects.bulk_create(memberships, batch_size=1000)
+        # bulk_create 不触发 m2m_changed，一次性回填课程成员所在小组
+        sync_membership_groups(
+            CourseMembership.objects.filter(course_id=course.pk, user_id__in=[item.user_id for item in memberships])
+        )
+        invalidate_course_stats(course.pk)
+    return _report(course, plan, dry_run=False)
+
+
+def _report(course, plan, dry_run):
+    """整理分组结果；预览时按当前编号计数推算新小组名称"""
+    bins = plan['bins']
+    number = course.group_sequence
+    groups = []
+    for item in bins:
+        name = item.name
+        if name is None:
+            number += 1
+            name = f'{group_name_prefix(course)}{number}'
+        groups.append({
+            'id': item.group_id,
+            'name': name,
+            'existing': item.existing,
+            'size': item.size,
+            'added': item.added,
+        })
+    return {
+        'dry_run': dry_run,
+        'seed': plan['seed'],
+        'summary': {
+            'students': plan['students'],
+            'placed': plan['students'] - len(plan['unplaced']),
+            'unplaced': len(plan['unplaced']),
+            'new_groups': sum(1 for item in bins if not item.existing),
+            'filled_groups': sum(1 for item in bins if item.existing),
+            'below_min_groups': sum(1 for item in bins if item.size < plan['min_size']),
+        },
+        'unplaced': plan['unplaced'],
+        'groups': groups,
+    }
+# endregion
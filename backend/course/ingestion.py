@@ -0,0 +1,208 @@
+"""
+代码版本 ZIP 入库
+
+直接按 ZIP 中央目录逐个读取条目，不解压到磁盘：
+- __MACOSX、._* 与 .DS_Store 在读取内容之前就按文件名过滤
+- 每个条目以固定大小的块流式解码（与 open(..., encoding='utf-8') 相同的换行处理），非 UTF-8 文件在第一次解码失败时停止读取
+- 是否可预览按扩展名直接计算，文件记录按批 bulk_create，内存占用只与单批大小有关
+- 文件内容按 SHA-256 写入 CodeBlob（见 blobs.py），与之前版本相同的内容不再重复保存
+
+上传接口只保存 ZIP 并将版本标记为 processing，解析由后台任务完成（manage.py process_code_versions）：
+- 待处理的版本本身就是任务队列，以 SELECT ... FOR UPDATE SKIP LOCKED 领取，可同时运行多个进程
+- 每写入一批文件记录就提交并更新已处理数量与心跳时间，接口可轮询进度
+- 心跳超时的版本（进程中断）会被重新领取，失败时由后台任务清理文件记录与 ZIP 并记录失败原因
+"""
+import datetime
+import io
+import logging
+import zipfile
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .blobs import store_blobs
+from .models import CodeBlob, GroupCodeFile, GroupCodeVersion
+
+logger = logging.getLogger(__name__)
+
+PROCESSING = 'processing'
+READY = 'ready'
+FAILED = 'failed'
+
+READ_CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 500
+# 单批待写入内容的总字符数上限，超过时提前写入
+BATCH_MAX_CHARS = 32 * 1024 * 1024
+# 超过该时间没有进度的版本视为处理进程已中断，可被重新领取
+DEFAULT_STALE_SECONDS = 600
+# 超过该次数仍未处理完成的版本直接标记为失败
+MAX_ATTEMPTS = 3
+
+
+# region 条目过滤
+def normalize_path(name):
+    """与 extractall 一致地规范化条目路径：去掉开头的 /、. 与 .. 片段（反斜杠也视为分隔符），目录返回空字符串"""
+    if name.endswith('/'):
+        return ''
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+    return '/'.join(parts)
+
+
+def is_ignored(path):
+    """Mac 系统生成的隐藏文件"""
+    return '__MACOSX' in path or path.startswith('._') or '.DS_Store' in path
+
+
+def iter_entries(archive):
+    """按中央目录顺序返回需要入库的 (路径, ZipInfo)，同名条目以最后一个为准（与解压覆盖的结果相同）"""
+    entries = {}
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        path = normalize_path(info.filename)
+        if not path or is_ignored(path):
+            continue
+        entries.pop(path, None)
+        entries[path] = info
+    return entries.items()
+# endregion
+
+
+# region 内容解码
+def read_text(archive, info, chunk_size=READ_CHUNK_SIZE):
+    """按块解码条目内容，不是 UTF-8 文本时返回 None"""
+    with archive.open(info) as raw, io.TextIOWrapper(raw, encoding='utf-8') as reader:
+        parts = []
+        try:
+            while True:
+                chunk = reader.read(chunk_size)
+                if not chunk:
+                    break
+                parts.append(chunk)
+        except UnicodeDecodeError:
+            return None
+    return ''.join(parts)
+# endregion
+
+
+# region 入库
+def update_version(version, **fields):
+    """只更新指定字段，同时同步到实例"""
+    fields.setdefault('updated_at', timezone.now())
+    GroupCodeVersion.objects.filter(pk=version.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(version, name, value)
+
+
+def write_batch(files, blobs):
+    """在同一事务中写入一批内容与引用它们的文件记录，已保存过的内容不再重复写入"""
+    with transaction.atomic():
+        store_blobs(blobs.values())
+        GroupCodeFile.objects.bulk_create(files)
+
+
+def ingest_version(version, batch_size=BATCH_SIZE):
+    """
+    读取版本的 ZIP 文件并批量写入文件记录，完成后将版本标记为 ready
+
+    开始时按中央目录写入文件总数与总大小，之后每写入一批提交一次并更新已处理数量，
+    失败时已写入的记录由调用方清理（见 process_version）
+    返回 (文件数, 总字节数)；ZIP 损坏时抛出 zipfile.BadZipFile
+    """
+    with version.zip_file.open('rb') as stream, zipfile.ZipFile(stream) as archive:
+        entries = list(iter_entries(archive))
+        total_files = len(entries)
+        total_size = sum(info.file_size for _, info in entries)
+        update_version(version, total_files=total_files, total_size=total_size, processed_files=0, processed_size=0)
+
+        processed_files = processed_size = 0
+        batch, blobs, batch_chars = [], {}, 0
+        for path, info in entries:
+            content = read_text(archive, info)
+            blob = CodeBlob.from_content(content) if content is not None else None
+            if blob is not None:
+                blobs[blob.hash] = blob
+                batch_chars += len(content)
+            batch.append(GroupCodeFile(
+                version_id=version.pk,
+                path=path,
+                blob_id=blob.hash if blob else None,
+                size=info.file_size,
+                is_previewable=GroupCodeFile.is_previewable_path(path),
+            ))
+            processed_files += 1
+            processed_size += info.file_size
+            if len(batch) >= batch_size or batch_chars >= BATCH_MAX_CHARS:
+                write_batch(batch, blobs)
+                batch, blobs, batch_chars = [], {}, 0
+                update_version(
+                    version, processed_files=processed_files, processed_size=processed_size,
+                    heartbeat_at=timezone.now(),
+                )
+        if batch:
+            write_batch(batch, blobs)
+        update_version(
+            version, status=READY, processed_files=processed_files, processed_size=processed_size,
+            error='', heartbeat_at=None,
+        )
+    return total_files, total_size
+# endregion
+
+
+# region 后台处理
+def claim_version(now=None):
+    """
+    领取一个待处理的版本，没有时返回 None
+
+    SKIP LOCKED 使并发的处理进程不会领取同一版本；心跳超过 CODE_INGESTION_STALE_SECONDS 的版本会被重新领取
+    """
+    now = now or timezone.now()
+    stale_seconds = getattr(settings, 'CODE_INGESTION_STALE_SECONDS', DEFAULT_STALE_SECONDS)
+    stale = now - datetime.timedelta(seconds=stale_seconds)
+    with transaction.atomic():
+        version = (
+            GroupCodeVersion.objects.select_for_update(skip_locked=True)
+            .filter(Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=stale), status=PROCESSING)
+            .order_by('created_at')
+            .first()
+        )
+        if version is None:
+            return None
+        update_version(version, attempts=version.attempts + 1, heartbeat_at=now)
+    return version
+
+
+def fail_version(version, reason):
+    """清理已写入的文件记录与上传的 ZIP，保留版本记录用于查询失败原因"""
+    GroupCodeFile.objects.filter(version_id=version.pk).delete()
+    version.zip_file.delete(save=False)
+    update_version(version, status=FAILED, error=reason, zip_file='', heartbeat_at=None)
+
+
+def process_version(version):
+    """处理已领取的版本，返回是否成功"""
+    # 重新领取的版本先清理上次中断时写入的记录
+    GroupCodeFile.objects.filter(version_id=version.pk).delete()
+    if version.attempts > MAX_ATTEMPTS:
+        fail_version(version, "处理ZIP文件失败: 多次处理均未完成")
+        return False
+    try:
+        ingest_version(version)
+    except Exception as e:
+        logger.exception('处理代码版本 %s 失败', version.pk)
+        fail_version(version, f"处理ZIP文件失败: {str(e)}")
+        return False
+    return True
+
+
+def process_pending_versions(limit=None):
+    """依次领取并处理待处理的版本，直到队列为空或达到 limit，返回处理的版本数"""
+    processed = 0
+    while limit is None or processed < limit:
+        version = claim_version()
+        if version is None:
+            break
+        process_version(version)
+        processed += 1
+    return processed
+# endregion
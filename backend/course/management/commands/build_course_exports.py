@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from course.exports import enqueue_completed_courses, process_pending_exports
+
+
+class Command(BaseCommand):
+    help = '后台构建已结束课程的提交导出压缩包，可同时运行多个进程'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='构建完当前待构建的导出后退出')
+        parser.add_argument('--interval', type=float, default=10.0, help='队列为空时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            enqueue_completed_courses()
+            processed = process_pending_exports()
+            self.stdout.write(self.style.SUCCESS(f'已构建 {processed} 个课程导出'))
+            return
+        while True:
+            close_old_connections()
+            enqueue_completed_courses()
+            if not process_pending_exports():
+                time.sleep(options['interval'])
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from course.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+    help = '清理不再被任何代码文件引用的内容，可由定时任务每日执行'
+
+    def handle(self, *args, **options):
+        deleted, freed = collect_garbage()
+        self.stdout.write(self.style.SUCCESS(f'已清理 {deleted} 个未引用的代码内容，释放 {freed} 字节'))
@@ -0,0 +1,46 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from course.models import Course
+from course.roster import parse_roster_rows, import_roster, RosterFormatError
+
+
+class Command(BaseCommand):
+    help = '从 CSV/JSON 名单批量导入学生；未指定 --course 时名单需包含 course_code 列，可一次导入多门课程'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='名单文件路径')
+        parser.add_argument('--course', dest='course_code', help='课程码，名单中所有学生导入该课程')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = parse_roster_rows(f.read(), options['path'])
+        except OSError as e:
+            raise CommandError(f'无法读取名单文件: {e}')
+        except RosterFormatError as e:
+            raise CommandError(str(e))
+
+        # 按课程码分组
+        user_ids_by_course = defaultdict(list)
+        for row in rows:
+            course_code = options['course_code'] or row.get('course_code')
+            if not course_code:
+                raise CommandError('未指定 --course 时名单必须包含 course_code 列')
+            user_ids_by_course[course_code].append(row['user_id'])
+
+        courses = Course.objects.in_bulk(list(user_ids_by_course), field_name='course_code')
+        missing = set(user_ids_by_course) - set(courses)
+        if missing:
+            raise CommandError(f'课程码不存在: {", ".join(sorted(missing))}')
+
+        # 所有课程在同一个事务中导入
+        with transaction.atomic():
+            for course_code, user_ids in user_ids_by_course.items():
+                report = import_roster(courses[course_code], user_ids)
+                summary = ', '.join(f'{key}={value}' for key, value in report['summary'].items())
+                self.stdout.write(f'{course_code}: {summary}')
+                for row in report['rows']:
+                    if row['result'] not in ('enrolled', 'already_enrolled'):
+                        self.stdout.write(f'  第 {row["row"]} 行 {row["user_id"]}: {row["result"]}')
+        self.stdout.write(self.style.SUCCESS('名单导入完成'))
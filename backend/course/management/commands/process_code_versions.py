@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from course.ingestion import process_pending_versions
+
+
+class Command(BaseCommand):
+    help = '后台解析上传的代码版本 ZIP，可同时运行多个进程'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前待处理的版本后退出')
+        parser.add_argument('--interval', type=float, default=2.0, help='队列为空时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = process_pending_versions()
+            self.stdout.write(self.style.SUCCESS(f'已处理 {processed} 个代码版本'))
+            return
+        while True:
+            close_old_connections()
+            if not process_pending_versions():
+                time.sleep(options['interval'])
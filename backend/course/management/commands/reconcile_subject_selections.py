@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from course.models import Course
+from course.selection import reconcile_selection_counts
+
+
+class Command(BaseCommand):
+    help = '按选题记录修复课程课题的已选次数计数，可由定时任务定期执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', dest='course_codes', help='课程码，只修复指定课程（可重复）')
+
+    def handle(self, *args, **options):
+        course_ids = None
+        if options['course_codes']:
+            found = dict(Course.objects.filter(course_code__in=options['course_codes']).values_list('course_code', 'pk'))
+            missing = [code for code in options['course_codes'] if code not in found]
+            if missing:
+                raise CommandError(f'课程码不存在: {", ".join(missing)}')
+            course_ids = list(found.values())
+        repaired = reconcile_selection_counts(course_ids)
+        self.stdout.write(self.style.SUCCESS(f'已修复 {repaired} 个课题的已选次数'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from course.models import Course
+
+
+class Command(BaseCommand):
+    help = '按开始/结束日期批量同步课程状态，可由定时任务每日执行'
+
+    def handle(self, *args, **options):
+        updated = Course.objects.sync_status()
+        self.stdout.write(self.style.SUCCESS(f'已同步 {updated} 门课程的状态'))
@@ -0,0 +1,21 @@
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Course
+
+
+class CourseStatusSyncMiddleware:
+    """
+    课程状态同步中间件
+    每个日期边界后的第一个请求触发一次批量状态同步，之后的请求只做一次缓存检查
+    """
+    cache_key_prefix = 'course-status-synced'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        today = timezone.now().date()
+        # cache.add 只在键不存在时写入成功，保证每天只同步一次
+        if cache.add(f'{self.cache_key_prefix}:{today.isoformat()}', True, timeout=60 * 60 * 24):
+            Course.objects.sync_status(today=today)
+        return self.get_response(request)
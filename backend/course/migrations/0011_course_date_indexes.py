@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0010_groupsubmissioncontribution'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['start_date'], name='course_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['end_date'], name='course_end_date_idx'),
+        ),
+    ]
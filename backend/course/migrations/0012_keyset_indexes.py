@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0011_course_date_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['created_at', 'id'], name='course_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['course', 'created_at', 'id'], name='group_course_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupcodeversion',
+            index=models.Index(fields=['group', 'created_at', 'id'], name='version_group_created_id_idx'),
+        ),
+    ]
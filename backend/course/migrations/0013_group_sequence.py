@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:47
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def init_group_sequence(apps, schema_editor):
+    """以现有小组数初始化编号计数"""
+    Course = apps.get_model('course', 'Course')
+    Group = apps.get_model('course', 'Group')
+    counts = Group.objects.filter(course_id=OuterRef('pk')).order_by().values('course_id').annotate(total=Count('*')).values('total')
+    Course.objects.update(group_sequence=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0012_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='group_sequence',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='小组编号计数'),
+        ),
+        migrations.RunPython(init_group_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:53
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0013_group_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='preference_deadline',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='志愿提交截止时间'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='subject_selection_mode',
+            field=models.CharField(choices=[('first_come', '先到先得'), ('preference', '志愿分配')], default='first_come', max_length=20, verbose_name='选题方式'),
+        ),
+        migrations.CreateModel(
+            name='GroupSubjectPreference',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='志愿顺序')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('course_subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='preferences', to='course.coursesubject', verbose_name='课程课题')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_preferences', to='course.group', verbose_name='小组')),
+            ],
+            options={
+                'verbose_name': '小组课题志愿',
+                'verbose_name_plural': '小组课题志愿',
+                'ordering': ['group', 'rank'],
+                'unique_together': {('group', 'course_subject'), ('group', 'rank')},
+            },
+        ),
+    ]
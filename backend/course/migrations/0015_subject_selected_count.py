@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:02
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def init_selected_count(apps, schema_editor):
+    """以现有选题记录初始化已选次数"""
+    CourseSubject = apps.get_model('course', 'CourseSubject')
+    GroupSubject = apps.get_model('course', 'GroupSubject')
+    counts = GroupSubject.objects.filter(course_subject_id=OuterRef('pk')).order_by().values('course_subject_id').annotate(total=Count('*')).values('total')
+    CourseSubject.objects.update(selected_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0014_subject_preferences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursesubject',
+            name='selected_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='已选次数'),
+        ),
+        migrations.RunPython(init_selected_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def init_membership_groups(apps, schema_editor):
+    """按现有小组成员关系填充课程成员所在小组"""
+    CourseMembership = apps.get_model('course', 'CourseMembership')
+    Group = apps.get_model('course', 'Group')
+    current = (
+        Group.students.through.objects.filter(group__course_id=models.OuterRef('course_id'), user_id=models.OuterRef('user_id'))
+        .values('group_id')[:1]
+    )
+    CourseMembership.objects.update(group=models.Subquery(current))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0015_subject_selected_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # 沿用 Course.students 自动生成的中间表，只改变模型状态
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='CourseMembership',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='course.course', verbose_name='课程')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_memberships', to=settings.AUTH_USER_MODEL, verbose_name='学生')),
+                    ],
+                    options={
+                        'verbose_name': '课程成员',
+                        'verbose_name_plural': '课程成员',
+                        'db_table': 'course_course_students',
+                        'unique_together': {('course', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='course',
+                    name='students',
+                    field=models.ManyToManyField(blank=True, related_name='enrolled_courses', through='course.CourseMembership', to=settings.AUTH_USER_MODEL, verbose_name='学生'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='coursemembership',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='memberships', to='course.group', verbose_name='小组'),
+        ),
+        migrations.RunPython(init_membership_groups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:17
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def init_processed(apps, schema_editor):
+    """已有版本均已同步处理完成"""
+    GroupCodeVersion = apps.get_model('course', 'GroupCodeVersion')
+    GroupCodeVersion.objects.update(processed_files=F('total_files'), processed_size=F('total_size'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0016_course_membership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupcodeversion',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='处理次数'),
+        ),
+        migrations.AddField(
+            model_name='groupcodeversion',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='失败原因'),
+        ),
+        migrations.AddField(
+            model_name='groupcodeversion',
+            name='processed_files',
+            field=models.IntegerField(default=0, verbose_name='已处理文件数'),
+        ),
+        migrations.AddField(
+            model_name='groupcodeversion',
+            name='processed_size',
+            field=models.BigIntegerField(default=0, verbose_name='已处理大小(字节)'),
+        ),
+        migrations.AddField(
+            model_name='groupcodeversion',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='最近处理时间'),
+        ),
+        migrations.AddField(
+            model_name='groupcodeversion',
+            name='status',
+            field=models.CharField(choices=[('processing', '处理中'), ('ready', '已完成'), ('failed', '处理失败')], default='ready', max_length=20, verbose_name='处理状态'),
+        ),
+        migrations.AddIndex(
+            model_name='groupcodeversion',
+            index=models.Index(condition=models.Q(('status', 'processing')), fields=['created_at'], name='version_processing_idx'),
+        ),
+        migrations.RunPython(init_processed, migrations.RunPython.noop),
+    ]
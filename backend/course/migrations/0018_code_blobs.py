@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# 在数据库中按 UTF-8 编码计算 SHA-256，与 CodeBlob.from_content 一致；不把内容读到 Python 里
+FORWARD_SQL = [
+    """
+    INSERT INTO course_codeblob (hash, content, size, created_at)
+    SELECT DISTINCT ON (hash) hash, content, octet_length(content), now()
+    FROM (
+        SELECT encode(sha256(convert_to(content, 'UTF8')), 'hex') AS hash, content
+        FROM course_groupcodefile WHERE content IS NOT NULL
+    ) AS contents
+    ON CONFLICT (hash) DO NOTHING
+    """,
+    """
+    UPDATE course_groupcodefile SET blob_id = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+    WHERE content IS NOT NULL
+    """,
+]
+
+REVERSE_SQL = [
+    """
+    UPDATE course_groupcodefile AS f SET content = b.content
+    FROM course_codeblob AS b WHERE f.blob_id = b.hash
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0017_code_version_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('content', models.TextField(verbose_name='文件内容')),
+                ('size', models.BigIntegerField(verbose_name='内容大小(字节)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '代码内容',
+                'verbose_name_plural': '代码内容',
+            },
+        ),
+        migrations.AddField(
+            model_name='groupcodefile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='course.codeblob', verbose_name='文件内容'),
+        ),
+        migrations.RunSQL(FORWARD_SQL, REVERSE_SQL),
+        migrations.RemoveField(
+            model_name='groupcodefile',
+            name='content',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:46
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0018_code_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseExport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('processing', '构建中'), ('ready', '已完成'), ('failed', '构建失败')], default='processing', max_length=20, verbose_name='构建状态')),
+                ('revision', models.PositiveIntegerField(default=0, editable=False, verbose_name='修订号')),
+                ('file', models.FileField(blank=True, max_length=255, upload_to='course_exports/', verbose_name='压缩包')),
+                ('size', models.BigIntegerField(default=0, verbose_name='大小(字节)')),
+                ('hash', models.CharField(blank=True, max_length=64, verbose_name='SHA-256')),
+                ('error', models.TextField(blank=True, verbose_name='失败原因')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='构建次数')),
+                ('heartbeat_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='最近构建时间')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='export', to='course.course', verbose_name='课程')),
+            ],
+            options={
+                'verbose_name': '课程导出',
+                'verbose_name_plural': '课程导出',
+                'indexes': [models.Index(condition=models.Q(('status', 'processing')), fields=['updated_at'], name='export_processing_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0019_course_exports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStatsVersion',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats_version', serialize=False, to='course.course', verbose_name='课程')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='版本号')),
+            ],
+            options={
+                'verbose_name': '课程统计版本',
+                'verbose_name_plural': '课程统计版本',
+            },
+        ),
+    ]
@@ -1,36 +1,107 @@
-from django.db import models
+from django.db import connection, models, transaction
 from accounts.models import User
+import hashlib
 import uuid
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Coalesce
+from .codes import allocate_course_code
 
 # region 课程模型
+class CourseQuerySet(models.QuerySet):
+    """课程查询集，提供基于日期的状态计算与批量同步"""
+
+    @staticmethod
+    def status_condition(status, today=None):
+        """返回与 Course.calculate_status 等价的日期过滤条件"""
+        today = today or timezone.now().date()
+        if status == 'not_started':
+            return models.Q(start_date__gt=today)
+        if status == 'completed':
+            return models.Q(end_date__lt=today)
+        return models.Q(start_date__lte=today, end_date__gte=today)
+
+    def with_current_status(self, today=None):
+        """以 SQL 表达式计算当前状态，只读，不写数据库"""
+        return self.annotate(
+            computed_status=models.Case(
+                *[
+                    models.When(self.status_condition(value, today), then=models.Value(value))
+                    for value, _ in Course.STATUS_CHOICES
+                ],
+                output_field=models.CharField(),
+            )
+        )
+
+    def with_member_counts(self):
+        """以相关子查询注解学生数、小组数和课题数，避免多表 JOIN 计数导致的行数膨胀"""
+        def count_of(queryset):
+            counted = queryset.order_by().values('course_id').annotate(total=models.Count('*')).values('total')
+            return Coalesce(models.Subquery(counted, output_field=models.IntegerField()), 0)
+
+        return self.annotate(
+            student_count=count_of(Course.students.through.objects.filter(course_id=models.OuterRef('pk'))),
+            group_count=count_of(Group.objects.filter(course_id=models.OuterRef('pk'))),
+            subject_count=count_of(CourseSubject.objects.filter(course_id=models.OuterRef('pk'))),
+        )
+
+    def filter_current_status(self, status, today=None):
+        """按当前日期计算出的状态过滤，不依赖数据库中已存储的状态"""
+        return self.filter(self.status_condition(status, today))
+
+    def sync_status(self, today=None):
+        """按日期边界批量更新状态，每种状态一条 UPDATE，返回更新的行数"""
+        today = today or timezone.now().date()
+        updated = 0
+        for value, _ in Course.STATUS_CHOICES:
+            updated += (
+                self.filter(self.status_condition(value, today))
+                .exclude(status=value)
+                .update(status=value, updated_at=timezone.now())
+            )
+        return updated
+
+
 class Course(models.Model):
     STATUS_CHOICES = (
         ('not_started', '未开始'),
         ('in_progress', '进行中'),
         ('completed', '已结束'),
     )
+    SELECTION_MODE_CHOICES = (
+        ('first_come', '先到先得'),
+        ('preference', '志愿分配'),
+    )
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200, verbose_name='课程名称')
     description = models.TextField(verbose_name='课程描述', blank=True)
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='teaching_courses', verbose_name='教师')
-    students = models.ManyToManyField(User, related_name='enrolled_courses', verbose_name='学生', blank=True)
+    students = models.ManyToManyField(User, through='CourseMembership', related_name='enrolled_courses', verbose_name='学生', blank=True)
     course_code = models.CharField(max_length=10, unique=True, verbose_name='课程码')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='not_started', verbose_name='课程状态')
     max_group_size = models.PositiveIntegerField(verbose_name='最大小组人数', default=3)
     min_group_size = models.PositiveIntegerField(verbose_name='最小小组人数', default=1)
     max_subject_selections = models.PositiveIntegerField(verbose_name='最大课题选择数', default=3)
+    subject_selection_mode = models.CharField(max_length=20, choices=SELECTION_MODE_CHOICES, default='first_come', verbose_name='选题方式')
+    preference_deadline = models.DateTimeField(null=True, blank=True, verbose_name='志愿提交截止时间')
+    group_sequence = models.PositiveIntegerField(verbose_name='小组编号计数', default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     start_date = models.DateField(verbose_name='开始日期')
     end_date = models.DateField(verbose_name='结束日期')
 
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         verbose_name = '课程'
         verbose_name_plural = '课程'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['start_date'], name='course_start_date_idx'),
+            models.Index(fields=['end_date'], name='course_end_date_idx'),
+            models.Index(fields=['created_at', 'id'], name='course_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_status_display()})"
@@ -46,12 +117,50 @@ class Course(models.Model):
             return 'in_progress'
 
     def save(self, *args, **kwargs):
-        """重写save方法，在保存时自动更新状态"""
+        """重写save方法，在保存时自动更新状态，新建时自动分配课程码"""
         self.status = self.calculate_status()
+        if self._state.adding and not self.course_code:
+            def insert(code):
+                self.course_code = code
+                super(Course, self).save(*args, **kwargs)
+            self.course_code_attempts = allocate_course_code(insert)
+            return
+        if not self._state.adding and args == () and kwargs.get('update_fields') is None:
+            # 小组编号计数只由 next_group_number / renumber_groups 原子更新，避免被内存中的旧值覆盖
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname != 'group_sequence'
+            ]
         super().save(*args, **kwargs)
 # endregion
 
 # region 小组模型
+class GroupQuerySet(models.QuerySet):
+    """小组查询集"""
+
+    def with_detail(self):
+        """
+        GroupSerializer 所需的全部关联数据，每页查询数量固定：
+        创建者与课程随主查询 JOIN，学生、选题（含两种课题及其创建者）和已提交记录各一次预取
+        """
+        return self.select_related('creator', 'course').prefetch_related(
+            'students',
+            models.Prefetch(
+                'group_subjects',
+                queryset=GroupSubject.objects.select_related(
+                    'course_subject__private_subject__creator',
+                    'course_subject__private_subject__reviewer',
+                    'course_subject__public_subject__creator',
+                ),
+            ),
+            models.Prefetch(
+                'submissions',
+                queryset=GroupSubmission.objects.filter(is_submitted=True),
+                to_attr='submitted_submissions',
+            ),
+        )
+
+
 class Group(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200, verbose_name='小组名称')
@@ -62,11 +171,16 @@ class Group(models.Model):
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_groups', verbose_name='创建者', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    objects = GroupQuerySet.as_manager()
     
     class Meta:
         verbose_name = '小组'
         verbose_name_plural = '小组'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['course', 'created_at', 'id'], name='group_course_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.course.name})"
@@ -77,9 +191,11 @@ class Group(models.Model):
         # is_new = not self.pk
         is_new = self._state.adding
         if is_new:
-            # 设置小组名字
-            group_count = Group.objects.filter(course=self.course).count()
-            self.name = f"{self.course.name} 小组 {group_count + 1}"
+            # 编号计数加一与插入小组在同一事务中，课程行锁保证并发创建时编号不重复
+            with transaction.atomic():
+                self.name = f"{group_name_prefix(self.course)}{next_group_number(self.course_id)}"
+                super().save(*args, **kwargs)
+            return
 
         super().save(*args, **kwargs)
 
@@ -88,14 +204,95 @@ class Group(models.Model):
         # 获取小组对应的课程
         course = self.course
         # 删除小组
-        super().delete(*args, **kwargs)
-        groups= Group.objects.filter(course=course)
-        for index, group in enumerate(groups, 1):
-            group.name = f"{course.name} 小组 {index}"
-            group.save(update_fields=['name'])
+        with transaction.atomic():
+            # 先锁课程行再删除小组行，与自动分组、移出学生的加锁顺序（课程、成员、小组）一致，避免死锁
+            Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True).first()
+            result = super().delete(*args, **kwargs)
+            renumber_groups(course)
+        return result
+
+
+def group_name_prefix(course):
+    return f"{course.name} 小组 "
+
+
+def next_group_number(course_id, count=1):
+    """课程的小组编号计数增加 count 并返回最后一个新编号，计数保存在课程行上"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {connection.ops.quote_name(Course._meta.db_table)} "
+            "SET group_sequence = group_sequence + %s WHERE id = %s RETURNING group_sequence",
+            [count, course_id],
+        )
+        return cursor.fetchone()[0]
+
+
+def renumber_groups(course):
+    """
+    按创建顺序重新为课程下的小组连续编号，并把编号计数重置为小组数
+
+    先锁住课程行，等待持有该锁的并发建组提交；之后才在单独的语句中按小组数重置计数，
+    该语句的快照晚于加锁，能看到刚提交的小组（若在同一条 UPDATE 中计数，等锁后子查询仍使用旧快照）。
+    最后用一条 ROW_NUMBER() 窗口函数 UPDATE 只改写名称发生变化的小组
+    """
+    qn = connection.ops.quote_name
+    course_table, group_table = qn(Course._meta.db_table), qn(Group._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True).first()
+        cursor.execute(
+            f"""
+            UPDATE {course_table} SET group_sequence = (
+                SELECT COUNT(*) FROM {group_table} WHERE course_id = %s
+            ) WHERE id = %s
+            """,
+            [course.pk, course.pk],
+        )
+        cursor.execute(
+            f"""
+            UPDATE {group_table} AS g SET name = numbered.name
+            FROM (
+                SELECT id, %s || ROW_NUMBER() OVER (ORDER BY created_at, id) AS name
+                FROM {group_table} WHERE course_id = %s
+            ) AS numbered
+            WHERE g.id = numbered.id AND g.name <> numbered.name
+            """,
+            [group_name_prefix(course), course.pk],
+        )
     
 # endregion
 
+# region 课程成员模型
+class CourseMembership(models.Model):
+    """
+    课程成员，即 Course.students 的中间表
+
+    group 冗余记录学生在该课程中所在的小组，(course, user) 唯一，
+    "学生是否在课程中""学生在哪个小组"都只需一次唯一索引查询；
+    小组成员变化时由 signals.py 或批量操作调用 sync_membership_groups 同步
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='memberships', verbose_name='课程')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_memberships', verbose_name='学生')
+    group = models.ForeignKey(Group, on_delete=models.SET_NULL, related_name='memberships', verbose_name='小组', null=True, blank=True)
+
+    class Meta:
+        db_table = 'course_course_students'
+        verbose_name = '课程成员'
+        verbose_name_plural = '课程成员'
+        unique_together = [('course', 'user')]
+
+    def __str__(self):
+        return f"{self.course_id} - {self.user_id}"
+
+
+def sync_membership_groups(memberships):
+    """按小组成员关系重写给定课程成员的 group 字段，一条 UPDATE 完成"""
+    current = (
+        Group.students.through.objects.filter(group__course_id=models.OuterRef('course_id'), user_id=models.OuterRef('user_id'))
+        .values('group_id')[:1]
+    )
+    return memberships.update(group=models.Subquery(current))
+# endregion
+
 # region 课程课题关联模型
 class CourseSubject(models.Model):
     """课程课题关联模型"""
@@ -109,6 +306,7 @@ class CourseSubject(models.Model):
     subject_type = models.CharField(max_length=10, choices=SUBJECT_TYPE_CHOICES, verbose_name='课题类型')
     private_subject = models.ForeignKey('subject.Subject', on_delete=models.CASCADE, related_name='course_subjects', verbose_name='私有课题', null=True, blank=True)
     public_subject = models.ForeignKey('subject.PublicSubject', on_delete=models.CASCADE, related_name='course_subjects', verbose_name='公开课题', null=True, blank=True)
+    selected_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='已选次数')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
@@ -172,9 +370,37 @@ class GroupSubject(models.Model):
         super().save(*args, **kwargs)
 # endregion
 
+# region 小组课题志愿模型
+class GroupSubjectPreference(models.Model):
+    """小组课题志愿，rank 越小越优先"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='subject_preferences', verbose_name='小组')
+    course_subject = models.ForeignKey(CourseSubject, on_delete=models.CASCADE, related_name='preferences', verbose_name='课程课题')
+    rank = models.PositiveSmallIntegerField(verbose_name='志愿顺序')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    class Meta:
+        verbose_name = '小组课题志愿'
+        verbose_name_plural = '小组课题志愿'
+        ordering = ['group', 'rank']
+        unique_together = [
+            ('group', 'course_subject'),
+            ('group', 'rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.group.name} - {self.rank} - {self.course_subject}"
+# endregion
+
 # region 代码版本模型
 class GroupCodeVersion(models.Model):
     """小组代码版本模型"""
+    STATUS_CHOICES = (
+        ('processing', '处理中'),
+        ('ready', '已完成'),
+        ('failed', '处理失败'),
+    )
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='code_versions', verbose_name='小组')
     version = models.CharField(max_length=50, verbose_name='版本号')
@@ -182,6 +408,13 @@ class GroupCodeVersion(models.Model):
     zip_file = models.FileField(upload_to='group_codes/zip/%Y/%m/%d/', verbose_name='ZIP文件')
     total_files = models.IntegerField(default=0, verbose_name='文件总数')
     total_size = models.BigIntegerField(default=0, verbose_name='总大小(字节)')
+    # 上传后由后台任务解析 ZIP，处理期间 status 为 processing
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ready', verbose_name='处理状态')
+    processed_files = models.IntegerField(default=0, verbose_name='已处理文件数')
+    processed_size = models.BigIntegerField(default=0, verbose_name='已处理大小(字节)')
+    error = models.TextField(blank=True, verbose_name='失败原因')
+    attempts = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='处理次数')
+    heartbeat_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='最近处理时间')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
@@ -190,12 +423,39 @@ class GroupCodeVersion(models.Model):
         verbose_name_plural = '代码版本'
         ordering = ['-created_at']
         unique_together = ['group', 'version']
+        indexes = [
+            models.Index(fields=['group', 'created_at', 'id'], name='version_group_created_id_idx'),
+            # 后台任务按上传顺序领取待处理的版本
+            models.Index(fields=['created_at'], condition=models.Q(status='processing'), name='version_processing_idx'),
+        ]
     
     def __str__(self):
         return f"{self.group.name} - {self.version}"
     
 # endregion
 
+# region 代码内容模型
+class CodeBlob(models.Model):
+    """按 SHA-256 寻址的代码文件内容，相同内容在所有版本、小组间只保存一份"""
+    hash = models.CharField(max_length=64, primary_key=True, verbose_name='SHA-256')
+    content = models.TextField(verbose_name='文件内容')
+    size = models.BigIntegerField(verbose_name='内容大小(字节)')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    class Meta:
+        verbose_name = '代码内容'
+        verbose_name_plural = '代码内容'
+
+    def __str__(self):
+        return self.hash
+
+    @classmethod
+    def from_content(cls, content):
+        """由文本内容构造（未保存），hash 与 size 均按 UTF-8 编码计算"""
+        encoded = content.encode('utf-8')
+        return cls(hash=hashlib.sha256(encoded).hexdigest(), content=content, size=len(encoded))
+# endregion
+
 # region 代码文件模型
 class GroupCodeFile(models.Model):
     """小组代码文件模型"""
@@ -210,7 +470,8 @@ class GroupCodeFile(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     version = models.ForeignKey(GroupCodeVersion, on_delete=models.CASCADE, related_name='files', verbose_name='版本')
     path = models.CharField(max_length=500, verbose_name='文件路径')
-    content = models.TextField(verbose_name='文件内容', null=True, blank=True)
+    # 非 UTF-8 文本的文件没有内容
+    blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, related_name='files', verbose_name='文件内容', null=True, blank=True)
     size = models.BigIntegerField(verbose_name='文件大小(字节)')
     is_previewable = models.BooleanField(default=False, verbose_name='是否可预览')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
@@ -225,13 +486,21 @@ class GroupCodeFile(models.Model):
     def __str__(self):
         return f"{self.version.group.name} - {self.path}"
     
+    @property
+    def content(self):
+        """文件内容，非文本文件为 None"""
+        return self.blob.content if self.blob_id else None
+
+    @classmethod
+    def is_previewable_path(cls, path):
+        """根据扩展名判断文件是否可预览"""
+        import os
+        _, ext = os.path.splitext(path)
+        return ext.lower() in cls.PREVIEWABLE_EXTENSIONS
+
     def save(self, *args, **kwargs):
         """重写save方法，在保存时判断文件是否可预览"""
-        # 获取文件扩展名
-        import os
-        _, ext = os.path.splitext(self.path)
-        # 判断文件是否可预览
-        self.is_previewable = ext.lower() in self.PREVIEWABLE_EXTENSIONS
+        self.is_previewable = self.is_previewable_path(self.path)
         super().save(*args, **kwargs)
 # endregion
 
@@ -278,4 +547,57 @@ class GroupSubmissionContribution(models.Model):
     
     def __str__(self):
         return f"{self.student.name} - {self.contribution}%"
-# endregion
\ No newline at end of file
+# endregion
+# region 课程导出模型
+class CourseExport(models.Model):
+    """课程提交导出的压缩包，由后台任务构建，提交变化时失效并重新构建"""
+    STATUS_CHOICES = (
+        ('processing', '构建中'),
+        ('ready', '已完成'),
+        ('failed', '构建失败'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, related_name='export', verbose_name='课程')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing', verbose_name='构建状态')
+    # 每次失效加一，构建完成时只在修订号未变化时标记为 ready
+    revision = models.PositiveIntegerField(default=0, editable=False, verbose_name='修订号')
+    file = models.FileField(upload_to='course_exports/', max_length=255, blank=True, verbose_name='压缩包')
+    size = models.BigIntegerField(default=0, verbose_name='大小(字节)')
+    hash = models.CharField(max_length=64, blank=True, verbose_name='SHA-256')
+    error = models.TextField(blank=True, verbose_name='失败原因')
+    attempts = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='构建次数')
+    heartbeat_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='最近构建时间')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '课程导出'
+        verbose_name_plural = '课程导出'
+        indexes = [
+            # 后台任务按请求顺序领取待构建的导出
+            models.Index(fields=['updated_at'], condition=models.Q(status='processing'), name='export_processing_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.course.name} - {self.get_status_display()}"
+# endregion
+
+# region 课程统计版本模型
+class CourseStatsVersion(models.Model):
+    """
+    课程统计缓存的版本号，缓存键包含版本号
+
+    统计相关的数据变化时在同一事务中加一，提交后所有进程都改用新的缓存键，
+    不依赖各进程各自的本地缓存能否被清除；单独成表，课程行的 save 不会覆盖版本号
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats_version', verbose_name='课程')
+    version = models.PositiveBigIntegerField(default=0, verbose_name='版本号')
+
+    class Meta:
+        verbose_name = '课程统计版本'
+        verbose_name_plural = '课程统计版本'
+
+    def __str__(self):
+        return f"{self.course_id} - {self.version}"
+# endregion
@@ -0,0 +1,298 @@
+"""
+课程名单：学生加入、退出课程与小组，以及批量导入
+
+名单来源可以是 CSV（含 user_id 列，或第一列为学号）或 JSON（学号数组，或含 user_id 的对象数组），
+无论名单多长，导入都只需要固定数量的查询：一次查用户、一次查已加入学生、一次批量插入
+"""
+import csv
+import io
+import json
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+from accounts.models import User
+from .models import Course, CourseMembership, Group, renumber_groups
+from .stats import invalidate_course_stats
+
+# 导入结果
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+UNKNOWN_USER = 'unknown_user'
+WRONG_ROLE = 'wrong_role'
+DUPLICATE = 'duplicate'
+
+RESULTS = (ENROLLED, ALREADY_ENROLLED, UNKNOWN_USER, WRONG_ROLE, DUPLICATE)
+
+# 加入小组结果
+JOINED = 'joined'
+NOT_ENROLLED = 'not_enrolled'
+GROUP_FULL = 'group_full'
+ALREADY_IN_GROUP = 'already_in_group'
+IN_OTHER_GROUP = 'in_other_group'
+
+
+class RosterFormatError(ValueError):
+    """名单格式错误"""
+
+
+# region 名单解析
+def parse_roster_rows(content, filename=''):
+    """
+    解析名单内容，返回 [{'user_id': ..., 其他列...}, ...]
+    根据文件名或内容首字符判断是 JSON 还是 CSV
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise RosterFormatError('名单文件必须是 UTF-8 编码')
+    text = content.strip()
+    if not text:
+        raise RosterFormatError('名单不能为空')
+
+    if filename.lower().endswith('.json') or text[0] in '[{':
+        return _parse_json(text)
+    return _parse_csv(text)
+
+
+def _parse_json(text):
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        raise RosterFormatError('JSON 名单格式错误')
+    if isinstance(data, dict):
+        data = data.get('user_ids', data.get('students'))
+    if not isinstance(data, list):
+        raise RosterFormatError('JSON 名单必须是数组')
+    rows = []
+    for item in data:
+        if isinstance(item, dict):
+            if 'user_id' not in item:
+                raise RosterFormatError('JSON 名单中的对象必须包含 user_id 字段')
+            rows.append({**item, 'user_id': str(item['user_id']).strip()})
+        elif isinstance(item, (str, int)):
+            rows.append({'user_id': str(item).strip()})
+        else:
+            raise RosterFormatError('JSON 名单元素必须是学号或对象')
+    return rows
+
+
+def _parse_csv(text):
+    reader = csv.reader(io.StringIO(text))
+    lines = [line for line in reader if any(cell.strip() for cell in line)]
+    header = [cell.strip() for cell in lines[0]]
+    if 'user_id' in header:
+        return [
+            {key: (line[index].strip() if index < len(line) else '') for index, key in enumerate(header)}
+            for line in lines[1:]
+        ]
+    # 没有表头时第一列即为学号
+    return [{'user_id': line[0].strip()} for line in lines]
+# endregion
+
+
+# region 导入
+def import_roster(course, user_ids):
+    """
+    在一个事务中把 user_ids 批量加入课程，返回逐行导入报告
+
+    返回格式:
+    {
+        "summary": {"enrolled": 1, "already_enrolled": 0, "unknown_user": 0, "wrong_role": 0, "duplicate": 0},
+        "rows": [{"row": 1, "user_id": "student001", "result": "enrolled"}]
+    }
+    """
+    Membership = course.students.through
+    candidates = {user_id for user_id in user_ids if user_id}
+
+    with transaction.atomic():
+        roles = dict(User.objects.filter(user_id__in=candidates).values_list('user_id', 'role'))
+        enrolled = set(
+            Membership.objects.filter(course_id=course.pk, user_id__in=candidates).values_list('user_id', flat=True)
+        )
+
+        rows, seen, to_create = [], set(), []
+        for index, user_id in enumerate(user_ids, 1):
+            if user_id in seen:
+                result = DUPLICATE
+            elif user_id not in roles:
+                result = UNKNOWN_USER
+            elif roles[user_id] != 'STUDENT':
+                result = WRONG_ROLE
+            elif user_id in enrolled:
+                result = ALREADY_ENROLLED
+            else:
+                result = ENROLLED
+                to_create.append(Membership(course_id=course.pk, user_id=user_id))
+            seen.add(user_id)
+            rows.append({'row': index, 'user_id': user_id, 'result': result})
+
+        # 并发导入时可能有其他请求先插入，冲突行直接忽略
+        Membership.objects.bulk_create(to_create, ignore_conflicts=True, batch_size=1000)
+        if to_create:
+            invalidate_course_stats(course.pk)
+
+    summary = {result: 0 for result in RESULTS}
+    for row in rows:
+        summary[row['result']] += 1
+    return {'summary': summary, 'rows': rows}
+# endregion
+
+
+# region 加入课程
+def join_course(course, user, today=None):
+    """
+    学生加入课程，只对课程-学生关联表执行一条条件 INSERT，不锁也不写课程行
+
+    课程是否未开始的判断和唯一约束冲突都在同一条语句中由数据库裁决，
+    并发重复加入或加入时课程恰好开始都不会产生脏数据
+
+    返回 ENROLLED / ALREADY_ENROLLED，课程不可加入时返回课程当前状态
+    """
+    today = today or timezone.now().date()
+    Membership = course.students.through
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {qn(Membership._meta.db_table)} (course_id, user_id)
+            SELECT id, %s FROM {qn(course._meta.db_table)} WHERE id = %s AND start_date > %s
+            ON CONFLICT (course_id, user_id) DO NOTHING
+            RETURNING id
+            """,
+            [user.pk, course.pk, today],
+        )
+        if cursor.fetchone() is not None:
+            invalidate_course_stats(course.pk)
+            return ENROLLED
+    # 插入未发生时再区分原因，只在失败路径上多一次索引查询
+    if Membership.objects.filter(course_id=course.pk, user_id=user.pk).exists():
+        return ALREADY_ENROLLED
+    return course.calculate_status()
+# endregion
+
+
+# region 加入小组
+def join_group(group, user, today=None):
+    """
+    学生加入小组，人数上限、一人一组和课程未开始都由一条条件写入在数据库中裁决
+
+    先按固定顺序锁住学生的课程成员行（同一学生的加入请求互斥）和小组行（同一小组的加入请求互斥），
+    锁定后的语句读到的是最新的成员数；学生是否已有小组直接看课程成员行的 group 字段，
+    同一条语句写入小组成员并回填该字段，因此并发加入不会超过课程的小组人数上限，
+    也不会让同一学生同时进入两个小组
+
+    返回 JOINED / NOT_ENROLLED / GROUP_FULL / ALREADY_IN_GROUP / IN_OTHER_GROUP，课程不可加入时返回课程当前状态
+    """
+    today = today or timezone.now().date()
+    course = group.course
+    GroupMembership = Group.students.through
+    qn = connection.ops.quote_name
+    group_table = qn(Group._meta.db_table)
+    member_table = qn(GroupMembership._meta.db_table)
+    membership_table = qn(CourseMembership._meta.db_table)
+
+    with transaction.atomic():
+        membership = (
+            CourseMembership.objects.select_for_update()
+            .filter(course_id=course.pk, user_id=user.pk).values_list('id', 'group_id').first()
+        )
+        if membership is None:
+            return NOT_ENROLLED
+        membership_id, current = membership
+        Group.objects.select_for_update().filter(pk=group.pk).values_list('pk', flat=True).first()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH joined AS (
+                    UPDATE {group_table} AS g SET updated_at = %s
+                    FROM {qn(course._meta.db_table)} AS c, {membership_table} AS cm
+                    WHERE g.id = %s AND c.id = g.course_id AND c.start_date > %s
+                      AND cm.id = %s AND cm.group_id IS NULL
+                      AND (SELECT COUNT(*) FROM {member_table} AS m WHERE m.group_id = g.id) < c.max_group_size
+                    RETURNING g.id
+                ), enrolled AS (
+                    UPDATE {membership_table} AS cm SET group_id = joined.id
+                    FROM joined WHERE cm.id = %s
+                )
+                INSERT INTO {member_table} (group_id, user_id)
+                SELECT id, %s FROM joined
+                RETURNING id
+                """,
+                [timezone.now(), group.pk, today, membership_id, membership_id, user.pk],
+            )
+            if cursor.fetchone() is not None:
+                invalidate_course_stats(course.pk)
+                return JOINED
+
+        # 写入未发生时再区分原因，按原有校验顺序返回
+        course_status = course.calculate_status()
+        if course_status != 'not_started':
+            return course_status
+        if GroupMembership.objects.filter(group_id=group.pk).count() >= course.max_group_size:
+            return GROUP_FULL
+        return ALREADY_IN_GROUP if current == group.pk else IN_OTHER_GROUP
+# endregion
+
+
+# region 退出课程
+def remove_students(course, user_ids):
+    """
+    在一个事务中把 user_ids 移出课程及其所有小组，语句数量与人数和小组数无关
+
+    - 删除课程名单和小组成员关系
+    - 人数归零的小组被删除（课程教师创建的小组保留），删除后统一重新编号一次
+    - 组长离开但仍有成员的小组，由剩余成员中学号最小的学生接任组长
+
+    事务开始时先锁住课程行，再删除成员与小组行，与自动分组的加锁顺序（课程、成员、小组）一致
+
+    返回格式:
+    {"removed": ["student001"], "not_enrolled": ["student002"], "deleted_groups": 1, "reassigned_groups": 0}
+    """
+    CourseMembership = course.students.through
+    GroupMembership = Group.students.through
+    user_ids = list(dict.fromkeys(user_ids))
+
+    with transaction.atomic():
+        Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True).first()
+        enrolled = set(
+            CourseMembership.objects.filter(course_id=course.pk, user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        removed = [user_id for user_id in user_ids if user_id in enrolled]
+        report = {
+            'removed': removed,
+            'not_enrolled': [user_id for user_id in user_ids if user_id not in enrolled],
+            'deleted_groups': 0,
+            'reassigned_groups': 0,
+        }
+        if not removed:
+            return report
+
+        CourseMembership.objects.filter(course_id=course.pk, user_id__in=removed).delete()
+        memberships = GroupMembership.objects.filter(group__course_id=course.pk, user_id__in=removed)
+        affected = set(memberships.values_list('group_id', flat=True))
+        memberships.delete()
+
+        # 删除变空的小组，组长离开的空组也在其中
+        empty_groups = Group.objects.filter(
+            Q(id__in=affected) | Q(creator_id__in=removed),
+            course_id=course.pk,
+            students__isnull=True,
+        ).exclude(creator_id=course.teacher_id)
+        _, deleted = empty_groups.delete()
+        report['deleted_groups'] = deleted.get(Group._meta.label, 0)
+
+        # 剩余小组中组长离开的，由学号最小的成员接任
+        report['reassigned_groups'] = Group.objects.filter(course_id=course.pk, creator_id__in=removed).update(
+            creator=Subquery(
+                GroupMembership.objects.filter(group_id=OuterRef('pk')).order_by('user_id').values('user_id')[:1]
+            ),
+            updated_at=timezone.now(),
+        )
+
+        if report['deleted_groups']:
+            renumber_groups(course)
+        invalidate_course_stats(course.pk)
+    return report
+# endregion
@@ -0,0 +1,75 @@
+"""
+小组选题名额
+
+每个课程课题在 selected_count 中记录已被选择的次数：
+选题时用一条 UPDATE ... WHERE selected_count < 上限 原子地占用名额，成功后再写入选题记录；
+选题记录被删除（退选、删除小组或课题的级联删除）时由 signals.py 归还名额。
+计数与选题记录不一致时可用 reconcile_selection_counts 或 reconcile_subject_selections 命令修复
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import CourseSubject, Group, GroupSubject
+from .stats import invalidate_course_stats
+
+# 选题结果
+SELECTED = 'selected'
+GROUP_HAS_SUBJECT = 'group_has_subject'
+SUBJECT_FULL = 'subject_full'
+
+
+# region 选题
+def select_subject(group, course_subject):
+    """
+    小组选择课题
+
+    先锁住小组行（同一小组的选题请求互斥），再以条件 UPDATE 占用课题名额，
+    最后写入选题记录；名额已满时 UPDATE 不命中任何行，不会超选
+
+    返回 SELECTED / GROUP_HAS_SUBJECT / SUBJECT_FULL
+    """
+    course = group.course
+    with transaction.atomic():
+        Group.objects.select_for_update().filter(pk=group.pk).values_list('pk', flat=True).first()
+        if GroupSubject.objects.filter(group_id=group.pk).exists():
+            return GROUP_HAS_SUBJECT
+        taken = CourseSubject.objects.filter(
+            pk=course_subject.pk, selected_count__lt=course.max_subject_selections
+        ).update(selected_count=F('selected_count') + 1)
+        if not taken:
+            return SUBJECT_FULL
+        # bulk_create 不触发 post_save，名额已在上面占用
+        GroupSubject.objects.bulk_create([GroupSubject(group_id=group.pk, course_subject_id=course_subject.pk)])
+        invalidate_course_stats(course.pk)
+    return SELECTED
+
+
+def unselect_subject(group):
+    """小组退选课题，名额由 post_delete 信号在同一事务中归还，返回删除的选题数"""
+    with transaction.atomic():
+        deleted, _ = GroupSubject.objects.filter(group_id=group.pk).delete()
+    return deleted
+# endregion
+
+
+# region 计数修复
+def reconcile_selection_counts(course_ids=None):
+    """按选题记录重新计算已选次数，只更新不一致的课题，返回修复的课题数"""
+    counts = (
+        GroupSubject.objects.filter(course_subject_id=OuterRef('pk'))
+        .order_by().values('course_subject_id').annotate(total=Count('*')).values('total')
+    )
+    actual = Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    queryset = CourseSubject.objects.all()
+    if course_ids is not None:
+        queryset = queryset.filter(course_id__in=course_ids)
+    drifted = queryset.alias(actual=actual).filter(~Q(selected_count=F('actual')))
+    with transaction.atomic():
+        # 先锁住不一致的课题行，等待进行中的选题提交后再用新快照重新计数
+        affected = list(drifted.select_for_update().values_list('course_id', flat=True))
+        if not affected:
+            return 0
+        repaired = CourseSubject.objects.filter(pk__in=drifted.values('pk')).update(selected_count=actual)
+        invalidate_course_stats(*set(affected))
+    return repaired
+# endregion
@@ -0,0 +1,108 @@
+"""
+课程统计缓存与课程导出失效、课程成员所在小组与课题已选次数维护
+
+逐条的 ORM 写入通过信号清除缓存；roster.py 中绕过信号的批量操作自行调用 invalidate_course_stats
+"""
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .exports import invalidate_course_export
+from .models import (
+    Course, CourseMembership, CourseSubject, Group, GroupCodeVersion, GroupSubject, GroupSubmission,
+    GroupSubmissionContribution, sync_membership_groups,
+)
+from .stats import invalidate_course_stats
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    invalidate_course_stats(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=CourseSubject)
+def course_child_changed(sender, instance, **kwargs):
+    invalidate_course_stats(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=GroupSubject)
+@receiver([post_save, post_delete], sender=GroupCodeVersion)
+@receiver([post_save, post_delete], sender=GroupSubmission)
+def group_child_changed(sender, instance, **kwargs):
+    course_id = Group.objects.filter(pk=instance.group_id).values_list('course_id', flat=True).first()
+    invalidate_course_stats(course_id)
+    # 代码版本只有被提交后才进入导出，提交记录的变化已经覆盖
+    if sender is not GroupCodeVersion:
+        invalidate_course_export(course_id)
+
+
+# region 课程导出失效
+@receiver([post_save, post_delete], sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """导出中的目录名与 CSV 使用小组名称"""
+    invalidate_course_export(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=GroupSubmissionContribution)
+def contribution_changed(sender, instance, **kwargs):
+    course_id = (
+        GroupSubmission.objects.filter(pk=instance.submission_id).values_list('group__course_id', flat=True).first()
+    )
+    invalidate_course_export(course_id)
+# endregion
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def course_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_course_stats(instance.pk)
+    elif pk_set:
+        invalidate_course_stats(*pk_set)
+
+
+@receiver(m2m_changed, sender=Group.students.through)
+def group_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_course_stats(instance.course_id)
+    elif pk_set:
+        invalidate_course_stats(*Group.objects.filter(pk__in=pk_set).values_list('course_id', flat=True).distinct())
+
+
+# region 课程成员所在小组
+@receiver(m2m_changed, sender=Group.students.through)
+def group_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """通过 ORM 增删小组成员时同步 CourseMembership.group；批量写入的路径自行调用 sync_membership_groups"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        if action == 'post_clear':
+            CourseMembership.objects.filter(group_id=instance.pk).update(group=None)
+        else:
+            sync_membership_groups(CourseMembership.objects.filter(course_id=instance.course_id, user_id__in=pk_set))
+    elif action == 'post_clear':
+        CourseMembership.objects.filter(user_id=instance.pk).update(group=None)
+    else:
+        course_ids = Group.objects.filter(pk__in=pk_set).values('course_id')
+        sync_membership_groups(CourseMembership.objects.filter(user_id=instance.pk, course_id__in=course_ids))
+# endregion
+
+
+# region 课题已选次数
+@receiver(post_save, sender=GroupSubject)
+def group_subject_created(sender, instance, created, raw=False, **kwargs):
+    """逐条创建的选题记录占用名额；selection.py 中先占名额再批量写入的路径不触发此信号"""
+    if created and not raw:
+        CourseSubject.objects.filter(pk=instance.course_subject_id).update(selected_count=F('selected_count') + 1)
+
+
+@receiver(post_delete, sender=GroupSubject)
+def group_subject_deleted(sender, instance, **kwargs):
+    """退选以及删除小组、课题时级联删除的选题记录都归还名额"""
+    CourseSubject.objects.filter(pk=instance.course_subject_id, selected_count__gt=0).update(
+        selected_count=F('selected_count') - 1
+    )
+# endregion
@@ -0,0 +1,172 @@
+"""
+课程统计面板
+
+所有数字都由少量聚合查询得出（与小组数、学生数无关），结果按课程缓存。
+缓存键包含数据库中的课程统计版本号（CourseStatsVersion）；名单、小组、选题、版本、提交发生变化时，
+由 signals.py 或批量操作的调用方立即清除本进程的当前缓存，并在事务提交后把版本号加一，
+之后每个进程都读到新版本号而不再使用旧缓存，即使缓存是各进程独立的本地内存缓存。
+版本号不在写入事务中更新，加入课程、加入小组等并发写入不会在版本号行上排队
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Course, CourseStatsVersion, CourseSubject, Group, GroupCodeVersion, GroupSubject, GroupSubmission
+
+CACHE_KEY_PREFIX = 'course-stats'
+DEFAULT_CACHE_TIMEOUT = 300
+
+
+def cache_key(course_id, version):
+    return f'{CACHE_KEY_PREFIX}:{course_id}:{version}'
+
+
+def stats_version(course_id):
+    """课程统计的当前版本号，还没有变化过的课程为 0"""
+    version = CourseStatsVersion.objects.filter(course_id=course_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def get_course_stats(course):
+    """读取课程统计，先查询版本号，缓存未命中时重新计算"""
+    key = cache_key(course.pk, stats_version(course.pk))
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_course_stats(course)
+        cache.set(key, stats, getattr(settings, 'COURSE_STATS_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return stats
+
+
+def invalidate_course_stats(*course_ids):
+    """
+    使课程统计缓存失效
+
+    立即删除当前版本号下的缓存（读取版本号不加锁），事务提交后再把版本号加一；
+    提交前其他请求重新写入的旧数据与其他进程的缓存都随版本号变化而失效
+    """
+    course_ids = sorted({str(course_id) for course_id in course_ids if course_id})
+    if not course_ids:
+        return
+    versions = {
+        str(course_id): version
+        for course_id, version in CourseStatsVersion.objects.filter(course_id__in=course_ids).values_list('course_id', 'version')
+    }
+    cache.delete_many([cache_key(course_id, versions.get(course_id, 0)) for course_id in course_ids])
+    transaction.on_commit(lambda: bump_stats_versions(course_ids), robust=True)
+
+
+def bump_stats_versions(course_ids):
+    """
+    课程的统计版本号加一，没有版本记录的课程从 1 开始
+
+    在自动提交模式下单独执行，行锁只持有一条语句的时间；按课程主键顺序加锁，已删除的课程直接跳过
+    """
+    qn = connection.ops.quote_name
+    version_table, course_table = qn(CourseStatsVersion._meta.db_table), qn(Course._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {version_table} (course_id, version)
+            SELECT id, 1 FROM {course_table} WHERE id = ANY(%s::uuid[]) ORDER BY id
+            ON CONFLICT (course_id) DO UPDATE SET version = {version_table}.version + 1
+            """,
+            [course_ids],
+        )
+
+
+# region 统计计算
+def compute_course_stats(course):
+    """计算课程统计，共 5 条查询"""
+    return {
+        'students': _student_stats(course),
+        'groups': _group_stats(course),
+        'subjects': _subject_stats(course),
+        'versions': _version_stats(course),
+        'submissions': _submission_stats(course),
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def _student_stats(course):
+    """已加入学生数与未分组学生数"""
+    in_group = Group.students.through.objects.filter(group__course_id=course.pk, user_id=OuterRef('user_id'))
+    return Course.students.through.objects.filter(course_id=course.pk).aggregate(
+        enrolled=Count('id'),
+        ungrouped=Count('id', filter=~Q(Exists(in_group))),
+    )
+
+
+def _group_stats(course):
+    """按人数与是否选题分组计数，再按课程的人数上下限折算为填充程度"""
+    size = (
+        Group.students.through.objects.filter(group_id=OuterRef('pk'))
+        .order_by().values('group_id').annotate(total=Count('*')).values('total')
+    )
+    rows = (
+        Group.objects.filter(course_id=course.pk)
+        .annotate(
+            size=Coalesce(Subquery(size, output_field=IntegerField()), 0),
+            has_subject=Exists(GroupSubject.objects.filter(group_id=OuterRef('pk'))),
+        )
+        .order_by().values('size', 'has_subject').annotate(groups=Count('id'))
+    )
+
+    stats = {
+        'total': 0, 'empty': 0, 'below_min': 0, 'within_range': 0, 'full': 0,
+        'with_subject': 0, 'without_subject': 0,
+        'max_group_size': course.max_group_size, 'min_group_size': course.min_group_size,
+    }
+    by_size = {}
+    for row in rows:
+        size, groups = row['size'], row['groups']
+        if size == 0:
+            level = 'empty'
+        elif size >= course.max_group_size:
+            level = 'full'
+        elif size < course.min_group_size:
+            level = 'below_min'
+        else:
+            level = 'within_range'
+        stats[level] += groups
+        stats['total'] += groups
+        stats['with_subject' if row['has_subject'] else 'without_subject'] += groups
+        by_size[size] = by_size.get(size, 0) + groups
+    stats['by_size'] = [{'size': size, 'groups': by_size[size]} for size in sorted(by_size)]
+    return stats
+
+
+def _subject_stats(course):
+    """每个课程课题的被选次数与剩余名额，直接读取已选次数计数"""
+    rows = (
+        CourseSubject.objects.filter(course_id=course.pk)
+        .order_by('created_at')
+        .values('id', 'subject_type', 'private_subject__title', 'public_subject__title', selections=F('selected_count'))
+    )
+    return [
+        {
+            'id': row['id'],
+            'subject_type': row['subject_type'],
+            'title': row['private_subject__title'] or row['public_subject__title'],
+            'selections': row['selections'],
+            'max_selections': course.max_subject_selections,
+            'remaining': max(course.max_subject_selections - row['selections'], 0),
+        }
+        for row in rows
+    ]
+
+
+def _version_stats(course):
+    return GroupCodeVersion.objects.filter(group__course_id=course.pk).aggregate(
+        uploaded=Count('id'),
+        groups=Count('group_id', distinct=True),
+    )
+
+
+def _submission_stats(course):
+    return GroupSubmission.objects.filter(group__course_id=course.pk, is_submitted=True).aggregate(
+        submitted=Count('id'),
+        groups=Count('group_id', distinct=True),
+    )
+# endregion
@@ -0,0 +1,332 @@
+from rest_framework.test import APITestCase
+from course.grouping import form_groups
+from course.models import Course, Group
+from course.roster import remove_students
+from accounts.models import User
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+import threading
+import time
+
+MAX_STUDENTS = 300
+
+
+class CourseAutoGroupTestCase(APITestCase):
+    """自动分组测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.student = User.objects.create_user(
+            email="student@example.com",
+            password="student123",
+            user_id="student000",
+            name="student",
+            school="student school",
+            role="STUDENT"
+        )
+        # 批量创建学生，跳过逐个密码哈希
+        cls.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT",
+                password="!"
+            ) for i in range(1, MAX_STUDENTS + 1)
+        ])
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        self.course = self.create_course()
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+        self.student_token = self.client.post(
+            reverse("login"),
+            {"email": self.student.email, "password": "student123"}
+        ).data["data"]["access"]
+
+    def create_course(self, start_delta=1, **kwargs):
+        """创建课程，默认 2~3 人一组"""
+        today = timezone.now().date()
+        return Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            start_date=today + datetime.timedelta(days=start_delta),
+            end_date=today + datetime.timedelta(days=start_delta + 1),
+            min_group_size=kwargs.pop("min_group_size", 2),
+            max_group_size=kwargs.pop("max_group_size", 3),
+            **kwargs
+        )
+
+    def auto_group(self, data=None, course=None, token=None):
+        """调用自动分组接口"""
+        course = course or self.course
+        return self.client.post(
+            f"{reverse('course-list')}{course.id}/auto_group/",
+            data=data or {},
+            format="json",
+            headers={"Authorization": f"Bearer {token or self.teacher_token}"}
+        )
+
+    def memberships(self, course=None):
+        """返回 {学号: 小组ID}"""
+        return dict(
+            Group.students.through.objects.filter(group__course=course or self.course).values_list("user_id", "group_id")
+        )
+    # endregion
+
+    # region 基础功能测试
+    def test_auto_group(self):
+        """测试按人数上下限均衡分组"""
+        print("-----正在测试自动分组-----")
+        self.course.students.add(*self.students[:10])
+        response = self.auto_group({"seed": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "自动分组成功")
+        summary = response.data["data"]["summary"]
+        self.assertEqual((summary["placed"], summary["unplaced"], summary["new_groups"]), (10, 0, 4))
+        groups = Group.objects.filter(course=self.course).order_by("name")
+        self.assertEqual([g.name for g in groups], [f"course 小组 {i}" for i in range(1, 5)])
+        self.assertEqual(sorted(g.students.count() for g in groups), [2, 2, 3, 3])
+        for group in groups:
+            self.assertIn(group.creator, group.students.all())
+        # 之后手动创建的小组继续编号
+        self.assertEqual(Group.objects.create(course=self.course).name, "course 小组 5")
+        print("-----自动分组测试结束-----")
+
+    def test_dry_run_matches_real_run(self):
+        """测试预览不写数据库，且相同种子的正式执行结果与预览一致"""
+        self.course.students.add(*self.students[:20])
+        preview = self.auto_group({"seed": 7, "dry_run": True}).data["data"]
+        self.assertTrue(preview["dry_run"])
+        self.assertFalse(Group.objects.filter(course=self.course).exists())
+        result = self.auto_group({"seed": 7}).data["data"]
+        self.assertEqual(
+            [(g["name"], g["added"]) for g in preview["groups"]],
+            [(g["name"], g["added"]) for g in result["groups"]]
+        )
+
+    def test_constraints(self):
+        """测试同组与分开约束"""
+        self.course.students.add(*self.students[:12])
+        ids = [s.user_id for s in self.students[:12]]
+        response = self.auto_group({
+            "seed": 3,
+            "together": [[ids[0], ids[1], ids[2]], [ids[3], ids[4]]],
+            "apart": [[ids[0], ids[3], ids[5]], [ids[6], ids[7]]],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        groups = self.memberships()
+        self.assertEqual(len(groups), 12)
+        self.assertEqual(len({groups[ids[0]], groups[ids[1]], groups[ids[2]]}), 1)
+        self.assertEqual(groups[ids[3]], groups[ids[4]])
+        self.assertEqual(len({groups[ids[0]], groups[ids[3]], groups[ids[5]]}), 3)
+        self.assertNotEqual(groups[ids[6]], groups[ids[7]])
+
+    def test_fill_existing_groups(self):
+        """测试优先补满已有小组，同组约束可把学生带入其所在小组"""
+        self.course.students.add(*self.students[:7])
+        existing = Group.objects.create(course=self.course, creator=self.students[0])
+        existing.students.add(self.students[0])
+        response = self.auto_group({"seed": 5, "together": [[self.students[0].user_id, self.students[6].user_id]]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["summary"]["filled_groups"], 1)
+        groups = self.memberships()
+        self.assertEqual(groups[self.students[6].user_id], existing.id)
+        self.assertEqual(len(groups), 7)
+        self.assertGreaterEqual(existing.students.count(), 2)
+
+    def test_query_count_is_constant(self):
+        """测试查询数量不随学生人数增长"""
+        small_course = self.create_course()
+        small_course.students.add(*self.students[:6])
+        with CaptureQueriesContext(connection) as small:
+            self.auto_group({"seed": 1}, course=small_course)
+        self.course.students.add(*self.students)
+        with CaptureQueriesContext(connection) as large:
+            response = self.auto_group({"seed": 1})
+        self.assertEqual(response.data["data"]["summary"]["placed"], MAX_STUDENTS)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+    # endregion
+
+    # region 异常测试
+    def test_unplaceable_students(self):
+        """测试人数不足最小小组人数时报告未分组学生"""
+        course = self.create_course(min_group_size=3, max_group_size=3)
+        course.students.add(*self.students[:4])
+        data = self.auto_group({"seed": 1}, course=course).data["data"]
+        self.assertEqual(data["summary"]["placed"], 3)
+        self.assertEqual(len(data["unplaced"]), 1)
+
+    def test_together_exceeds_max_size(self):
+        """测试同组约束人数超过上限"""
+        self.course.students.add(*self.students[:5])
+        response = self.auto_group({"together": [[s.user_id for s in self.students[:4]]]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("同组约束人数超过小组人数上限", response.data["message"])
+
+    def test_auto_group_with_student(self):
+        """测试学生无法自动分组"""
+        response = self.auto_group(token=self.student_token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_auto_group_after_course_started(self):
+        """测试课程开始后无法自动分组"""
+        course = self.create_course(start_delta=-1)
+        response = self.auto_group(course=course)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("课程已开始", response.data["message"])
+    # endregion
+
+
+def backend_pid():
+    """当前线程数据库连接的后端进程号"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+def wait_for_lock(pid, timeout=10):
+    """等待后端进程 pid 进入锁等待；pg_locks 每次查询都是最新状态"""
+    deadline = time.monotonic() + timeout
+    with connection.cursor() as cursor:
+        while time.monotonic() < deadline:
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_locks WHERE pid = %s AND NOT granted)", [pid])
+            if cursor.fetchone()[0]:
+                return
+            time.sleep(0.01)
+    raise AssertionError(f"进程 {pid} 没有进入锁等待")
+
+
+class AutoGroupLockOrderTestCase(TransactionTestCase):
+    """自动分组与移出学生、删除小组并发时的加锁顺序（线程使用各自的数据库连接，需要真实提交的事务）"""
+
+    # region 测试准备数据
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        print("\n-----开始准备测试数据-----")
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        self.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com", user_id=f"student{i:03d}", name=f"student{i}",
+                school="student school", role="STUDENT", password="!"
+            ) for i in range(1, 13)
+        ])
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            min_group_size=2,
+            max_group_size=3,
+        )
+        self.course.students.add(*self.students)
+        # 只有一名成员的小组，成员离开后小组被删除并重新编号
+        self.groups = []
+        for student in self.students[:2]:
+            group = Group.objects.create(course=self.course, creator=student)
+            group.students.add(student)
+            self.groups.append(group)
+        print("-----测试数据准备完成-----\n")
+
+    def race(self, action, check):
+        """
+        持有课程行锁时同时执行自动分组与 action，两者都进入锁等待后调用 check，之后释放锁；
+        返回两个线程中的异常
+        """
+        errors, pids = [], []
+
+        def run(func):
+            try:
+                pids.append(backend_pid())
+                func()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=run, args=(lambda: form_groups(Course.objects.get(pk=self.course.pk), seed=1),)),
+            threading.Thread(target=run, args=(action,)),
+        ]
+        try:
+            with transaction.atomic():
+                Course.objects.select_for_update().filter(pk=self.course.pk).values_list("pk", flat=True).first()
+                for thread in threads:
+                    thread.start()
+                deadline = time.monotonic() + 10
+                while len(pids) < len(threads) and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                for pid in list(pids):
+                    wait_for_lock(pid)
+                check()
+        finally:
+            for thread in threads:
+                thread.join()
+        return errors
+
+    def assert_unlocked(self, model, **filters):
+        """断言这些行没有被等待中的事务锁住"""
+        list(model.objects.select_for_update(nowait=True).filter(**filters).values_list("pk", flat=True))
+    # endregion
+
+    # region 加锁顺序测试
+    def test_remove_students_locks_course_first(self):
+        """测试移出学生先等待课程行锁，不会先锁住成员与小组行再与自动分组互相等待"""
+        membership = self.course.students.through
+
+        def check():
+            self.assert_unlocked(membership, course_id=self.course.pk)
+            self.assert_unlocked(Group, course_id=self.course.pk)
+
+        errors = self.race(lambda: remove_students(self.course, [self.students[0].pk]), check)
+        self.assertEqual(errors, [])
+        self.assertFalse(membership.objects.filter(course=self.course, user=self.students[0]).exists())
+        # 其余学生都已分组，小组编号连续
+        self.assertEqual(Group.students.through.objects.filter(group__course=self.course).count(), len(self.students) - 1)
+        names = sorted(Group.objects.filter(course=self.course).values_list("name", flat=True), key=lambda n: int(n.split()[-1]))
+        self.assertEqual(names, [f"course 小组 {i}" for i in range(1, len(names) + 1)])
+
+    def test_group_delete_locks_course_first(self):
+        """测试删除小组先等待课程行锁，不会先锁住小组行再与自动分组互相等待"""
+        group = self.groups[0]
+        group.students.clear()
+
+        def check():
+            self.assert_unlocked(Group, pk=group.pk)
+
+        errors = self.race(lambda: Group.objects.get(pk=group.pk).delete(), check)
+        self.assertEqual(errors, [])
+        self.assertFalse(Group.objects.filter(pk=group.pk).exists())
+        names = sorted(Group.objects.filter(course=self.course).values_list("name", flat=True), key=lambda n: int(n.split()[-1]))
+        self.assertEqual(names, [f"course 小组 {i}" for i in range(1, len(names) + 1)])
+    # endregion
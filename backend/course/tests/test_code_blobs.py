@@ -0,0 +1,231 @@
+from rest_framework.test import APITestCase
+from course.blobs import collect_garbage, storage_stats
+from course.ingestion import ingest_version
+from course.models import CodeBlob, Course, Group, GroupCodeFile, GroupCodeVersion
+from accounts.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+import io
+import shutil
+import tempfile
+import threading
+import zipfile
+
+MAX_FILES = 20
+MAX_THREADS = 4
+
+
+def make_zip(files):
+    """files: {路径: 文本内容或 bytes}"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    return buffer.getvalue()
+
+
+def project(changed=0):
+    """MAX_FILES 个文件的项目，changed 只改变其中一个文件"""
+    files = {f"src/module_{i}.py": f"def f{i}():\n    return {i}\n" for i in range(MAX_FILES)}
+    files["src/main.py"] = f"VERSION = {changed}\n"
+    files["logo.png"] = b"\x89PNG\r\n\x1a\n\xff\xfe"
+    return files
+
+
+class TempMediaMixin:
+    """上传文件写入临时目录"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+
+def create_course(teacher):
+    today = timezone.now().date()
+    return Course.objects.create(
+        name="course", teacher=teacher,
+        start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=2),
+    )
+
+
+def create_version(group, name, files):
+    return GroupCodeVersion.objects.create(
+        group=group, version=name, zip_file=SimpleUploadedFile("code.zip", make_zip(files))
+    )
+
+
+class CodeBlobTestCase(TempMediaMixin, APITestCase):
+    """代码内容去重存储测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.student = User.objects.create(
+            email="student@example.com", user_id="student001", name="student",
+            school="student school", role="STUDENT", password="!"
+        )
+        cls.course = create_course(cls.teacher)
+        cls.course.students.add(cls.student)
+        cls.group = Group.objects.create(course=cls.course, creator=cls.student)
+        cls.group.students.add(cls.student)
+        print("-----测试数据准备完成-----\n")
+
+    def ingest(self, name, files):
+        version = create_version(self.group, name, files)
+        ingest_version(version)
+        return version
+    # endregion
+
+    # region 去重测试
+    def test_versions_share_unchanged_contents(self):
+        """测试只改动一个文件的新版本只新增一份内容，二进制文件没有内容"""
+        first = self.ingest("v1", project(changed=1))
+        self.assertEqual(CodeBlob.objects.count(), MAX_FILES + 1)
+        second = self.ingest("v2", project(changed=2))
+        self.assertEqual(CodeBlob.objects.count(), MAX_FILES + 2)
+
+        old = GroupCodeFile.objects.get(version=first, path="src/module_3.py")
+        new = GroupCodeFile.objects.get(version=second, path="src/module_3.py")
+        self.assertEqual(old.blob_id, new.blob_id)
+        self.assertEqual(new.content, "def f3():\n    return 3\n")
+        self.assertEqual(GroupCodeFile.objects.get(version=second, path="src/main.py").content, "VERSION = 2\n")
+        self.assertIsNone(GroupCodeFile.objects.get(version=second, path="logo.png").blob_id)
+
+    def test_storage_stats(self):
+        """测试课程的去重比例与节省的空间"""
+        for i in range(3):
+            self.ingest(f"v{i}", project(changed=i))
+        stats = storage_stats(self.course.pk)
+        file_size = sum(blob.size for blob in CodeBlob.objects.exclude(content__startswith="VERSION"))
+        self.assertEqual(stats["files"], 3 * (MAX_FILES + 1))
+        self.assertEqual(stats["blobs"], MAX_FILES + 3)
+        self.assertEqual(stats["logical_size"], 3 * file_size + 3 * len("VERSION = 0\n"))
+        self.assertEqual(stats["stored_size"], file_size + 3 * len("VERSION = 0\n"))
+        self.assertEqual(stats["saved_size"], 2 * file_size)
+        self.assertGreater(stats["dedup_ratio"], 2.5)
+
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get(f"{reverse('course-list')}{self.course.id}/storage/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "获取代码存储统计成功")
+        self.assertEqual(response.data["data"], stats)
+        self.client.force_authenticate(self.student)
+        response = self.client.get(f"{reverse('course-list')}{self.course.id}/storage/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_retrieve_query_count(self):
+        """测试版本详情的查询数量与文件数无关"""
+        version = self.ingest("v1", project())
+        self.client.force_authenticate(self.student)
+        url = f"{reverse('group-list')}{self.group.id}/versions/{version.id}/"
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["data"]["files"]), MAX_FILES + 2)
+        self.assertLessEqual(len(context), 4)
+        hashes = {f["path"]: f["hash"] for f in response.data["data"]["files"]}
+        self.assertEqual(hashes["src/main.py"], CodeBlob.from_content("VERSION = 0\n").hash)
+        self.assertIsNone(hashes["logo.png"])
+    # endregion
+
+    # region 清理测试
+    def test_collect_garbage(self):
+        """测试删除版本后只清理不再被引用的内容"""
+        first = self.ingest("v1", project(changed=1))
+        self.ingest("v2", project(changed=2))
+        first.delete()
+        self.assertEqual(CodeBlob.objects.count(), MAX_FILES + 2)
+
+        out = io.StringIO()
+        call_command("gc_code_blobs", stdout=out)
+        self.assertIn("已清理 1 个未引用的代码内容", out.getvalue())
+        self.assertEqual(CodeBlob.objects.count(), MAX_FILES + 1)
+        self.assertFalse(CodeBlob.objects.filter(content="VERSION = 1\n").exists())
+        self.assertEqual(collect_garbage(), (0, 0))
+
+    def test_collect_garbage_batches(self):
+        """测试按批清理"""
+        CodeBlob.objects.bulk_create([CodeBlob.from_content(f"orphan {i}") for i in range(5)])
+        self.assertEqual(collect_garbage(batch_size=2), (5, sum(len(f"orphan {i}") for i in range(5))))
+    # endregion
+
+
+class CodeBlobGarbageCollectionConcurrencyTestCase(TempMediaMixin, TransactionTestCase):
+    """清理与入库并发测试（线程使用各自的数据库连接，需要真实提交的事务）"""
+
+    def setUp(self):
+        super().setUp()
+        teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        group = Group.objects.create(course=create_course(teacher), creator=teacher)
+        self.versions = [create_version(group, f"v{i}", project(changed=i)) for i in range(MAX_THREADS * 3)]
+        # 入库将要引用的内容已作为未引用的内容存在，清理随时可能删除它们
+        CodeBlob.objects.bulk_create([
+            CodeBlob.from_content(content) for content in project().values() if isinstance(content, str)
+        ])
+
+    def test_ingest_while_collecting(self):
+        """测试并发清理不会删除入库正在引用的内容"""
+        print("-----正在测试并发清理-----")
+        errors = []
+        done = threading.Event()
+        barrier = threading.Barrier(MAX_THREADS + 1)
+
+        def ingest(chunk):
+            barrier.wait()
+            try:
+                for version in chunk:
+                    ingest_version(version, batch_size=3)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        def collect():
+            barrier.wait()
+            try:
+                while not done.is_set():
+                    collect_garbage(batch_size=5)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=ingest, args=(self.versions[i::MAX_THREADS],)) for i in range(MAX_THREADS)]
+        collector = threading.Thread(target=collect)
+        collector.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        collector.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(GroupCodeFile.objects.count(), len(self.versions) * (MAX_FILES + 2))
+        self.assertFalse(GroupCodeFile.objects.filter(blob__isnull=False, blob__hash__isnull=True).exists())
+        referenced = set(GroupCodeFile.objects.exclude(blob=None).values_list("blob_id", flat=True))
+        self.assertEqual(set(CodeBlob.objects.filter(pk__in=referenced).values_list("pk", flat=True)), referenced)
+        print("-----并发清理测试结束-----")
@@ -0,0 +1,177 @@
+from rest_framework.test import APITestCase
+from course.ingestion import ingest_version
+from course.models import CodeBlob, Course, Group, GroupCodeFile, GroupCodeVersion
+from accounts.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+import io
+import shutil
+import tempfile
+import zipfile
+
+MAX_FILES = 30
+MAIN = "".join(f"line {i}\n" for i in range(1, 11))
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    return buffer.getvalue()
+
+
+class CodeFileContentTestCase(APITestCase):
+    """版本文件清单与单文件内容接口测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.media_root = tempfile.mkdtemp()
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.student, cls.outsider = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com", user_id=f"student{i:03d}", name=f"student{i}",
+                school="student school", role="STUDENT", password="!"
+            ) for i in range(1, 3)
+        ])
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course", teacher=cls.teacher,
+            start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=2),
+        )
+        cls.course.students.add(cls.student, cls.outsider)
+        cls.group = Group.objects.create(course=cls.course, creator=cls.student)
+        cls.group.students.add(cls.student)
+        files = {f"src/module_{i}.py": f"x = {i}\n" * 1000 for i in range(MAX_FILES)}
+        files["src/main.py"] = MAIN
+        files["logo.png"] = b"\x89PNG\r\n\x1a\n\xff\xfe"
+        with override_settings(MEDIA_ROOT=cls.media_root):
+            cls.version = GroupCodeVersion.objects.create(
+                group=cls.group, version="v1", zip_file=SimpleUploadedFile("code.zip", make_zip(files))
+            )
+            ingest_version(cls.version)
+        cls.main = GroupCodeFile.objects.get(version=cls.version, path="src/main.py")
+        cls.logo = GroupCodeFile.objects.get(version=cls.version, path="logo.png")
+        print("-----测试数据准备完成-----\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.student)
+
+    def file_url(self, file, version=None, group=None):
+        return (
+            f"{reverse('group-list')}{(group or self.group).id}/versions/"
+            f"{(version or self.version).id}/files/{file.id}/"
+        )
+    # endregion
+
+    # region 文件清单测试
+    def test_retrieve_returns_manifest(self):
+        """测试版本详情只返回文件清单，不读取文件内容"""
+        url = f"{reverse('group-list')}{self.group.id}/versions/{self.version.id}/"
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        files = {f["path"]: f for f in response.data["data"]["files"]}
+        self.assertEqual(len(files), MAX_FILES + 2)
+        self.assertEqual(
+            files["src/main.py"],
+            {"id": str(self.main.id), "path": "src/main.py", "size": len(MAIN), "is_previewable": True,
+             "hash": CodeBlob.from_content(MAIN).hash},
+        )
+        self.assertIsNone(files["logo.png"]["hash"])
+        self.assertFalse(any("course_codeblob" in q["sql"] for q in context.captured_queries))
+    # endregion
+
+    # region 文件内容测试
+    def test_file_content_and_etag(self):
+        """测试获取文件内容，ETag 相同时返回 304 且不读取内容"""
+        response = self.client.get(self.file_url(self.main))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "获取文件内容成功")
+        data = response.data["data"]
+        self.assertEqual(data["content"], MAIN)
+        self.assertEqual(data["total_lines"], 10)
+        etag = response["ETag"]
+        self.assertEqual(etag, f'"{CodeBlob.from_content(MAIN).hash}"')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.file_url(self.main), HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(len(context), 1)
+        self.assertNotIn("content", context.captured_queries[0]["sql"].split("FROM")[0])
+
+        response = self.client.get(self.file_url(self.main), HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_line_range(self):
+        """测试按行截取，截取范围不同 ETag 不同"""
+        response = self.client.get(self.file_url(self.main), {"start_line": 3, "end_line": 5})
+        data = response.data["data"]
+        self.assertEqual(data["content"], "line 3\nline 4\nline 5\n")
+        self.assertEqual((data["start_line"], data["end_line"], data["total_lines"]), (3, 5, 10))
+        ranged = response["ETag"]
+
+        response = self.client.get(self.file_url(self.main), {"start_line": 9, "end_line": 100})
+        self.assertEqual(response.data["data"]["content"], "line 9\nline 10\n")
+        self.assertEqual(response.data["data"]["end_line"], 10)
+        self.assertNotEqual(response["ETag"], ranged)
+
+        response = self.client.get(self.file_url(self.main), {"start_line": 3, "end_line": 5}, HTTP_IF_NONE_MATCH=ranged)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.file_url(self.main), HTTP_IF_NONE_MATCH=ranged)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for params in ({"start_line": 0}, {"end_line": "x"}, {"start_line": 5, "end_line": 3}):
+            response = self.client.get(self.file_url(self.main), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_binary_file(self):
+        """测试非文本文件没有内容"""
+        response = self.client.get(self.file_url(self.logo), {"start_line": 1, "end_line": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["data"]["content"])
+        self.assertIsNone(response.data["data"]["total_lines"])
+        self.assertIsNone(response.data["data"]["hash"])
+    # endregion
+
+    # region 权限测试
+    def test_permissions(self):
+        """测试教师可以查看，小组外的学生、其他版本或小组的路径返回 404"""
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get(self.file_url(self.main)).status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.file_url(self.main)).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(self.student)
+        other_group = Group.objects.create(course=self.course, creator=self.outsider)
+        self.assertEqual(
+            self.client.get(self.file_url(self.main, group=other_group)).status_code, status.HTTP_404_NOT_FOUND
+        )
+        other_version = GroupCodeVersion.objects.create(group=self.group, version="v2", zip_file="code.zip")
+        self.assertEqual(
+            self.client.get(self.file_url(self.main, version=other_version)).status_code, status.HTTP_404_NOT_FOUND
+        )
+        response = self.client.get(
+            f"{reverse('group-list')}{self.group.id}/versions/invalid/files/{self.main.id}/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    # endregion
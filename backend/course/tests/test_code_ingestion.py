@@ -0,0 +1,134 @@
+from django.test import TestCase, override_settings
+from course.ingestion import ingest_version, normalize_path
+from course.models import Course, Group, GroupCodeFile, GroupCodeVersion
+from accounts.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+
+def make_zip(entries):
+    """entries: [(文件名, bytes)]，文件名以 / 结尾时为目录"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class CodeIngestionTestCase(TestCase):
+    """ZIP 流式入库测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course",
+            teacher=cls.teacher,
+            start_date=today - datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+        )
+        cls.group = Group.objects.create(course=cls.course, creator=cls.teacher)
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """上传文件写入临时目录"""
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_version(self, entries, name="v1"):
+        return GroupCodeVersion.objects.create(
+            group=self.group,
+            version=name,
+            zip_file=SimpleUploadedFile("code.zip", make_zip(entries), content_type="application/zip"),
+        )
+
+    def files(self, version):
+        return {f.path: f for f in GroupCodeFile.objects.filter(version=version)}
+    # endregion
+
+    # region 入库测试
+    def test_ingest_entries(self):
+        """测试文本、二进制、过滤条目与可预览标记"""
+        version = self.create_version([
+            ("src/", b""),
+            ("src/main.py", "print('你好')\r\n".encode()),
+            ("README.md", b"# readme"),
+            ("logo.png", b"\x89PNG\r\n\x1a\n\xff\xfe"),
+            ("__MACOSX/src/._main.py", b"\x00\x01"),
+            ("src/.DS_Store", b"\x00"),
+            ("._hidden", b"\x00"),
+        ])
+        self.assertEqual(ingest_version(version), (3, len("print('你好')\r\n".encode()) + 8 + 10))
+        files = self.files(version)
+        self.assertEqual(set(files), {"src/main.py", "README.md", "logo.png"})
+        # 与文本模式读取相同的换行处理
+        self.assertEqual(files["src/main.py"].content, "print('你好')\n")
+        self.assertTrue(files["src/main.py"].is_previewable)
+        self.assertIsNone(files["logo.png"].content)
+        self.assertFalse(files["logo.png"].is_previewable)
+        self.assertEqual(files["logo.png"].size, 10)
+        version.refresh_from_db()
+        self.assertEqual((version.total_files, version.total_size), (3, sum(f.size for f in files.values())))
+
+    def test_no_extraction_to_media_root(self):
+        """测试入库不在 MEDIA_ROOT 下创建临时目录"""
+        version = self.create_version([("a.py", b"a = 1")])
+        ingest_version(version)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "temp")))
+
+    def test_batched_inserts(self):
+        """测试文件记录按批写入，INSERT 数量与批大小相关而与逐个文件无关"""
+        version = self.create_version([(f"pkg/module_{i}.py", f"x = {i}\n".encode()) for i in range(25)])
+        with CaptureQueriesContext(connection) as context:
+            ingest_version(version, batch_size=10)
+        inserts = [q for q in context.captured_queries if q["sql"].startswith('INSERT INTO "course_groupcodefile"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(GroupCodeFile.objects.filter(version=version).count(), 25)
+
+    def test_duplicate_and_unsafe_paths(self):
+        """测试同名条目以最后一个为准，路径中的 .. 与开头的 / 被去掉"""
+        version = self.create_version([
+            ("dup.txt", b"old"),
+            ("dup.txt", b"new"),
+            ("../escape.txt", b"x"),
+            ("/abs/path.txt", b"y"),
+        ])
+        ingest_version(version)
+        files = self.files(version)
+        self.assertEqual(set(files), {"dup.txt", "escape.txt", "abs/path.txt"})
+        self.assertEqual(files["dup.txt"].content, "new")
+
+    def test_bad_zip(self):
+        """测试损坏的 ZIP 文件抛出异常且不写入文件记录"""
+        version = GroupCodeVersion.objects.create(
+            group=self.group, version="bad", zip_file=SimpleUploadedFile("code.zip", b"not a zip")
+        )
+        with self.assertRaises(zipfile.BadZipFile):
+            ingest_version(version)
+        self.assertFalse(GroupCodeFile.objects.filter(version=version).exists())
+
+    def test_normalize_path(self):
+        self.assertEqual(normalize_path("./a/./b/../c.py"), "a/b/c.py")
+        self.assertEqual(normalize_path("dir/"), "")
+        self.assertEqual(normalize_path("a\\b.py"), "a/b.py")
+    # endregion
@@ -0,0 +1,178 @@
+from rest_framework.test import APITestCase
+from course.diffing import compare_versions, diff_cache, diff_hunks
+from course.ingestion import ingest_version
+from course.models import CodeBlob, Course, Group, GroupCodeVersion
+from accounts.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+import io
+import shutil
+import tempfile
+import zipfile
+
+MAX_FILES = 20
+OLD_MAIN = "".join(f"line {i}\n" for i in range(1, 21))
+NEW_MAIN = OLD_MAIN.replace("line 10\n", "line ten\n") + "line 21\n"
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for path, data in files.items():
+            archive.writestr(path, data)
+    return buffer.getvalue()
+
+
+class CodeVersionDiffTestCase(APITestCase):
+    """代码版本比较测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.media_root = tempfile.mkdtemp()
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.student, cls.outsider = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com", user_id=f"student{i:03d}", name=f"student{i}",
+                school="student school", role="STUDENT", password="!"
+            ) for i in range(1, 3)
+        ])
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course", teacher=cls.teacher,
+            start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=2),
+        )
+        cls.course.students.add(cls.student, cls.outsider)
+        cls.group = Group.objects.create(course=cls.course, creator=cls.student)
+        cls.group.students.add(cls.student)
+
+        files = {f"src/module_{i}.py": f"x = {i}\n" for i in range(MAX_FILES)}
+        old = {**files, "src/main.py": OLD_MAIN, "src/legacy.py": "old = True\n", "logo.png": b"\x89PNG\x00"}
+        new = {**files, "src/main.py": NEW_MAIN, "src/new.py": "new = True\n", "logo.png": b"\x89PNG\x00\x01"}
+        with override_settings(MEDIA_ROOT=cls.media_root):
+            cls.old = GroupCodeVersion.objects.create(
+                group=cls.group, version="v1", zip_file=SimpleUploadedFile("code.zip", make_zip(old))
+            )
+            cls.new = GroupCodeVersion.objects.create(
+                group=cls.group, version="v2", zip_file=SimpleUploadedFile("code.zip", make_zip(new))
+            )
+            ingest_version(cls.old)
+            ingest_version(cls.new)
+        print("-----测试数据准备完成-----\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        diff_cache().clear()
+        self.client.force_authenticate(self.student)
+
+    def diff_url(self, base=None, target=None, group=None):
+        return (
+            f"{reverse('group-list')}{(group or self.group).id}/versions/"
+            f"{base or self.old.id}/diff/{target or self.new.id}/"
+        )
+    # endregion
+
+    # region 文件级比较测试
+    def test_compare_versions(self):
+        """测试新增、删除、修改的文件与未变化的文件数，不读取文件内容"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.diff_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "获取版本差异成功")
+        data = response.data["data"]
+        self.assertEqual((data["base"], data["target"]), (str(self.old.id), str(self.new.id)))
+        self.assertEqual([e["path"] for e in data["added"]], ["src/new.py"])
+        self.assertEqual([e["path"] for e in data["removed"]], ["src/legacy.py"])
+        self.assertEqual([e["path"] for e in data["modified"]], ["logo.png", "src/main.py"])
+        self.assertEqual(data["unchanged"], MAX_FILES)
+        main = data["modified"][1]
+        self.assertEqual(main["old_hash"], CodeBlob.from_content(OLD_MAIN).hash)
+        self.assertEqual(main["new_hash"], CodeBlob.from_content(NEW_MAIN).hash)
+        self.assertIsNone(data["added"][0]["old_file_id"])
+        self.assertFalse(any("course_codeblob" in q["sql"] for q in context.captured_queries))
+
+    def test_compare_is_cached(self):
+        """测试比较结果缓存后不再查询文件记录"""
+        expected = compare_versions(self.old.id, self.new.id)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(compare_versions(self.old.id, self.new.id), expected)
+        self.assertEqual(len(context), 0)
+        reverse_diff = compare_versions(self.new.id, self.old.id)
+        self.assertEqual([e["path"] for e in reverse_diff["added"]], ["src/legacy.py"])
+    # endregion
+
+    # region 文件差异测试
+    def test_file_hunks(self):
+        """测试按文件生成 hunk，context 控制上下文行数"""
+        response = self.client.get(self.diff_url(), {"path": "src/main.py", "context": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data["data"]
+        self.assertFalse(data["binary"])
+        self.assertEqual(data["hunks"], [
+            {"old_start": 9, "old_lines": 3, "new_start": 9, "new_lines": 3,
+             "lines": [" line 9", "-line 10", "+line ten", " line 11"]},
+            {"old_start": 20, "old_lines": 1, "new_start": 20, "new_lines": 2,
+             "lines": [" line 20", "+line 21"]},
+        ])
+        response = self.client.get(self.diff_url(), {"path": "src/main.py", "context": 5})
+        self.assertEqual(len(response.data["data"]["hunks"]), 1)
+
+        response = self.client.get(self.diff_url(), {"path": "src/new.py"})
+        self.assertEqual(response.data["data"]["hunks"], [
+            {"old_start": 0, "old_lines": 0, "new_start": 1, "new_lines": 1, "lines": ["+new = True"]},
+        ])
+        response = self.client.get(self.diff_url(), {"path": "logo.png"})
+        self.assertTrue(response.data["data"]["binary"])
+        self.assertEqual(response.data["data"]["hunks"], [])
+
+    def test_hunks_are_cached(self):
+        """测试相同内容的差异只计算一次"""
+        old, new = CodeBlob.from_content(OLD_MAIN).hash, CodeBlob.from_content(NEW_MAIN).hash
+        expected = diff_hunks(old, new)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(diff_hunks(old, new), expected)
+        self.assertEqual(len(context), 0)
+
+    def test_invalid_requests(self):
+        """测试未变化的文件、错误的参数与未处理完成的版本"""
+        response = self.client.get(self.diff_url(), {"path": "src/module_1.py"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.diff_url(), {"path": "src/main.py", "context": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        processing = GroupCodeVersion.objects.create(
+            group=self.group, version="v3", zip_file="code.zip", status="processing"
+        )
+        response = self.client.get(self.diff_url(target=processing.id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    # endregion
+
+    # region 权限测试
+    def test_permissions(self):
+        """测试教师可以比较，小组外的学生、其他小组的版本与无效ID返回 404"""
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get(self.diff_url()).status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.diff_url()).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(self.student)
+        other_group = Group.objects.create(course=self.course, creator=self.outsider)
+        other = GroupCodeVersion.objects.create(group=other_group, version="v1", zip_file="code.zip")
+        self.assertEqual(self.client.get(self.diff_url(target=other.id)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.diff_url(target="invalid")).status_code, status.HTTP_404_NOT_FOUND)
+    # endregion
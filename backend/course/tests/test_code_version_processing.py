@@ -0,0 +1,234 @@
+from rest_framework.test import APITestCase
+from course.ingestion import claim_version, process_pending_versions, process_version, MAX_ATTEMPTS
+from course.models import CodeBlob, Course, CourseSubject, Group, GroupCodeFile, GroupCodeVersion, GroupSubject
+from subject.models import Subject
+from accounts.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+
+MAX_VERSIONS = 12
+MAX_THREADS = 4
+
+
+def make_zip(count):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i in range(count):
+            archive.writestr(f"src/module_{i}.py", f"x = {i}\n")
+    return buffer.getvalue()
+
+
+class TempMediaMixin:
+    """上传文件写入临时目录"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+
+class CodeVersionProcessingTestCase(TempMediaMixin, APITestCase):
+    """代码版本后台处理测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.student = User.objects.create(
+            email="student@example.com", user_id="student001", name="student",
+            school="student school", role="STUDENT", password="!"
+        )
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course",
+            teacher=cls.teacher,
+            start_date=today - datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+        )
+        Course.objects.filter(pk=cls.course.pk).update(status="in_progress")
+        cls.course.students.add(cls.student)
+        subject = Subject.objects.create(
+            title="subject", description="subject description", creator=cls.teacher,
+            languages=["PYTHON"], status="APPROVED"
+        )
+        course_subject = CourseSubject.objects.create(course=cls.course, subject_type="PRIVATE", private_subject=subject)
+        cls.group = Group.objects.create(course=cls.course, creator=cls.student)
+        cls.group.students.add(cls.student)
+        GroupSubject.objects.create(group=cls.group, course_subject=course_subject)
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.student)
+
+    def upload(self, data, name="v1"):
+        return self.client.post(
+            f"{reverse('group-list')}{self.group.id}/versions/",
+            {"version": name, "description": "", "zip_file": SimpleUploadedFile("code.zip", data)},
+            format="multipart",
+        )
+
+    def get_status(self, version_id):
+        return self.client.get(f"{reverse('group-list')}{self.group.id}/versions/{version_id}/status/")
+    # endregion
+
+    # region 处理流程测试
+    def test_upload_returns_accepted_and_worker_processes(self):
+        """测试上传立即返回 processing，后台处理后状态接口返回完成的进度"""
+        response = self.upload(make_zip(5))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        version_id = response.data["data"]["id"]
+        self.assertEqual(response.data["data"]["status"], "processing")
+        self.assertFalse(GroupCodeFile.objects.filter(version_id=version_id).exists())
+
+        response = self.get_status(version_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "获取版本处理状态成功")
+        self.assertEqual(response.data["data"]["status"], "processing")
+
+        self.assertEqual(process_pending_versions(), 1)
+        data = self.get_status(version_id).data["data"]
+        self.assertEqual(data["status"], "ready")
+        self.assertEqual((data["processed_files"], data["total_files"]), (5, 5))
+        self.assertEqual(data["processed_size"], data["total_size"])
+        self.assertEqual(GroupCodeFile.objects.filter(version_id=version_id).count(), 5)
+        self.assertEqual(process_pending_versions(), 0)
+
+    def test_failed_version_cleaned_up_by_worker(self):
+        """测试损坏的 ZIP 由后台任务标记失败并删除上传的文件，同名版本可以重新上传"""
+        version_id = self.upload(b"not a zip").data["data"]["id"]
+        path = GroupCodeVersion.objects.get(pk=version_id).zip_file.path
+        self.assertTrue(os.path.exists(path))
+
+        process_pending_versions()
+        data = self.get_status(version_id).data["data"]
+        self.assertEqual(data["status"], "failed")
+        self.assertIn("处理ZIP文件失败", data["error"])
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(GroupCodeVersion.objects.get(pk=version_id).zip_file.name, "")
+
+        response = self.upload(make_zip(1))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(GroupCodeVersion.objects.filter(pk=version_id).exists())
+
+    def test_submit_requires_ready_version(self):
+        """测试处理中的版本不能提交"""
+        version_id = self.upload(make_zip(1)).data["data"]["id"]
+        response = self.client.post(
+            f"{reverse('group-list')}{self.group.id}/submit_code/",
+            {"code_version_id": version_id, "contributions": [{"student_id": self.student.user_id, "contribution": 100}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("尚未处理完成", str(response.data))
+    # endregion
+
+    # region 中断恢复测试
+    def test_stale_version_reclaimed(self):
+        """测试心跳超时的版本被重新领取，并清理上次写入的记录"""
+        version_id = self.upload(make_zip(3)).data["data"]["id"]
+        version = claim_version()
+        self.assertEqual(str(version.pk), version_id)
+        blob = CodeBlob.from_content("partial")
+        blob.save()
+        GroupCodeFile.objects.create(version=version, path="src/module_0.py", blob=blob, size=7)
+        # 心跳未超时，不会被其他进程领取
+        self.assertIsNone(claim_version())
+
+        later = timezone.now() + datetime.timedelta(hours=1)
+        version = claim_version(now=later)
+        self.assertEqual(version.attempts, 2)
+        self.assertEqual(process_pending_versions(), 0)
+        self.assertTrue(process_version(version))
+        self.assertEqual(GroupCodeFile.objects.filter(version=version).count(), 3)
+        self.assertEqual(GroupCodeFile.objects.get(version=version, path="src/module_0.py").content, "x = 0\n")
+
+    def test_too_many_attempts(self):
+        """测试多次中断的版本被标记为失败"""
+        version_id = self.upload(make_zip(1)).data["data"]["id"]
+        GroupCodeVersion.objects.filter(pk=version_id).update(attempts=MAX_ATTEMPTS)
+        process_pending_versions()
+        version = GroupCodeVersion.objects.get(pk=version_id)
+        self.assertEqual(version.status, "failed")
+        self.assertIn("多次处理均未完成", version.error)
+
+    def test_command_once(self):
+        """测试处理命令"""
+        self.upload(make_zip(1))
+        out = io.StringIO()
+        call_command("process_code_versions", "--once", stdout=out)
+        self.assertIn("已处理 1 个代码版本", out.getvalue())
+    # endregion
+
+
+class CodeVersionClaimConcurrencyTestCase(TempMediaMixin, TransactionTestCase):
+    """多个处理进程并发领取测试（线程使用各自的数据库连接，需要真实提交的事务）"""
+
+    def setUp(self):
+        super().setUp()
+        teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        today = timezone.now().date()
+        course = Course.objects.create(
+            name="course", teacher=teacher,
+            start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=2),
+        )
+        group = Group.objects.create(course=course, creator=teacher)
+        for i in range(MAX_VERSIONS):
+            GroupCodeVersion.objects.create(
+                group=group, version=f"v{i}", status="processing",
+                zip_file=SimpleUploadedFile("code.zip", make_zip(3)),
+            )
+
+    def test_each_version_processed_once(self):
+        """测试并发的处理进程不会重复领取同一版本"""
+        print("-----正在测试并发领取-----")
+        counts = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(MAX_THREADS)
+
+        def worker():
+            barrier.wait()
+            try:
+                processed = process_pending_versions()
+                with lock:
+                    counts.append(processed)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(MAX_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(counts), MAX_VERSIONS)
+        self.assertFalse(GroupCodeVersion.objects.exclude(status="ready").exists())
+        self.assertFalse(GroupCodeVersion.objects.exclude(attempts=1).exists())
+        self.assertEqual(GroupCodeFile.objects.count(), MAX_VERSIONS * 3)
+        print("-----并发领取测试结束-----")
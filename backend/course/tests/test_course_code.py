@@ -0,0 +1,113 @@
+from rest_framework.test import APITestCase
+from course.models import Course
+from course.codes import CourseCodeExhausted
+from accounts.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from unittest import mock
+import datetime
+
+
+class CourseCodeAllocationTestCase(APITestCase):
+    """课程码分配测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+
+    def create_course(self, **kwargs):
+        """直接通过模型创建课程"""
+        today = timezone.now().date()
+        return Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            **kwargs
+        )
+    # endregion
+
+    # region 基础功能测试
+    def test_create_course_without_pre_check_query(self):
+        """测试接口创建课程时不再预先查询课程码是否存在"""
+        print("-----正在测试课程码分配-----")
+        today = timezone.now().date()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse("course-list"),
+                data={
+                    "name": "course",
+                    "description": "description",
+                    "start_date": (today + datetime.timedelta(days=1)).isoformat(),
+                    "end_date": (today + datetime.timedelta(days=2)).isoformat(),
+                    "max_group_size": 3,
+                    "min_group_size": 1,
+                    "max_subject_selections": 1
+                },
+                headers={"Authorization": f"Bearer {self.teacher_token}"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        course = Course.objects.get()
+        self.assertEqual(len(course.course_code), 6)
+        self.assertTrue(course.course_code.isalnum())
+        self.assertFalse(any(
+            q["sql"].startswith("SELECT") and '"course_course"."course_code" =' in q["sql"]
+            for q in context.captured_queries
+        ))
+        print("-----课程码分配测试结束-----")
+
+    def test_conflict_retries_with_new_code(self):
+        """测试课程码冲突时在保存点中重试"""
+        existing = self.create_course()
+        with mock.patch("course.codes.generate_course_code", side_effect=[existing.course_code, "NEWONE"]):
+            course = self.create_course()
+        self.assertEqual(course.course_code, "NEWONE")
+        self.assertEqual(course.course_code_attempts, 2)
+        self.assertEqual(Course.objects.count(), 2)
+
+    def test_explicit_code_is_kept(self):
+        """测试显式指定的课程码不会被覆盖"""
+        course = self.create_course(course_code="FIXED1")
+        self.assertEqual(Course.objects.get(id=course.id).course_code, "FIXED1")
+
+    @override_settings(COURSE_CODE_LENGTH=8, COURSE_CODE_ALPHABET="XY")
+    def test_configurable_length_and_alphabet(self):
+        """测试课程码长度和字符集可配置"""
+        course = self.create_course()
+        self.assertEqual(len(course.course_code), 8)
+        self.assertTrue(set(course.course_code) <= {"X", "Y"})
+    # endregion
+
+    # region 异常测试
+    @override_settings(COURSE_CODE_LENGTH=1, COURSE_CODE_ALPHABET="AB")
+    def test_exhausted_code_space(self):
+        """测试码空间耗尽时抛出异常"""
+        self.create_course(course_code="A")
+        self.create_course(course_code="B")
+        with self.assertRaises(CourseCodeExhausted):
+            self.create_course()
+        self.assertEqual(Course.objects.count(), 2)
+    # endregion
@@ -0,0 +1,232 @@
+from rest_framework.test import APITestCase
+from course.exports import build_export, claim_export, enqueue_completed_courses, process_pending_exports
+from course.models import Course, CourseExport, CourseSubject, Group, GroupSubject, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution
+from subject.models import Subject
+from accounts.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+MAX_GROUPS = 3
+
+
+class CourseExportTestCase(APITestCase):
+    """课程导出预构建测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.media_root = tempfile.mkdtemp()
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com", user_id=f"student{i:03d}", name=f"student{i}",
+                school="student school", role="STUDENT", password="!"
+            ) for i in range(MAX_GROUPS)
+        ])
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course", teacher=cls.teacher,
+            start_date=today - datetime.timedelta(days=10), end_date=today - datetime.timedelta(days=1),
+        )
+        cls.course.students.add(*cls.students)
+        subject = Subject.objects.create(
+            title="subject", description="subject description", creator=cls.teacher,
+            languages=["PYTHON"], status="APPROVED"
+        )
+        course_subject = CourseSubject.objects.create(course=cls.course, subject_type="PRIVATE", private_subject=subject)
+        with override_settings(MEDIA_ROOT=cls.media_root):
+            for student in cls.students:
+                group = Group.objects.create(course=cls.course, creator=student)
+                group.students.add(student)
+                GroupSubject.objects.create(group=group, course_subject=course_subject)
+                version = GroupCodeVersion.objects.create(
+                    group=group, version="v1", zip_file=SimpleUploadedFile("code.zip", os.urandom(5000))
+                )
+                submission = GroupSubmission.objects.create(group=group, code_version=version, is_submitted=True)
+                GroupSubmissionContribution.objects.create(submission=submission, student=student, contribution=100)
+        print("-----测试数据准备完成-----\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.client.force_authenticate(self.teacher)
+        self.url = f"{reverse('course-list')}{self.course.id}/download_submissions/"
+        self.export_url = f"{reverse('course-list')}{self.course.id}/export/"
+
+    def tearDown(self):
+        self.override.disable()
+
+    def build(self):
+        """请求并构建导出，返回构建好的导出"""
+        self.client.post(self.export_url)
+        self.assertEqual(process_pending_exports(), 1)
+        return CourseExport.objects.get(course=self.course)
+    # endregion
+
+    # region 构建测试
+    def test_download_requests_build(self):
+        """测试第一次下载流式输出并请求构建，构建后下载已保存的文件"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        streamed = b"".join(response.streaming_content)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(CourseExport.objects.get(course=self.course).status, "processing")
+
+        self.assertEqual(process_pending_exports(), 1)
+        export = CourseExport.objects.get(course=self.course)
+        self.assertEqual(export.status, "ready")
+        content = default_storage.open(export.file.name).read()
+        self.assertEqual(export.hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(export.size, len(content))
+        self.assertIn(export.hash, export.file.name)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+            downloaded = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(downloaded, content)
+        self.assertEqual(response["ETag"], f'"{export.hash}"')
+        self.assertEqual(response["Content-Length"], str(len(content)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertFalse(any("course_groupsubmission" in q["sql"] for q in context.captured_queries))
+        with zipfile.ZipFile(io.BytesIO(content)) as built, zipfile.ZipFile(io.BytesIO(streamed)) as stream:
+            self.assertEqual(built.namelist(), stream.namelist())
+            for name in built.namelist():
+                self.assertEqual(built.read(name), stream.read(name))
+
+    def test_export_status(self):
+        """测试查询与请求构建导出，学生无权限"""
+        response = self.client.get(self.export_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(self.export_url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["data"]["status"], "processing")
+        process_pending_exports()
+        response = self.client.get(self.export_url)
+        self.assertEqual(response.data["message"], "获取课程导出状态成功")
+        self.assertEqual(response.data["data"]["status"], "ready")
+
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.export_url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_enqueue_completed_courses(self):
+        """测试已结束且有提交的课程自动加入队列"""
+        today = timezone.now().date()
+        Course.objects.create(
+            name="empty", teacher=self.teacher,
+            start_date=today - datetime.timedelta(days=10), end_date=today - datetime.timedelta(days=1),
+        )
+        self.assertEqual(enqueue_completed_courses(), 1)
+        self.assertEqual(enqueue_completed_courses(), 0)
+        out = io.StringIO()
+        call_command("build_course_exports", "--once", stdout=out)
+        self.assertIn("已构建 1 个课程导出", out.getvalue())
+        self.assertEqual(CourseExport.objects.get().status, "ready")
+
+    def test_build_failure(self):
+        """测试构建失败记录原因，再次请求时重新排队"""
+        version = GroupCodeVersion.objects.filter(group__course=self.course).first()
+        name = version.zip_file.name
+        data = default_storage.open(name).read()
+        default_storage.delete(name)
+        try:
+            export = self.build()
+            self.assertEqual(export.status, "failed")
+            self.assertIn("构建导出失败", export.error)
+            self.assertEqual(self.client.post(self.export_url).data["data"]["status"], "processing")
+        finally:
+            default_storage.save(name, io.BytesIO(data))
+    # endregion
+
+    # region 失效测试
+    def test_submission_change_invalidates(self):
+        """测试提交信息变化后导出重新排队，重新构建后删除旧文件"""
+        export = self.build()
+        old_name = export.file.name
+        contribution = GroupSubmissionContribution.objects.filter(submission__group__course=self.course).first()
+        contribution.contribution = 50
+        contribution.save()
+        export.refresh_from_db()
+        self.assertEqual((export.status, export.revision), ("processing", 1))
+        response = self.client.get(self.url)
+        b"".join(response.streaming_content)
+        self.assertNotIn("ETag", response)
+
+        self.assertEqual(process_pending_exports(), 1)
+        export.refresh_from_db()
+        self.assertEqual(export.status, "ready")
+        self.assertNotEqual(export.file.name, old_name)
+        self.assertFalse(default_storage.exists(old_name))
+        with zipfile.ZipFile(export.file.open("rb")) as archive:
+            self.assertIn("(50.00%)", archive.read("submissions.csv").decode())
+
+    def test_change_during_build_discards_result(self):
+        """测试构建期间提交信息变化时丢弃构建结果"""
+        self.client.post(self.export_url)
+        export = claim_export()
+        Group.objects.filter(course=self.course).first().save()
+        self.assertFalse(build_export(export))
+        export.refresh_from_db()
+        self.assertEqual((export.status, export.file.name), ("processing", ""))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "course_exports", str(self.course.id))), [])
+        self.assertEqual(process_pending_exports(), 1)
+        self.assertEqual(CourseExport.objects.get(pk=export.pk).status, "ready")
+    # endregion
+
+    # region 断点续传测试
+    def test_range_and_etag(self):
+        """测试 Range、If-Range 与 If-None-Match"""
+        export = self.build()
+        content = default_storage.open(export.file.name).read()
+        etag = f'"{export.hash}"'
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(response.streaming_content), content[100:200])
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(content)}")
+        self.assertEqual(response["Content-Length"], "100")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10", HTTP_IF_RANGE=etag)
+        self.assertEqual(b"".join(response.streaming_content), content[-10:])
+        response = self.client.get(self.url, HTTP_RANGE="bytes=1000-")
+        self.assertEqual(b"".join(response.streaming_content), content[1000:])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), content)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), content)
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(content)}-")
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(content)}")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+    # endregion
@@ -0,0 +1,178 @@
+from rest_framework.test import APITestCase
+from course.grouping import form_groups
+from course.models import Course, CourseMembership, CourseSubject, Group, GroupCodeVersion, GroupSubject
+from course.roster import remove_students
+from subject.models import Subject
+from accounts.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+
+
+class CourseMembershipTestCase(APITestCase):
+    """课程成员表与我的课程信息测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        # 批量创建学生，跳过逐个密码哈希
+        cls.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT",
+                password="!"
+            ) for i in range(1, 7)
+        ])
+        cls.subject = Subject.objects.create(
+            title="subject",
+            description="subject description",
+            creator=cls.teacher,
+            languages=["PYTHON"],
+            status="APPROVED"
+        )
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            max_group_size=3,
+            min_group_size=1,
+        )
+        self.course.students.add(*self.students)
+
+    def group_of(self, student):
+        return CourseMembership.objects.values_list("group_id", flat=True).get(course=self.course, user=student)
+
+    def me(self, student, course_id=None):
+        self.client.force_authenticate(student)
+        return self.client.get(f'{reverse("course-list")}{course_id or self.course.id}/me/')
+    # endregion
+
+    # region 成员小组同步测试
+    def test_group_endpoints_keep_membership_in_sync(self):
+        """测试建组、加入、退出小组接口同步课程成员所在小组"""
+        first, second = self.students[:2]
+        self.client.force_authenticate(first)
+        response = self.client.post(reverse("group-list"), {"course": self.course.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        group = Group.objects.get(course=self.course)
+        self.assertEqual(self.group_of(first), group.id)
+
+        self.client.force_authenticate(second)
+        response = self.client.post(f'{reverse("group-list")}{group.id}/join/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.group_of(second), group.id)
+
+        response = self.client.post(
+            f'{reverse("group-list")}{group.id}/leave/', {"student_user_id": second.user_id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(self.group_of(second))
+
+        # 已在小组中的学生不能再建组
+        self.client.force_authenticate(first)
+        response = self.client.post(reverse("group-list"), {"course": self.course.id})
+        self.assertIn("您已经加入了小组", response.data["message"])
+
+    def test_orm_and_bulk_paths(self):
+        """测试 ORM 增删成员、删除小组、自动分组与移出学生后成员小组一致"""
+        group = Group.objects.create(course=self.course, creator=self.students[0])
+        group.students.add(*self.students[:2])
+        self.assertEqual(self.group_of(self.students[1]), group.id)
+        self.students[1].user_groups.remove(group)
+        self.assertIsNone(self.group_of(self.students[1]))
+        group.students.clear()
+        self.assertIsNone(self.group_of(self.students[0]))
+
+        group.students.add(self.students[0])
+        group.delete()
+        self.assertIsNone(self.group_of(self.students[0]))
+
+        form_groups(self.course, seed=1)
+        expected = dict(
+            Group.students.through.objects.filter(group__course=self.course).values_list("user_id", "group_id")
+        )
+        actual = dict(CourseMembership.objects.filter(course=self.course).values_list("user_id", "group_id"))
+        self.assertEqual(actual, expected)
+
+        remove_students(self.course, [self.students[0].user_id])
+        self.assertFalse(CourseMembership.objects.filter(course=self.course, user=self.students[0]).exists())
+
+    def test_join_checks_membership_row(self):
+        """测试加入小组根据课程成员行判断是否已有小组"""
+        first = Group.objects.create(course=self.course, creator=self.students[0])
+        second = Group.objects.create(course=self.course, creator=self.students[1])
+        first.students.add(self.students[0])
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(f'{reverse("group-list")}{second.id}/join/')
+        self.assertIn("您已经加入了其他小组", response.data["message"])
+        response = self.client.post(f'{reverse("group-list")}{first.id}/join/')
+        self.assertIn("您已经加入该小组", response.data["message"])
+    # endregion
+
+    # region 我的课程信息测试
+    def test_me_without_group(self):
+        """测试未分组的学生"""
+        response = self.me(self.students[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "获取我的课程信息成功")
+        data = response.data["data"]
+        self.assertEqual(data["course_id"], self.course.id)
+        self.assertIsNone(data["group"])
+        self.assertIsNone(data["subject"])
+        self.assertIsNone(data["latest_version"])
+
+    def test_me_with_group_subject_and_version(self):
+        """测试返回小组、课题与最新版本，且只用一条查询"""
+        group = Group.objects.create(course=self.course, creator=self.students[0])
+        group.students.add(*self.students[:2])
+        course_subject = CourseSubject.objects.create(
+            course=self.course, subject_type="PRIVATE", private_subject=self.subject
+        )
+        GroupSubject.objects.create(group=group, course_subject=course_subject)
+        GroupCodeVersion.objects.create(group=group, version="v1", zip_file="group_codes/zip/v1.zip")
+        latest = GroupCodeVersion.objects.create(group=group, version="v2", zip_file="group_codes/zip/v2.zip")
+
+        self.me(self.students[1])
+        with CaptureQueriesContext(connection) as context:
+            response = self.me(self.students[1])
+        self.assertEqual(len(context), 1)
+        data = response.data["data"]
+        self.assertEqual(data["group"]["id"], group.id)
+        self.assertEqual(data["group"]["size"], 2)
+        self.assertFalse(data["group"]["is_creator"])
+        self.assertEqual(data["subject"], {"course_subject_id": course_subject.id, "title": "subject"})
+        self.assertEqual(data["latest_version"]["id"], latest.id)
+        self.assertEqual(data["latest_version"]["version"], "v2")
+
+    def test_me_not_member(self):
+        """测试未加入课程或课程不存在时返回 404，教师不能访问"""
+        outsider = User.objects.create(
+            email="outsider@example.com", user_id="outsider", name="outsider",
+            school="school", role="STUDENT", password="!"
+        )
+        self.assertEqual(self.me(outsider).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.me(self.students[0], course_id="123").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.me(self.teacher).status_code, status.HTTP_403_FORBIDDEN)
+    # endregion
@@ -0,0 +1,171 @@
+from rest_framework.test import APITestCase
+from CodeCollab.api.pagination import CustomPagination
+from course.models import Course
+from accounts.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from types import SimpleNamespace
+import datetime
+
+MAX_COURSES = 25
+
+
+class CourseCursorPaginationTestCase(APITestCase):
+    """课程键集分页测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f"student{i}@example.com",
+                password="student123",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT"
+            ) for i in range(1, 13)
+        ]
+        cls.url = reverse("course-list")
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+
+    def create_courses(self, count):
+        """批量创建课程，所有课程使用相同的创建时间以验证 id 作为第二排序键"""
+        today = timezone.now().date()
+        courses = [
+            Course.objects.create(
+                name=f"course_{i}",
+                teacher=self.teacher,
+                course_code=f"CODE{i:02d}",
+                start_date=today + datetime.timedelta(days=1),
+                end_date=today + datetime.timedelta(days=2),
+            ) for i in range(count)
+        ]
+        Course.objects.filter(id__in=[c.id for c in courses[:10]]).update(created_at=courses[0].created_at)
+        return courses
+
+    def walk(self, url):
+        """沿 next 链接遍历所有页"""
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn("message", response.data)
+            ids.extend(item["id"] if "id" in item else item["user_id"] for item in response.data["data"]["results"])
+            url = response.data["data"]["next"]
+            pages += 1
+        return ids, pages
+    # endregion
+
+    # region 基础功能测试
+    def test_cursor_walks_all_courses_once(self):
+        """测试沿游标遍历能完整、不重复地返回所有课程"""
+        print("-----正在测试课程键集分页-----")
+        courses = self.create_courses(MAX_COURSES)
+        ids, pages = self.walk(f"{self.url}?pagination=cursor&page_size=7")
+        self.assertEqual(pages, 4)
+        self.assertEqual(len(ids), MAX_COURSES)
+        self.assertEqual(set(ids), {str(c.id) for c in courses})
+        expected = list(Course.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, [str(i) for i in expected])
+        print("-----课程键集分页测试结束-----")
+
+    def test_cursor_response_has_no_count(self):
+        """测试键集分页不返回总数，且首页没有上一页"""
+        self.create_courses(3)
+        response = self.client.get(
+            f"{self.url}?pagination=cursor",
+            headers={"Authorization": f"Bearer {self.teacher_token}"}
+        )
+        self.assertNotIn("count", response.data["data"])
+        self.assertIsNone(response.data["data"]["previous"])
+        self.assertIsNone(response.data["data"]["next"])
+
+    def test_cursor_previous_link(self):
+        """测试上一页链接返回之前的数据"""
+        self.create_courses(MAX_COURSES)
+        first = self.client.get(
+            f"{self.url}?pagination=cursor&page_size=10",
+            headers={"Authorization": f"Bearer {self.teacher_token}"}
+        ).data["data"]
+        second = self.client.get(first["next"], headers={"Authorization": f"Bearer {self.teacher_token}"}).data["data"]
+        back = self.client.get(second["previous"], headers={"Authorization": f"Bearer {self.teacher_token}"}).data["data"]
+        self.assertEqual([c["id"] for c in back["results"]], [c["id"] for c in first["results"]])
+
+    def test_deep_page_costs_same_queries(self):
+        """测试深页与首页的查询数相同"""
+        self.create_courses(MAX_COURSES)
+        with CaptureQueriesContext(connection) as first_page:
+            first = self.client.get(
+                f"{self.url}?pagination=cursor&page_size=5",
+                headers={"Authorization": f"Bearer {self.teacher_token}"}
+            ).data["data"]
+        url = first["next"]
+        for _ in range(3):
+            url = self.client.get(url, headers={"Authorization": f"Bearer {self.teacher_token}"}).data["data"]["next"]
+        with CaptureQueriesContext(connection) as deep_page:
+            self.client.get(url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+        self.assertEqual(len(first_page.captured_queries), len(deep_page.captured_queries))
+        self.assertFalse(any("OFFSET" in q["sql"] for q in deep_page.captured_queries))
+
+    def test_students_cursor(self):
+        """测试学生列表键集分页按学号排序"""
+        course = self.create_courses(1)[0]
+        course.students.add(*self.students)
+        ids, pages = self.walk(f"{self.url}{course.id}/students/?pagination=cursor&page_size=5")
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, sorted(s.user_id for s in self.students))
+    # endregion
+
+    # region 异常测试
+    def test_invalid_cursor(self):
+        """测试无效游标返回404"""
+        response = self.client.get(
+            f"{self.url}?cursor=not-a-cursor",
+            headers={"Authorization": f"Bearer {self.teacher_token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn("message", response.data)
+        self.assertIn("data", response.data)
+
+    def test_cursor_page_size(self):
+        """测试游标分页的 page_size 无效时使用默认值，超过上限时取上限"""
+        self.create_courses(12)
+        for value in ("0", "-3", "abc", ""):
+            response = self.client.get(
+                f"{self.url}?pagination=cursor&page_size={value}",
+                headers={"Authorization": f"Bearer {self.teacher_token}"}
+            )
+            self.assertEqual(len(response.data["data"]["results"]), 10)
+        pagination = CustomPagination()
+        request = SimpleNamespace(query_params={"page_size": "1000"})
+        self.assertEqual(pagination.get_cursor_page_size(request), pagination.max_page_size)
+
+    def test_page_number_pagination_unchanged(self):
+        """测试默认仍为页码分页"""
+        self.create_courses(12)
+        response = self.client.get(self.url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+        self.assertEqual(response.data["data"]["count"], 12)
+        self.assertEqual(len(response.data["data"]["results"]), 10)
+    # endregion
@@ -0,0 +1,161 @@
+from rest_framework.test import APITestCase
+from course.exports import stream_archive
+from course.models import Course, CourseSubject, Group, GroupSubject, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution
+from subject.models import Subject
+from accounts.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from unittest import mock
+import csv
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+MAX_GROUPS = 5
+
+
+class DownloadSubmissionsTestCase(APITestCase):
+    """课程提交导出测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.media_root = tempfile.mkdtemp()
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com", user_id=f"student{i:03d}", name=f"student{i}",
+                school="student school", role="STUDENT", password="!"
+            ) for i in range(MAX_GROUPS * 2)
+        ])
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course", teacher=cls.teacher,
+            start_date=today - datetime.timedelta(days=10), end_date=today - datetime.timedelta(days=1),
+        )
+        cls.course.students.add(*cls.students)
+        subject = Subject.objects.create(
+            title="subject", description="subject description", creator=cls.teacher,
+            languages=["PYTHON"], status="APPROVED"
+        )
+        course_subject = CourseSubject.objects.create(course=cls.course, subject_type="PRIVATE", private_subject=subject)
+
+        cls.archives = {}
+        with override_settings(MEDIA_ROOT=cls.media_root):
+            for i in range(MAX_GROUPS):
+                group = Group.objects.create(course=cls.course, creator=cls.students[2 * i])
+                group.students.add(*cls.students[2 * i:2 * i + 2])
+                GroupSubject.objects.create(group=group, course_subject=course_subject)
+                data = os.urandom(3000 + i)
+                version = GroupCodeVersion.objects.create(
+                    group=group, version="v1", zip_file=SimpleUploadedFile("code.zip", data)
+                )
+                submission = GroupSubmission.objects.create(group=group, code_version=version, is_submitted=True)
+                GroupSubmissionContribution.objects.bulk_create([
+                    GroupSubmissionContribution(submission=submission, student=student, contribution=50)
+                    for student in cls.students[2 * i:2 * i + 2]
+                ])
+                cls.archives[group.name] = data
+        cls.first = Group.objects.earliest("created_at")
+        # 未提交的小组
+        cls.idle = Group.objects.create(course=cls.course, creator=cls.teacher)
+        print("-----测试数据准备完成-----\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.client.force_authenticate(self.teacher)
+        self.url = f"{reverse('course-list')}{self.course.id}/download_submissions/"
+
+    def tearDown(self):
+        self.override.disable()
+    # endregion
+
+    # region 导出测试
+    def test_download_streams_archive(self):
+        """测试流式导出的压缩包包含各小组的代码 ZIP 与提交信息"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertIn("attachment", response["Content-Disposition"])
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            for name, data in self.archives.items():
+                self.assertEqual(archive.read(f"code/{name}/{name}.zip"), data)
+            rows = list(csv.reader(io.StringIO(archive.read("submissions.csv").decode())))
+        self.assertEqual(rows[0], ["小组名称", "课题名称", "成员贡献"])
+        rows = {row[0]: row[1:] for row in rows[1:]}
+        self.assertEqual(len(rows), MAX_GROUPS + 1)
+        self.assertEqual(rows[self.idle.name], ["未选题", "未提交(-1)"])
+        self.assertEqual(rows[self.first.name][0], "subject")
+        self.assertEqual(sorted(rows[self.first.name][1].split(", ")), ["student0(50.00%)", "student1(50.00%)"])
+
+    def test_query_count_does_not_grow(self):
+        """测试查询数量与小组数量无关"""
+        # 第一次下载会请求后台构建导出
+        b"".join(self.client.get(self.url).streaming_content)
+        with CaptureQueriesContext(connection) as context:
+            b"".join(self.client.get(self.url).streaming_content)
+        queries = len(context)
+        group = Group.objects.create(course=self.course, creator=self.teacher)
+        GroupSubject.objects.create(group=group, course_subject=CourseSubject.objects.get(course=self.course))
+        version = GroupCodeVersion.objects.create(group=group, version="v1", zip_file=SimpleUploadedFile("code.zip", b"x"))
+        GroupSubmission.objects.create(group=group, code_version=version, is_submitted=True)
+        with CaptureQueriesContext(connection) as context:
+            b"".join(self.client.get(self.url).streaming_content)
+        self.assertEqual(len(context), queries)
+
+    def test_course_not_completed(self):
+        """测试课程未结束时不能导出"""
+        Course.objects.filter(pk=self.course.pk).update(
+            end_date=timezone.now().date() + datetime.timedelta(days=1), status="in_progress"
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    # endregion
+
+    # region 压缩包测试
+    def test_stream_archive_chunks(self):
+        """测试按块输出，每块不超过复制的块大小加文件头"""
+        name = GroupCodeVersion.objects.get(group=self.first).zip_file.name
+        chunks = list(stream_archive("a,b\n", [("code.zip", name)], chunk_size=512))
+        self.assertGreater(len(chunks), 5)
+        self.assertLessEqual(max(len(chunk) for chunk in chunks[:-1]), 512 + 200)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            self.assertEqual(archive.read("code.zip"), self.archives[self.first.name])
+            self.assertEqual(archive.read("submissions.csv"), b"a,b\n")
+
+    def test_stream_archive_zip64(self):
+        """测试超过 ZIP64 阈值的条目与压缩包"""
+        names = [version.zip_file.name for version in GroupCodeVersion.objects.order_by("group__name")]
+        with mock.patch("zipfile.ZIP64_LIMIT", 1000):
+            content = b"".join(stream_archive("", [(f"{i}.zip", name) for i, name in enumerate(names)]))
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.read("0.zip"), default_storage.open(names[0]).read())
+            self.assertGreater(archive.getinfo("4.zip").header_offset, 1000)
+        # ZIP64 中央目录结束记录
+        self.assertIn(b"PK\x06\x06", content)
+    # endregion
@@ -0,0 +1,193 @@
+from rest_framework.test import APITestCase
+from course.exports import GRADE_FIELDS, stream_grades
+from course.models import Course, CourseSubject, Group, GroupSubject, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution
+from subject.models import Subject
+from accounts.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from xml.etree import ElementTree
+import csv
+import datetime
+import io
+import json
+import zipfile
+
+GROUP_SIZE = 3
+XLSX_NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+class GradeExportTestCase(APITestCase):
+    """成绩导出测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.other_teacher = User.objects.create(
+            email="other@example.com", user_id="teacher002", name="other",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com", user_id=f"student{i:03d}", name=f"student<{i}>",
+                school="student school", role="STUDENT", password="!"
+            ) for i in range(GROUP_SIZE * 3 + 2)
+        ])
+        cls.subject = Subject.objects.create(
+            title="subject & co", description="subject description", creator=cls.teacher,
+            languages=["PYTHON"], status="APPROVED"
+        )
+        cls.spring = cls.create_course("spring", cls.teacher, datetime.date(2025, 2, 20), cls.students[:GROUP_SIZE * 2])
+        cls.autumn = cls.create_course("autumn", cls.teacher, datetime.date(2025, 9, 1), cls.students[GROUP_SIZE * 2:GROUP_SIZE * 3])
+        cls.other = cls.create_course("other", cls.other_teacher, datetime.date(2025, 3, 1), cls.students[:GROUP_SIZE])
+        # 选课但未提交的学生：一个在未提交的小组中，一个未分组
+        cls.unsubmitted, cls.ungrouped = cls.students[GROUP_SIZE * 3:]
+        cls.spring.students.add(cls.unsubmitted, cls.ungrouped)
+        cls.unsubmitted_group = Group.objects.create(course=cls.spring, creator=cls.unsubmitted)
+        cls.unsubmitted_group.students.add(cls.unsubmitted)
+        print("-----测试数据准备完成-----\n")
+
+    @classmethod
+    def create_course(cls, name, teacher, start_date, students):
+        """创建课程，students 按 GROUP_SIZE 分组并各提交一次，贡献度依次为 50、30、20"""
+        course = Course.objects.create(
+            name=name, teacher=teacher, start_date=start_date, end_date=start_date + datetime.timedelta(days=120),
+        )
+        course.students.add(*students)
+        course_subject = CourseSubject.objects.create(course=course, subject_type="PRIVATE", private_subject=cls.subject)
+        for index in range(0, len(students), GROUP_SIZE):
+            members = students[index:index + GROUP_SIZE]
+            group = Group.objects.create(course=course, creator=members[0])
+            group.students.add(*members)
+            GroupSubject.objects.create(group=group, course_subject=course_subject)
+            version = GroupCodeVersion.objects.create(group=group, version="v1", zip_file="v1.zip")
+            submission = GroupSubmission.objects.create(group=group, code_version=version, is_submitted=True)
+            GroupSubmissionContribution.objects.bulk_create([
+                GroupSubmissionContribution(submission=submission, student=student, contribution=value)
+                for student, value in zip(members, (50, 30, 20))
+            ])
+        return course
+
+    def setUp(self):
+        self.client.force_authenticate(self.teacher)
+        self.url = f"{reverse('course-list')}{self.spring.id}/export/"
+        self.term_url = f"{reverse('course-list')}export/"
+
+    def download(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b"".join(response.streaming_content)
+    # endregion
+
+    # region 格式测试
+    def test_csv(self):
+        """测试 CSV 每个学生一行，包含课题、提交时间、贡献度与版本"""
+        response, content = self.download(self.url, format="csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("grades_spring.csv", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows[0], [label for _, label in GRADE_FIELDS])
+        self.assertEqual(len(rows), GROUP_SIZE * 2 + 2 + 1)
+
+        submission = GroupSubmission.objects.get(group__course=self.spring, contributions__student=self.students[0])
+        record = dict(zip([key for key, _ in GRADE_FIELDS], rows[1]))
+        self.assertEqual(record["course_id"], str(self.spring.id))
+        self.assertEqual(record["student_id"], "student000")
+        self.assertEqual(record["student_name"], "student<0>")
+        self.assertEqual(record["group"], submission.group.name)
+        self.assertEqual(record["subject"], "subject & co")
+        self.assertEqual(record["contribution"], "50.00")
+        self.assertEqual(record["version_id"], str(submission.code_version_id))
+        self.assertEqual(
+            datetime.datetime.fromisoformat(record["submitted_at"]), submission.submitted_at
+        )
+
+    def test_jsonl(self):
+        """测试 JSON Lines 每行一个对象，贡献度为数字"""
+        response, content = self.download(self.url, format="jsonl")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(records), GROUP_SIZE * 2 + 2)
+        self.assertEqual(list(records[0]), [key for key, _ in GRADE_FIELDS])
+        self.assertEqual(sorted(record["contribution"] for record in records[:GROUP_SIZE]), [20.0, 30.0, 50.0])
+
+    def test_xlsx(self):
+        """测试 xlsx 是有效的工作簿，内容与 CSV 一致"""
+        _, csv_content = self.download(self.url, format="csv")
+        response, content = self.download(self.url, format="xlsx")
+        self.assertIn("spreadsheetml", response["Content-Type"])
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            self.assertIn("xl/workbook.xml", workbook.namelist())
+            sheet = ElementTree.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+        rows = [
+            [cell.findtext("x:is/x:t", namespaces=XLSX_NS) or cell.findtext("x:v", namespaces=XLSX_NS) or ""
+             for cell in row.findall("x:c", XLSX_NS)]
+            for row in sheet.iterfind("x:sheetData/x:row", XLSX_NS)
+        ]
+        self.assertEqual(rows, list(csv.reader(io.StringIO(csv_content.decode()))))
+
+    def test_unsubmitted_students(self):
+        """测试选课但未提交的学生也导出一行，缺少的列为空"""
+        _, content = self.download(self.url, format="jsonl")
+        records = {record["student_id"]: record for record in map(json.loads, content.decode().splitlines())}
+        unsubmitted = records[self.unsubmitted.user_id]
+        self.assertEqual(unsubmitted["group"], self.unsubmitted_group.name)
+        self.assertEqual(
+            [unsubmitted[key] for key in ("subject", "submitted_at", "contribution", "version_id")], ["", "", None, ""]
+        )
+        ungrouped = records[self.ungrouped.user_id]
+        self.assertEqual([ungrouped[key] for key in ("group", "contribution")], ["", None])
+        # 未分组的学生排在课程最后
+        self.assertEqual(list(records)[-1], self.ungrouped.user_id)
+
+        _, content = self.download(self.url, format="csv")
+        row = next(row for row in csv.reader(io.StringIO(content.decode())) if row[2] == self.unsubmitted.user_id)
+        self.assertEqual(row[5:], ["", "", "", ""])
+
+    def test_invalid_format(self):
+        """测试不支持的导出格式，学生无权限"""
+        response = self.client.get(self.url, {"format": "pdf"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("不支持的导出格式", response.data["message"])
+        response = self.client.get(self.term_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.url, {"format": "csv"}).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(self.term_url, {"format": "csv"}).status_code, status.HTTP_403_FORBIDDEN)
+    # endregion
+
+    # region 跨课程测试
+    def test_term_export(self):
+        """测试跨课程导出只包含教师自己的课程，可按学期过滤"""
+        _, content = self.download(self.term_url, format="jsonl")
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([record["course_name"] for record in records], ["spring"] * 8 + ["autumn"] * 3)
+
+        _, content = self.download(self.term_url, format="jsonl", term_start="2025-02-01", term_end="2025-07-31")
+        self.assertEqual({json.loads(line)["course_name"] for line in content.decode().splitlines()}, {"spring"})
+
+    def test_query_count_does_not_grow(self):
+        """测试导出只执行一条成绩查询，查询数量与课程和行数无关"""
+        with CaptureQueriesContext(connection) as context:
+            self.download(self.url, format="csv")
+        single = len(context)
+        with CaptureQueriesContext(connection) as context:
+            self.download(self.term_url, format="csv")
+        self.assertEqual(len(context), single - 1)
+
+    def test_stream_in_chunks(self):
+        """测试按批输出"""
+        chunks = list(stream_grades(Course.objects.filter(teacher=self.teacher), "csv", chunk_size=2))
+        # 表头 + 11 行按每批 2 行
+        self.assertEqual(len(chunks), 1 + 6)
+        self.assertEqual(sum(chunk.count(b"\n") for chunk in chunks), 12)
+    # endregion
@@ -2,6 +2,7 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
 from course.models import Course, CourseSubject, Group, GroupSubject, GroupCodeVersion
+from course.ingestion import process_pending_versions
 from subject.models import Subject, PublicSubject
 from accounts.models import User
 import datetime
@@ -354,13 +355,21 @@ class GroupCodeVersionCreateTestCase(APITestCase):
             format='multipart',
             HTTP_AUTHORIZATION=f"Bearer {self.student_token}"
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['data']['status'], 'processing')
         
         # 验证版本信息
         version = GroupCodeVersion.objects.get(id=response.data['data']['id'])
         self.assertEqual(version.version, 'v1.0.0')
         self.assertEqual(version.description, '测试版本')
         self.assertEqual(version.group, group)
+        self.assertFalse(version.files.exists())
+        
+        # 由后台任务解析上传的 ZIP
+        self.assertEqual(process_pending_versions(), 1)
+        version.refresh_from_db()
+        self.assertEqual(version.status, 'ready')
+        self.assertEqual(version.processed_files, version.total_files)
         
         # 验证文件信息
         files = version.files.all()
@@ -464,7 +473,7 @@ class GroupCodeVersionCreateTestCase(APITestCase):
             format='multipart',
             HTTP_AUTHORIZATION=f"Bearer {self.student_token}"
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         response = self.client.post(
             f'{reverse("group-list")}{group.id}/versions/',
             data=data,
@@ -529,7 +538,7 @@ class GroupCodeVersionCreateTestCase(APITestCase):
             format='multipart',
             HTTP_AUTHORIZATION=f"Bearer {self.student_token}"
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         version = GroupCodeVersion.objects.first()
         version.zip_file.delete()
     
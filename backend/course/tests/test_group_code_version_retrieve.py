@@ -2,6 +2,7 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
 from course.models import Course, CourseSubject, Group, GroupSubject, GroupCodeVersion
+from course.ingestion import process_pending_versions
 from subject.models import Subject, PublicSubject
 from accounts.models import User
 import datetime
@@ -335,7 +336,9 @@ class GroupCodeVersionRetrieveTestCase(APITestCase):
             },
             HTTP_AUTHORIZATION=f"Bearer {token if token else self.student_token}"
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        # 由后台任务解析上传的 ZIP
+        process_pending_versions()
     # endregion
 
     # region 正常测试
@@ -2,6 +2,7 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
 from course.models import Course, CourseSubject, Group, GroupSubject, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution
+from course.ingestion import process_pending_versions
 from subject.models import Subject, PublicSubject
 from accounts.models import User
 import datetime
@@ -335,7 +336,9 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
             },
             HTTP_AUTHORIZATION=f"Bearer {token if token else self.student_token}"
         )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        # 由后台任务解析上传的 ZIP
+        process_pending_versions()
     
     def get_group_list(self, course_id, token=None):
         """获取小组列表"""
@@ -362,6 +365,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -406,6 +410,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": "invalid_code_version_id",
                 "contributions": [
@@ -431,6 +436,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}invalid_group_id/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -457,6 +463,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -483,6 +490,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -511,6 +519,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group2.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -539,6 +548,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group2.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -566,6 +576,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -593,6 +604,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -621,6 +633,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -653,6 +666,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -688,6 +702,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -715,6 +730,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": []
@@ -737,6 +753,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -756,6 +773,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -789,6 +807,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -816,6 +835,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -841,6 +861,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
@@ -866,6 +887,7 @@ class GroupCodeVersionSubmitTestCase(APITestCase):
         # 提交代码版本
         response = self.client.post(
             f"{reverse('group-list')}{group.id}/submit_code/",
+            format="json",
             data={
                 "code_version_id": version.id,
                 "contributions": [
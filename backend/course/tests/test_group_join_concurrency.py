@@ -0,0 +1,174 @@
+import datetime
+import threading
+import time
+from rest_framework import status
+from rest_framework.test import APIClient
+from accounts.models import User
+from course.models import Course, Group
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+MAX_STUDENTS = 300
+MAX_THREADS = 16
+GROUP_SIZE = 5
+
+
+class GroupJoinConcurrencyTestCase(TransactionTestCase):
+    """小组并发加入测试（线程使用各自的数据库连接，需要真实提交的事务）"""
+
+    # region 测试准备数据
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        print("\n-----开始准备测试数据-----")
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        # 批量创建学生，跳过逐个密码哈希
+        self.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT",
+                password="!"
+            ) for i in range(1, MAX_STUDENTS + 1)
+        ])
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            max_group_size=GROUP_SIZE,
+            min_group_size=1,
+        )
+        self.course.students.add(*self.students)
+        self.group = Group.objects.create(course=self.course, creator=self.teacher)
+        print("-----测试数据准备完成-----\n")
+
+    def join(self, student, group):
+        """以 student 身份提交加入小组请求"""
+        client = APIClient()
+        client.force_authenticate(student)
+        return client.post(f'{reverse("group-list")}{group.id}/join/')
+
+    def run_concurrently(self, calls):
+        """多线程同时提交加入请求，返回各请求的状态码和耗时"""
+        codes = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(MAX_THREADS)
+        chunks = [calls[i::MAX_THREADS] for i in range(MAX_THREADS)]
+
+        def worker(chunk):
+            barrier.wait()
+            try:
+                for student, group in chunk:
+                    code = self.join(student, group).status_code
+                    with lock:
+                        codes.append(code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return codes, time.perf_counter() - start
+
+    def group_sizes(self):
+        return dict(
+            Group.students.through.objects.filter(group__course=self.course)
+            .values_list("group_id").annotate(n=Count("id"))
+        )
+    # endregion
+
+    # region 并发测试
+    def test_concurrent_join_one_group(self):
+        """测试数百名学生同时加入同一小组，人数不超过上限"""
+        print("-----正在测试并发加入小组-----")
+        codes, elapsed = self.run_concurrently([(student, self.group) for student in self.students])
+        print(f"requests={len(codes)} elapsed={elapsed:.2f}s throughput={len(codes) / elapsed:.1f} req/s")
+
+        self.assertEqual(len(codes), MAX_STUDENTS)
+        self.assertEqual(codes.count(status.HTTP_200_OK), GROUP_SIZE)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), MAX_STUDENTS - GROUP_SIZE)
+        self.assertEqual(self.group.students.count(), GROUP_SIZE)
+        print("-----并发加入小组测试结束-----")
+
+    def test_concurrent_join_two_groups(self):
+        """测试学生同时加入两个小组，每名学生最多进入一个小组"""
+        other = Group.objects.create(course=self.course, creator=self.teacher)
+        students = self.students[:GROUP_SIZE * 4]
+        calls = [(student, group) for student in students for group in (self.group, other)]
+        codes, _ = self.run_concurrently(calls)
+
+        self.assertEqual(codes.count(status.HTTP_200_OK), GROUP_SIZE * 2)
+        self.assertEqual(set(self.group_sizes().values()), {GROUP_SIZE})
+        per_student = (
+            Group.students.through.objects.filter(group__course=self.course)
+            .values("user_id").annotate(n=Count("id")).filter(n__gt=1)
+        )
+        self.assertFalse(per_student.exists())
+
+    def test_concurrent_join_and_auto_group(self):
+        """测试学生加入与自动分组同时进行，已有小组不会超员"""
+        from course.grouping import form_groups
+        students = self.students[:GROUP_SIZE * 6]
+        Course.students.through.objects.filter(course=self.course).exclude(
+            user_id__in=[student.pk for student in students]
+        ).delete()
+        barrier = threading.Barrier(2)
+
+        def auto_group():
+            barrier.wait()
+            try:
+                form_groups(Course.objects.get(pk=self.course.pk), seed=1)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=auto_group)
+        thread.start()
+        barrier.wait()
+        for student in students[:GROUP_SIZE * 2]:
+            self.join(student, self.group)
+        thread.join()
+
+        sizes = self.group_sizes()
+        self.assertTrue(all(size <= GROUP_SIZE for size in sizes.values()))
+        self.assertEqual(sum(sizes.values()), len(students))
+    # endregion
+
+    # region 查询测试
+    def test_join_does_not_load_members(self):
+        """测试加入小组的查询数量与小组现有人数无关，且不加载成员名单"""
+        Course.objects.filter(id=self.course.id).update(max_group_size=MAX_STUDENTS)
+        with CaptureQueriesContext(connection) as empty:
+            response = self.join(self.students[0], self.group)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.group.students.add(*self.students[1:-1])
+        with CaptureQueriesContext(connection) as crowded:
+            response = self.join(self.students[-1], self.group)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(crowded), len(empty))
+        self.assertFalse(any('"accounts_user"' in q["sql"] for q in crowded.captured_queries))
+
+    def test_join_full_group_message(self):
+        """测试小组已满时返回原有提示"""
+        self.group.students.add(*self.students[:GROUP_SIZE])
+        response = self.join(self.students[GROUP_SIZE], self.group)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("小组人数已满", response.data["message"])
+    # endregion
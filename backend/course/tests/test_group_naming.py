@@ -0,0 +1,180 @@
+import datetime
+import threading
+import time
+from accounts.models import User
+from course.models import Course, Group
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+MAX_GROUPS = 20
+MAX_THREADS = 8
+
+
+def create_course(teacher, code):
+    today = timezone.now().date()
+    return Course.objects.create(
+        name="course",
+        teacher=teacher,
+        course_code=code,
+        start_date=today + datetime.timedelta(days=1),
+        end_date=today + datetime.timedelta(days=2),
+    )
+
+
+def backend_pid():
+    """当前线程数据库连接的后端进程号"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+def wait_for_lock(pid, timeout=10):
+    """等待后端进程 pid 进入锁等待；pg_locks 每次查询都是最新状态"""
+    deadline = time.monotonic() + timeout
+    with connection.cursor() as cursor:
+        while time.monotonic() < deadline:
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_locks WHERE pid = %s AND NOT granted)", [pid])
+            if cursor.fetchone()[0]:
+                return
+            time.sleep(0.01)
+    raise AssertionError(f"进程 {pid} 没有进入锁等待")
+
+
+def create_teacher():
+    return User.objects.create_user(
+        email="teacher@example.com",
+        password="teacher123",
+        user_id="teacher001",
+        name="teacher",
+        school="teacher school",
+        role="TEACHER"
+    )
+
+
+class GroupNamingTestCase(TestCase):
+    """小组编号计数与批量重新编号测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = create_teacher()
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.course = create_course(self.teacher, "NAME01")
+
+    def names(self):
+        return list(Group.objects.filter(course=self.course).order_by("created_at", "id").values_list("name", flat=True))
+    # endregion
+
+    # region 基础功能测试
+    def test_create_query_count_is_constant(self):
+        """测试创建小组的查询数量与已有小组数无关"""
+        print("-----正在测试小组编号-----")
+        with CaptureQueriesContext(connection) as first:
+            Group.objects.create(course=self.course)
+        for _ in range(MAX_GROUPS):
+            Group.objects.create(course=self.course)
+        with CaptureQueriesContext(connection) as last:
+            group = Group.objects.create(course=self.course)
+        self.assertEqual(len(first.captured_queries), len(last.captured_queries))
+        self.assertEqual(group.name, f"course 小组 {MAX_GROUPS + 2}")
+        print("-----小组编号测试结束-----")
+
+    def test_delete_renumbers_with_single_update(self):
+        """测试删除小组后以一条 UPDATE 连续重新编号"""
+        groups = [Group.objects.create(course=self.course) for _ in range(MAX_GROUPS)]
+        with CaptureQueriesContext(connection) as context:
+            groups[2].delete()
+        renames = [q for q in context.captured_queries if q["sql"].strip().startswith('UPDATE "course_group"')]
+        self.assertEqual(len(renames), 1)
+        self.assertEqual(self.names(), [f"course 小组 {i}" for i in range(1, MAX_GROUPS)])
+        self.assertEqual(Group.objects.create(course=self.course).name, f"course 小组 {MAX_GROUPS}")
+
+    def test_course_update_keeps_sequence(self):
+        """测试保存课程不会用内存中的旧计数覆盖编号计数"""
+        course = Course.objects.get(id=self.course.id)
+        Group.objects.create(course=self.course)
+        course.description = "updated"
+        course.save()
+        self.assertEqual(Group.objects.create(course=self.course).name, "course 小组 2")
+    # endregion
+
+
+class GroupNamingConcurrencyTestCase(TransactionTestCase):
+    """并发创建小组时编号不重复"""
+
+    def test_concurrent_create(self):
+        """测试多线程同时创建小组"""
+        course = create_course(create_teacher(), "NAME02")
+        barrier = threading.Barrier(MAX_THREADS)
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(MAX_GROUPS // 4):
+                    Group.objects.create(course=course)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(MAX_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        names = list(Group.objects.filter(course=course).values_list("name", flat=True))
+        total = MAX_THREADS * (MAX_GROUPS // 4)
+        self.assertEqual(sorted(names), sorted(f"course 小组 {i}" for i in range(1, total + 1)))
+
+    def test_delete_waits_for_concurrent_create(self):
+        """测试删除小组重新编号时，等待中的并发建组提交后也计入编号计数"""
+        course = create_course(create_teacher(), "NAME03")
+        first, _ = Group.objects.create(course=course), Group.objects.create(course=course)
+        created, release = threading.Event(), threading.Event()
+        pids, errors = [], []
+
+        def create():
+            try:
+                # 建组事务持有课程行锁，直到删除方进入等待后才提交
+                with transaction.atomic():
+                    Group.objects.create(course=course)
+                    created.set()
+                    release.wait(10)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                created.set()
+                connections.close_all()
+
+        def delete():
+            try:
+                created.wait(10)
+                pids.append(backend_pid())
+                Group.objects.get(pk=first.pk).delete()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=create), threading.Thread(target=delete)]
+        for thread in threads:
+            thread.start()
+        try:
+            created.wait(10)
+            while not pids and threads[1].is_alive():
+                time.sleep(0.01)
+            wait_for_lock(pids[0])
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        names = list(Group.objects.filter(course=course).order_by("created_at", "id").values_list("name", flat=True))
+        self.assertEqual(names, ["course 小组 1", "course 小组 2"])
+        self.assertEqual(Course.objects.get(pk=course.pk).group_sequence, 2)
+        self.assertEqual(Group.objects.create(course=course).name, "course 小组 3")
@@ -0,0 +1,123 @@
+from rest_framework.test import APITestCase
+from course.models import Course, Group, CourseSubject, GroupSubject, GroupCodeVersion, GroupSubmission
+from subject.models import Subject, PublicSubject
+from accounts.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+
+MAX_GROUPS = 30
+
+
+class GroupQueryCountTestCase(APITestCase):
+    """小组列表与详情的查询数量回归测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f"student{i}@example.com",
+                password="student123",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT"
+            ) for i in range(1, MAX_GROUPS * 2 + 1)
+        ]
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course",
+            teacher=cls.teacher,
+            course_code="QUERY1",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            max_subject_selections=MAX_GROUPS,
+        )
+        cls.course.students.add(*cls.students)
+        subject = Subject.objects.create(
+            title="private",
+            description="private description",
+            creator=cls.teacher,
+            languages=["PYTHON"],
+            status="APPROVED"
+        )
+        public_subject = PublicSubject.objects.create(
+            original_subject=subject,
+            title="public",
+            description="public description",
+            creator=cls.teacher,
+            languages=["PYTHON"]
+        )
+        course_subjects = [
+            CourseSubject.objects.create(course=cls.course, subject_type="PRIVATE", private_subject=subject),
+            CourseSubject.objects.create(course=cls.course, subject_type="PUBLIC", public_subject=public_subject),
+        ]
+        for i in range(MAX_GROUPS):
+            members = cls.students[i * 2:i * 2 + 2]
+            group = Group.objects.create(course=cls.course, creator=members[0])
+            group.students.add(*members)
+            GroupSubject.objects.create(group=group, course_subject=course_subjects[i % 2])
+            version = GroupCodeVersion.objects.create(group=group, version="v1", zip_file="v1.zip")
+            GroupSubmission.objects.create(group=group, code_version=version, is_submitted=True)
+        cls.url = reverse("group-list")
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+        self.student_token = self.client.post(
+            reverse("login"),
+            {"email": self.students[0].email, "password": "student123"}
+        ).data["data"]["access"]
+
+    def get(self, url, token=None):
+        """发起请求并记录查询"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, headers={"Authorization": f"Bearer {token or self.teacher_token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(context.captured_queries)
+    # endregion
+
+    # region 查询数量测试
+    def test_list_query_count_is_fixed(self):
+        """测试小组列表的查询数量与每页小组数无关"""
+        print("-----正在测试小组列表查询数量-----")
+        _, small = self.get(f"{self.url}?course_id={self.course.id}&page_size=2")
+        response, large = self.get(f"{self.url}?course_id={self.course.id}&page_size={MAX_GROUPS}")
+        results = response.data["data"]["results"]
+        self.assertEqual(len(results), MAX_GROUPS)
+        self.assertEqual(small, large)
+        # 用户、课程、计数、小组、学生、选题、提交
+        self.assertLessEqual(large, 8)
+        group = results[0]
+        self.assertTrue(group["submission"]["is_submitted"])
+        self.assertEqual(len(group["students"]), 2)
+        self.assertIn(group["group_subjects"][0]["course_subject"]["subject"]["title"], ["private", "public"])
+        print("-----小组列表查询数量测试结束-----")
+
+    def test_retrieve_query_count_is_fixed(self):
+        """测试小组详情的查询数量固定"""
+        group = Group.objects.filter(students=self.students[0]).get()
+        response, teacher_queries = self.get(f"{self.url}{group.id}/")
+        self.assertEqual(response.data["data"]["submission"]["version_id"], group.submissions.get().code_version_id)
+        _, student_queries = self.get(f"{self.url}{group.id}/", token=self.student_token)
+        self.assertLessEqual(teacher_queries, 6)
+        self.assertLessEqual(student_queries, 6)
+    # endregion
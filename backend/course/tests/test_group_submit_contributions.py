@@ -0,0 +1,135 @@
+from rest_framework.test import APITestCase
+from course.models import Course, CourseSubject, Group, GroupSubject, GroupCodeVersion, GroupSubmission, GroupSubmissionContribution
+from subject.models import Subject
+from accounts.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from decimal import Decimal
+import datetime
+import json
+import sys
+
+SMALL_GROUP = 2
+LARGE_GROUP = 8
+
+
+class GroupSubmitContributionsTestCase(APITestCase):
+    """提交代码时贡献度解析与查询数量测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com", user_id=f"student{i:03d}", name=f"student{i}",
+                school="student school", role="STUDENT", password="!"
+            ) for i in range(SMALL_GROUP + LARGE_GROUP + 1)
+        ])
+        today = timezone.now().date()
+        cls.course = Course.objects.create(
+            name="course", teacher=teacher, max_subject_selections=2,
+            start_date=today - datetime.timedelta(days=1), end_date=today + datetime.timedelta(days=2),
+        )
+        cls.course.students.add(*cls.students)
+        subject = Subject.objects.create(
+            title="subject", description="subject description", creator=teacher,
+            languages=["PYTHON"], status="APPROVED"
+        )
+        course_subject = CourseSubject.objects.create(course=cls.course, subject_type="PRIVATE", private_subject=subject)
+        cls.small = cls.create_group(cls.students[:SMALL_GROUP], course_subject)
+        cls.large = cls.create_group(cls.students[SMALL_GROUP:SMALL_GROUP + LARGE_GROUP], course_subject)
+        cls.outsider = cls.students[-1]
+        print("-----测试数据准备完成-----\n")
+
+    @classmethod
+    def create_group(cls, members, course_subject):
+        group = Group.objects.create(course=cls.course, creator=members[0])
+        group.students.add(*members)
+        GroupSubject.objects.create(group=group, course_subject=course_subject)
+        group.version = GroupCodeVersion.objects.create(group=group, version="v1", zip_file="v1.zip")
+        group.members = members
+        return group
+
+    def submit(self, group, contributions, format="json"):
+        self.client.force_authenticate(group.members[0])
+        return self.client.post(
+            f"{reverse('group-list')}{group.id}/submit_code/",
+            {"code_version_id": str(group.version.id), "contributions": contributions},
+            format=format,
+        )
+
+    def even_split(self, group):
+        share = Decimal(100) / len(group.members)
+        shares = [share.quantize(Decimal("0.01"))] * len(group.members)
+        shares[0] += Decimal(100) - sum(shares)
+        return [
+            {"student_id": student.user_id, "contribution": str(value)}
+            for student, value in zip(group.members, shares)
+        ]
+    # endregion
+
+    # region 查询数量测试
+    def test_query_count_does_not_depend_on_group_size(self):
+        """测试提交代码的查询数量与小组人数无关，贡献度一次写入"""
+        counts = []
+        for group in (self.small, self.large):
+            contributions = self.even_split(group)
+            self.submit(group, contributions[:1])
+            with CaptureQueriesContext(connection) as context:
+                response = self.submit(group, contributions)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            counts.append(len(context))
+            inserts = [q for q in context.captured_queries if q["sql"].startswith('INSERT INTO "course_groupsubmissioncontribution"')]
+            self.assertEqual(len(inserts), 1)
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(
+            GroupSubmissionContribution.objects.filter(submission__group=self.large).count(), LARGE_GROUP
+        )
+    # endregion
+
+    # region 格式测试
+    def test_json_string_items_and_form_array(self):
+        """测试逐项 JSON 字符串与表单中的 JSON 数组字符串"""
+        contributions = self.even_split(self.small)
+        response = self.submit(self.small, [json.dumps(item) for item in contributions])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.submit(self.large, json.dumps(self.even_split(self.large)), format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(GroupSubmission.objects.count(), 2)
+
+    def test_python_expressions_are_not_evaluated(self):
+        """测试贡献度中的 Python 表达式不会被执行"""
+        payload = "{'student_id': __import__('sys').modules.setdefault('submit_pwned', 1), 'contribution': 100}"
+        response = self.submit(self.small, [payload])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("有效的 JSON 对象", response.data["message"])
+        self.assertNotIn("submit_pwned", sys.modules)
+
+    def test_invalid_contributions(self):
+        """测试名单外、不存在的学生与非法的贡献度"""
+        member = self.small.members[0]
+        cases = [
+            ([{"student_id": self.outsider.user_id, "contribution": 100}], "不在该小组中"),
+            ([{"student_id": "missing", "contribution": 100}], "学生 missing 不存在"),
+            ([{"student_id": member.user_id, "contribution": "NaN"}], "必须是数字"),
+            ([{"student_id": member.user_id, "contribution": True}], "必须是数字"),
+            ([{"student_id": member.user_id, "contribution": 100}], "缺少以下学生的贡献度"),
+            ([{"student_id": member.user_id}], "必须包含 student_id 和 contribution"),
+            ("not json", "必须是 JSON 数组"),
+        ]
+        for contributions, message in cases:
+            response = self.submit(self.small, contributions)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(message, str(response.data))
+        self.assertFalse(GroupSubmission.objects.exists())
+    # endregion
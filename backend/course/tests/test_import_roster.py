@@ -0,0 +1,212 @@
+from rest_framework.test import APITestCase
+from course.models import Course
+from accounts.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from io import StringIO
+import datetime
+import json
+import os
+import tempfile
+
+MAX_STUDENTS = 60
+
+
+class CourseImportRosterTestCase(APITestCase):
+    """课程名单批量导入测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.teacher2 = User.objects.create_user(
+            email="teacher2@example.com",
+            password="teacher123",
+            user_id="teacher002",
+            name="teacher2",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="admin123",
+            user_id="admin001",
+            name="admin",
+            school="admin school",
+            role="ADMIN"
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f"student{i}@example.com",
+                password="student123",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT"
+            ) for i in range(1, MAX_STUDENTS + 1)
+        ]
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            course_code="ROSTER",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+        )
+        self.url = f"{reverse('course-list')}{self.course.id}/import_roster/"
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+        self.teacher2_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher2.email, "password": "teacher123"}
+        ).data["data"]["access"]
+        self.student_token = self.client.post(
+            reverse("login"),
+            {"email": self.students[0].email, "password": "student123"}
+        ).data["data"]["access"]
+        self.admin_token = self.client.post(
+            reverse("login"),
+            {"email": self.admin.email, "password": "admin123"}
+        ).data["data"]["access"]
+
+    def import_roster(self, data, token=None, format="json"):
+        """调用导入接口"""
+        return self.client.post(
+            self.url,
+            data=data,
+            format=format,
+            headers={"Authorization": f"Bearer {token or self.teacher_token}"}
+        )
+    # endregion
+
+    # region 基础功能测试
+    def test_import_roster_report(self):
+        """测试导入名单并返回逐行结果"""
+        print("-----正在测试导入名单-----")
+        self.course.students.add(self.students[1])
+        response = self.import_roster({"user_ids": [
+            self.students[0].user_id,
+            self.students[1].user_id,
+            "not_exist",
+            self.teacher2.user_id,
+            self.students[0].user_id,
+        ]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "导入名单成功")
+        results = [row["result"] for row in response.data["data"]["rows"]]
+        self.assertEqual(results, ["enrolled", "already_enrolled", "unknown_user", "wrong_role", "duplicate"])
+        self.assertEqual(response.data["data"]["summary"]["enrolled"], 1)
+        self.assertEqual(self.course.students.count(), 2)
+        print("-----导入名单测试结束-----")
+
+    def test_import_roster_with_csv_file(self):
+        """测试上传 CSV 名单"""
+        content = "user_id,name\n" + "\n".join(f"{s.user_id},{s.name}" for s in self.students[:10])
+        response = self.import_roster(
+            {"file": SimpleUploadedFile("roster.csv", content.encode("utf-8"), content_type="text/csv")},
+            format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["summary"]["enrolled"], 10)
+        self.assertEqual(self.course.students.count(), 10)
+
+    def test_import_roster_with_json_file(self):
+        """测试上传 JSON 名单"""
+        content = json.dumps([{"user_id": s.user_id} for s in self.students[:5]])
+        response = self.import_roster(
+            {"file": SimpleUploadedFile("roster.json", content.encode("utf-8"), content_type="application/json")},
+            format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.course.students.count(), 5)
+
+    def test_import_roster_with_admin(self):
+        """测试管理员导入名单"""
+        response = self.import_roster({"user_ids": [self.students[0].user_id]}, token=self.admin_token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.course.students.count(), 1)
+
+    def test_import_roster_query_count_is_constant(self):
+        """测试查询数量不随名单长度增长"""
+        with CaptureQueriesContext(connection) as small:
+            self.import_roster({"user_ids": [s.user_id for s in self.students[:2]]})
+        self.course.students.clear()
+        with CaptureQueriesContext(connection) as large:
+            response = self.import_roster({"user_ids": [s.user_id for s in self.students]})
+        self.assertEqual(response.data["data"]["summary"]["enrolled"], MAX_STUDENTS)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+    # endregion
+
+    # region 异常测试
+    def test_import_roster_with_student(self):
+        """测试学生无法导入名单"""
+        response = self.import_roster({"user_ids": [self.students[1].user_id]}, token=self.student_token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_roster_with_other_teacher(self):
+        """测试其他教师无法导入名单"""
+        response = self.import_roster({"user_ids": [self.students[1].user_id]}, token=self.teacher2_token)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_import_roster_with_empty_roster(self):
+        """测试空名单"""
+        response = self.import_roster({"user_ids": []})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("message", response.data)
+
+    def test_import_roster_with_completed_course(self):
+        """测试已结束课程无法导入名单"""
+        today = timezone.now().date()
+        Course.objects.filter(id=self.course.id).update(
+            status="completed", start_date=today - datetime.timedelta(days=2), end_date=today - datetime.timedelta(days=1)
+        )
+        response = self.import_roster({"user_ids": [self.students[1].user_id]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    # endregion
+
+    # region 管理命令测试
+    def test_import_roster_command(self):
+        """测试管理命令按 course_code 列导入多门课程"""
+        today = timezone.now().date()
+        course2 = Course.objects.create(
+            name="course2",
+            teacher=self.teacher,
+            course_code="ROSTR2",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+        )
+        lines = ["course_code,user_id"]
+        lines += [f"ROSTER,{s.user_id}" for s in self.students[:3]]
+        lines += [f"ROSTR2,{s.user_id}" for s in self.students[3:7]]
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("\n".join(lines))
+        try:
+            out = StringIO()
+            call_command("import_roster", f.name, stdout=out)
+        finally:
+            os.remove(f.name)
+        self.assertEqual(self.course.students.count(), 3)
+        self.assertEqual(course2.students.count(), 4)
+        self.assertIn("名单导入完成", out.getvalue())
+    # endregion
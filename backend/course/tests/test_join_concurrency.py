@@ -0,0 +1,119 @@
+import datetime
+import threading
+from rest_framework import status
+from rest_framework.test import APIClient
+from accounts.models import User
+from course.models import Course
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+MAX_STUDENTS = 120
+MAX_THREADS = 16
+
+
+class CourseJoinConcurrencyTestCase(TransactionTestCase):
+    """课程并发加入测试（线程使用各自的数据库连接，需要真实提交的事务）"""
+
+    # region 测试准备数据
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        print("\n-----开始准备测试数据-----")
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        # 批量创建学生，跳过逐个密码哈希
+        self.students = User.objects.bulk_create([
+            User(
+                email=f"student{i}@example.com",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT",
+                password="!"
+            ) for i in range(1, MAX_STUDENTS + 1)
+        ])
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            course_code="RUSH01",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+        )
+        self.url = reverse("course-join")
+        print("-----测试数据准备完成-----\n")
+
+    def join(self, student):
+        """以 student 身份提交加入请求"""
+        client = APIClient()
+        client.force_authenticate(student)
+        return client.post(self.url, {"course_code": self.course.course_code}, format="json")
+
+    def run_concurrently(self, students):
+        """多线程同时提交加入请求，返回各请求的状态码"""
+        codes = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(MAX_THREADS)
+        chunks = [students[i::MAX_THREADS] for i in range(MAX_THREADS)]
+
+        def worker(chunk):
+            barrier.wait()
+            try:
+                for student in chunk:
+                    code = self.join(student).status_code
+                    with lock:
+                        codes.append(code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return codes
+    # endregion
+
+    # region 并发测试
+    def test_concurrent_join(self):
+        """测试大量学生（含重复提交）同时加入，不产生重复记录且不写课程行"""
+        print("-----正在测试并发加入课程-----")
+        updated_at = self.course.updated_at
+        codes = self.run_concurrently(self.students * 2)
+
+        self.assertEqual(len(codes), MAX_STUDENTS * 2)
+        self.assertEqual(codes.count(status.HTTP_200_OK), MAX_STUDENTS)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), MAX_STUDENTS)
+        memberships = Course.students.through.objects.filter(course=self.course)
+        self.assertEqual(memberships.count(), MAX_STUDENTS)
+        self.assertEqual(set(memberships.values_list("user_id", flat=True)), {s.user_id for s in self.students})
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.updated_at, updated_at)
+        print("-----并发加入课程测试结束-----")
+
+    def test_join_after_course_started(self):
+        """测试课程开始后（状态字段尚未同步）不能再加入"""
+        today = timezone.now().date()
+        Course.objects.filter(id=self.course.id).update(start_date=today, status="not_started")
+        codes = self.run_concurrently(self.students[:MAX_THREADS])
+        self.assertEqual(set(codes), {status.HTTP_400_BAD_REQUEST})
+        self.assertFalse(Course.students.through.objects.filter(course=self.course).exists())
+
+    def test_join_does_not_load_roster(self):
+        """测试加入时不加载课程名单，也不更新课程"""
+        self.course.students.add(*self.students[1:])
+        with CaptureQueriesContext(connection) as context:
+            response = self.join(self.students[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sqls = [q["sql"] for q in context.captured_queries]
+        self.assertFalse(any(sql.startswith("UPDATE") for sql in sqls))
+        self.assertFalse(any('"accounts_user"' in sql and "INNER JOIN" in sql for sql in sqls))
+    # endregion
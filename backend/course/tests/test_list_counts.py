@@ -0,0 +1,114 @@
+from rest_framework.test import APITestCase
+from course.models import Course, Group, CourseSubject
+from subject.models import Subject
+from accounts.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+
+
+class CourseListCountsTestCase(APITestCase):
+    """课程列表成员统计测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f"student{i}@example.com",
+                password="student123",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT"
+            ) for i in range(1, 31)
+        ]
+        cls.subject = Subject.objects.create(
+            title="subject",
+            description="subject description",
+            creator=cls.teacher,
+            languages=["PYTHON"],
+            status="APPROVED"
+        )
+        cls.url = reverse("course-list")
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+
+    def create_course(self, index, student_count):
+        """创建课程并加入指定数量的学生、两个小组和一个课题"""
+        today = timezone.now().date()
+        course = Course.objects.create(
+            name=f"course_{index}",
+            teacher=self.teacher,
+            course_code=f"CODE{index:02d}",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+        )
+        course.students.add(*self.students[:student_count])
+        Group.objects.create(course=course)
+        Group.objects.create(course=course)
+        CourseSubject.objects.create(course=course, subject_type="PRIVATE", private_subject=self.subject)
+        return course
+
+    def list_courses(self):
+        """请求课程列表并记录查询"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+        return response, len(context.captured_queries)
+    # endregion
+
+    # region 基础功能测试
+    def test_list_returns_counts(self):
+        """测试列表返回成员统计而不是学生名单"""
+        print("-----正在测试列表返回成员统计-----")
+        course = self.create_course(1, student_count=5)
+        response, _ = self.list_courses()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data["data"]["results"][0]
+        self.assertEqual(result["id"], str(course.id))
+        self.assertEqual(result["student_count"], 5)
+        self.assertEqual(result["group_count"], 2)
+        self.assertEqual(result["subject_count"], 1)
+        self.assertEqual(result["teacher"]["user_id"], self.teacher.user_id)
+        self.assertNotIn("students", result)
+        print("-----列表返回成员统计测试结束-----")
+
+    def test_retrieve_keeps_roster(self):
+        """测试详情接口仍然返回完整学生名单"""
+        course = self.create_course(1, student_count=3)
+        response = self.client.get(f"{self.url}{course.id}/", headers={"Authorization": f"Bearer {self.teacher_token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]["students"]), 3)
+    # endregion
+
+    # region 性能测试
+    def test_query_count_independent_of_roster_size(self):
+        """测试查询数量不随课程数和学生数增长"""
+        self.create_course(1, student_count=1)
+        _, small_queries = self.list_courses()
+        for index in range(2, 8):
+            self.create_course(index, student_count=30)
+        response, large_queries = self.list_courses()
+        self.assertEqual(response.data["data"]["count"], 7)
+        self.assertEqual(small_queries, large_queries)
+    # endregion
@@ -0,0 +1,138 @@
+from rest_framework.test import APITestCase
+from course.models import Course, Group
+from accounts.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+
+MAX_STUDENTS = 40
+
+
+class CourseRemoveStudentsTestCase(APITestCase):
+    """学生退出课程（集合操作）与批量移出测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f"student{i}@example.com",
+                password="student123",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT"
+            ) for i in range(1, MAX_STUDENTS + 1)
+        ]
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            course_code="REMOVE",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+        )
+        self.course.students.add(*self.students)
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+        self.student_token = self.client.post(
+            reverse("login"),
+            {"email": self.students[0].email, "password": "student123"}
+        ).data["data"]["access"]
+
+    def create_group(self, creator, members):
+        """创建小组并加入成员"""
+        group = Group.objects.create(course=self.course, creator=creator)
+        group.students.add(*members)
+        return group
+
+    def remove_students(self, user_ids, token=None):
+        """调用批量移出接口"""
+        return self.client.post(
+            f"{reverse('course-list')}{self.course.id}/remove_students/",
+            data={"student_user_ids": user_ids},
+            format="json",
+            headers={"Authorization": f"Bearer {token or self.teacher_token}"}
+        )
+    # endregion
+
+    # region 基础功能测试
+    def test_student_leave_cascades_groups(self):
+        """测试学生退出课程时重新指定组长、删除空组并重新编号"""
+        print("-----正在测试学生退出课程-----")
+        led = self.create_group(self.students[0], [self.students[0], self.students[2], self.students[1]])
+        alone = self.create_group(self.students[0], [self.students[0]])
+        teacher_group = self.create_group(self.teacher, [self.students[0]])
+        response = self.client.post(
+            f"{reverse('course-list')}{self.course.id}/leave/",
+            headers={"Authorization": f"Bearer {self.student_token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.course.students.filter(pk=self.students[0].pk).exists())
+        self.assertFalse(Group.objects.filter(id=alone.id).exists())
+        led.refresh_from_db()
+        self.assertEqual(led.creator, self.students[1])
+        self.assertEqual(led.students.count(), 2)
+        # 教师创建的小组即使为空也保留
+        self.assertTrue(Group.objects.filter(id=teacher_group.id).exists())
+        names = sorted(Group.objects.filter(course=self.course).values_list("name", flat=True))
+        self.assertEqual(names, ["course 小组 1", "course 小组 2"])
+        print("-----学生退出课程测试结束-----")
+
+    def test_remove_students_in_bulk(self):
+        """测试教师批量移出学生"""
+        group = self.create_group(self.students[0], self.students[:3])
+        response = self.remove_students([s.user_id for s in self.students[:2]] + ["not_exist"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "移出学生成功")
+        self.assertEqual(response.data["data"]["removed"], ["student001", "student002"])
+        self.assertEqual(response.data["data"]["not_enrolled"], ["not_exist"])
+        self.assertEqual(response.data["data"]["reassigned_groups"], 1)
+        self.assertEqual(self.course.students.count(), MAX_STUDENTS - 2)
+        group.refresh_from_db()
+        self.assertEqual(group.creator, self.students[2])
+
+    def test_remove_students_query_count_is_constant(self):
+        """测试查询数量不随移出人数和小组数增长"""
+        pairs = [self.students[i:i + 2] for i in range(0, MAX_STUDENTS, 2)]
+        for leader, member in pairs:
+            self.create_group(leader, [leader, member])
+        with CaptureQueriesContext(connection) as small:
+            self.remove_students([pairs[0][0].user_id])
+        with CaptureQueriesContext(connection) as large:
+            response = self.remove_students([leader.user_id for leader, _ in pairs[1:]])
+        self.assertEqual(response.data["data"]["reassigned_groups"], len(pairs) - 1)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+    # endregion
+
+    # region 异常测试
+    def test_remove_students_with_student(self):
+        """测试学生无法批量移出学生"""
+        response = self.remove_students([self.students[1].user_id], token=self.student_token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_remove_students_with_empty_list(self):
+        """测试空列表"""
+        response = self.remove_students([])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    # endregion
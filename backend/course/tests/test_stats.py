@@ -0,0 +1,238 @@
+from rest_framework.test import APITestCase
+from course.models import Course, CourseStatsVersion, Group, CourseSubject, GroupSubject, GroupCodeVersion, GroupSubmission
+from course.stats import bump_stats_versions, cache_key, stats_version
+from subject.models import Subject
+from accounts.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+
+MAX_STUDENTS = 12
+
+
+class CourseStatsTestCase(APITestCase):
+    """课程统计接口测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.teacher2 = User.objects.create_user(
+            email="teacher2@example.com",
+            password="teacher123",
+            user_id="teacher002",
+            name="teacher2",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f"student{i}@example.com",
+                password="student123",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT"
+            ) for i in range(1, MAX_STUDENTS + 1)
+        ]
+        cls.subjects = [
+            Subject.objects.create(
+                title=f"subject_{i}",
+                description="subject description",
+                creator=cls.teacher,
+                languages=["PYTHON"],
+                status="APPROVED"
+            ) for i in range(2)
+        ]
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        cache.clear()
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            course_code="STATS1",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            max_group_size=3,
+            min_group_size=2,
+            max_subject_selections=2,
+        )
+        self.course.students.add(*self.students)
+        self.url = f"{reverse('course-list')}{self.course.id}/stats/"
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+        self.teacher2_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher2.email, "password": "teacher123"}
+        ).data["data"]["access"]
+        self.student_token = self.client.post(
+            reverse("login"),
+            {"email": self.students[0].email, "password": "student123"}
+        ).data["data"]["access"]
+
+    def create_group(self, members):
+        """创建小组并加入成员"""
+        group = Group.objects.create(course=self.course, creator=members[0] if members else self.teacher)
+        group.students.add(*members)
+        return group
+
+    def get_stats(self, token=None):
+        """请求课程统计"""
+        return self.client.get(self.url, headers={"Authorization": f"Bearer {token or self.teacher_token}"})
+    # endregion
+
+    # region 基础功能测试
+    def test_stats(self):
+        """测试统计数字"""
+        print("-----正在测试课程统计-----")
+        full = self.create_group(self.students[0:3])
+        within = self.create_group(self.students[3:5])
+        self.create_group(self.students[5:6])
+        self.create_group([])
+        first, second = [
+            CourseSubject.objects.create(course=self.course, subject_type="PRIVATE", private_subject=subject)
+            for subject in self.subjects
+        ]
+        GroupSubject.objects.create(group=full, course_subject=first)
+        GroupSubject.objects.create(group=within, course_subject=first)
+        version = GroupCodeVersion.objects.create(group=full, version="v1", zip_file="v1.zip")
+        GroupCodeVersion.objects.create(group=full, version="v2", zip_file="v2.zip")
+        GroupSubmission.objects.create(group=full, code_version=version, is_submitted=True)
+
+        response = self.get_stats()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "获取课程统计成功")
+        data = response.data["data"]
+        self.assertEqual(data["students"], {"enrolled": MAX_STUDENTS, "ungrouped": MAX_STUDENTS - 6})
+        groups = data["groups"]
+        self.assertEqual(groups["total"], 4)
+        self.assertEqual(
+            (groups["empty"], groups["below_min"], groups["within_range"], groups["full"]),
+            (1, 1, 1, 1)
+        )
+        self.assertEqual((groups["with_subject"], groups["without_subject"]), (2, 2))
+        self.assertEqual(groups["by_size"], [
+            {"size": 0, "groups": 1}, {"size": 1, "groups": 1}, {"size": 2, "groups": 1}, {"size": 3, "groups": 1}
+        ])
+        selections = {row["title"]: (row["selections"], row["remaining"]) for row in data["subjects"]}
+        self.assertEqual(selections, {"subject_0": (2, 0), "subject_1": (0, 2)})
+        self.assertEqual(data["versions"], {"uploaded": 2, "groups": 1})
+        self.assertEqual(data["submissions"], {"submitted": 1, "groups": 1})
+        print("-----课程统计测试结束-----")
+
+    def test_query_count_is_constant(self):
+        """测试查询数量不随小组数增长"""
+        self.create_group(self.students[:2])
+        with CaptureQueriesContext(connection) as small:
+            self.get_stats()
+        cache.delete(cache_key(self.course.id, stats_version(self.course.id)))
+        for i in range(2, MAX_STUDENTS, 2):
+            self.create_group(self.students[i:i + 2])
+        with CaptureQueriesContext(connection) as large:
+            self.get_stats()
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_stats_are_cached(self):
+        """测试命中缓存时不再执行统计查询"""
+        self.get_stats()
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_stats()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in context.captured_queries))
+    # endregion
+
+    # region 缓存失效测试
+    def test_invalidated_by_group_changes(self):
+        """测试小组与成员变化后缓存失效"""
+        self.assertEqual(self.get_stats().data["data"]["groups"]["total"], 0)
+        group = self.create_group(self.students[:1])
+        data = self.get_stats().data["data"]
+        self.assertEqual(data["groups"]["total"], 1)
+        self.assertEqual(data["students"]["ungrouped"], MAX_STUDENTS - 1)
+        group.students.add(self.students[1])
+        self.assertEqual(self.get_stats().data["data"]["students"]["ungrouped"], MAX_STUDENTS - 2)
+
+    def test_invalidated_by_enrollment_changes(self):
+        """测试加入与退出课程后缓存失效"""
+        self.assertEqual(self.get_stats().data["data"]["students"]["enrolled"], MAX_STUDENTS)
+        self.client.post(
+            f"{reverse('course-list')}{self.course.id}/remove_students/",
+            data={"student_user_ids": [self.students[0].user_id]},
+            format="json",
+            headers={"Authorization": f"Bearer {self.teacher_token}"}
+        )
+        self.assertEqual(self.get_stats().data["data"]["students"]["enrolled"], MAX_STUDENTS - 1)
+        self.client.post(
+            reverse("course-join"),
+            data={"course_code": self.course.course_code},
+            headers={"Authorization": f"Bearer {self.student_token}"}
+        )
+        self.assertEqual(self.get_stats().data["data"]["students"]["enrolled"], MAX_STUDENTS)
+
+    def test_invalidated_by_selection_and_submission(self):
+        """测试选题与提交变化后缓存失效"""
+        group = self.create_group(self.students[:2])
+        course_subject = CourseSubject.objects.create(
+            course=self.course, subject_type="PRIVATE", private_subject=self.subjects[0]
+        )
+        self.assertEqual(self.get_stats().data["data"]["subjects"][0]["selections"], 0)
+        GroupSubject.objects.create(group=group, course_subject=course_subject)
+        self.assertEqual(self.get_stats().data["data"]["subjects"][0]["selections"], 1)
+        version = GroupCodeVersion.objects.create(group=group, version="v1", zip_file="v1.zip")
+        GroupSubmission.objects.create(group=group, code_version=version, is_submitted=True)
+        self.assertEqual(self.get_stats().data["data"]["submissions"]["submitted"], 1)
+
+    def test_version_bumped_after_commit(self):
+        """测试写入事务中不更新版本号行，提交后版本号才加一"""
+        before = stats_version(self.course.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                self.create_group(self.students[:2])
+            table = CourseStatsVersion._meta.db_table
+            self.assertFalse([q for q in context.captured_queries if table in q["sql"] and not q["sql"].startswith("SELECT")])
+            self.assertEqual(stats_version(self.course.id), before)
+        self.assertGreater(stats_version(self.course.id), before)
+
+    def test_invalidated_by_version_from_other_process(self):
+        """测试其他进程只能修改数据库中的版本号，本进程的缓存不会被清除，也不再使用旧缓存"""
+        self.assertEqual(self.get_stats().data["data"]["groups"]["total"], 0)
+        # 批量创建不触发信号，缓存仍是旧数据
+        Group.objects.bulk_create([Group(course=self.course, name="bulk")])
+        self.assertEqual(self.get_stats().data["data"]["groups"]["total"], 0)
+        old_key = cache_key(self.course.id, stats_version(self.course.id))
+        # 其他进程提交后执行的版本号加一
+        bump_stats_versions([str(self.course.id)])
+        self.assertEqual(self.get_stats().data["data"]["groups"]["total"], 1)
+        self.assertIsNotNone(cache.get(old_key))
+    # endregion
+
+    # region 异常测试
+    def test_stats_with_student(self):
+        """测试学生无法查看课程统计"""
+        response = self.get_stats(token=self.student_token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_with_other_teacher(self):
+        """测试其他教师无法查看课程统计"""
+        response = self.get_stats(token=self.teacher2_token)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    # endregion
@@ -0,0 +1,131 @@
+from rest_framework.test import APITestCase
+from course.models import Course
+from course.middleware import CourseStatusSyncMiddleware
+from accounts.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from io import StringIO
+import datetime
+
+
+class CourseStatusSyncTestCase(APITestCase):
+    """课程状态批量同步测试"""
+
+    # region 测试准备用户数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.url = reverse("course-list")
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        # 标记今天已同步，避免中间件干扰只读测试
+        cache.clear()
+        cache.add(self.sync_cache_key(), True)
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+
+    def sync_cache_key(self):
+        """获取今天的同步缓存键"""
+        return f"{CourseStatusSyncMiddleware.cache_key_prefix}:{timezone.now().date().isoformat()}"
+
+    def create_course(self, name, start_delta, end_delta):
+        """按相对今天的天数创建课程"""
+        today = timezone.now().date()
+        return Course.objects.create(
+            name=name,
+            teacher=self.teacher,
+            course_code=name[-6:].upper(),
+            start_date=today + datetime.timedelta(days=start_delta),
+            end_date=today + datetime.timedelta(days=end_delta),
+        )
+
+    def create_stale_courses(self):
+        """创建三种状态的课程，并把数据库中的状态全部改为过期值"""
+        not_started = self.create_course("course_future", 1, 2)
+        in_progress = self.create_course("course_active", -1, 1)
+        completed = self.create_course("course_passed", -2, -1)
+        Course.objects.update(status="not_started")
+        Course.objects.filter(id=not_started.id).update(status="completed")
+        return not_started, in_progress, completed
+    # endregion
+
+    # region 批量同步测试
+    def test_sync_status_updates_in_bulk(self):
+        """测试批量同步能修正所有过期状态"""
+        print("-----正在测试批量同步课程状态-----")
+        not_started, in_progress, completed = self.create_stale_courses()
+        with self.assertNumQueries(3):
+            updated = Course.objects.sync_status()
+        self.assertEqual(updated, 3)
+        self.assertEqual(Course.objects.get(id=not_started.id).status, "not_started")
+        self.assertEqual(Course.objects.get(id=in_progress.id).status, "in_progress")
+        self.assertEqual(Course.objects.get(id=completed.id).status, "completed")
+        # 再次同步不应更新任何行
+        self.assertEqual(Course.objects.sync_status(), 0)
+        print("-----批量同步课程状态测试结束-----")
+
+    def test_sync_course_status_command(self):
+        """测试管理命令同步课程状态"""
+        _, in_progress, _ = self.create_stale_courses()
+        out = StringIO()
+        call_command("sync_course_status", stdout=out)
+        self.assertIn("3", out.getvalue())
+        self.assertEqual(Course.objects.get(id=in_progress.id).status, "in_progress")
+
+    def test_middleware_syncs_once_per_day(self):
+        """测试中间件在日期边界后的首个请求触发同步"""
+        _, in_progress, _ = self.create_stale_courses()
+        cache.delete(self.sync_cache_key())
+        self.client.get(self.url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+        self.assertEqual(Course.objects.get(id=in_progress.id).status, "in_progress")
+        # 同一天内再次过期的状态不会被再次同步
+        Course.objects.filter(id=in_progress.id).update(status="not_started")
+        self.client.get(self.url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+        self.assertEqual(Course.objects.get(id=in_progress.id).status, "not_started")
+    # endregion
+
+    # region 只读列表测试
+    def test_list_does_not_write_status(self):
+        """测试列表接口只读，不再逐行写回状态"""
+        print("-----正在测试列表接口不写回状态-----")
+        _, in_progress, _ = self.create_stale_courses()
+        updated_at = Course.objects.get(id=in_progress.id).updated_at
+        response = self.client.get(self.url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        course = Course.objects.get(id=in_progress.id)
+        self.assertEqual(course.status, "not_started")
+        self.assertEqual(course.updated_at, updated_at)
+        # 当前状态仍然按日期实时计算
+        result = next(r for r in response.data["data"]["results"] if r["id"] == str(in_progress.id))
+        self.assertEqual(result["current_status"], "in_progress")
+        print("-----列表接口不写回状态测试结束-----")
+
+    def test_status_filter_uses_dates(self):
+        """测试状态过滤按日期计算，存储状态过期时仍然正确"""
+        not_started, in_progress, completed = self.create_stale_courses()
+        for status_, course in [("not_started", not_started), ("in_progress", in_progress), ("completed", completed)]:
+            response = self.client.get(
+                f"{self.url}?status={status_}",
+                headers={"Authorization": f"Bearer {self.teacher_token}"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["data"]["count"], 1)
+            self.assertEqual(response.data["data"]["results"][0]["id"], str(course.id))
+    # endregion
@@ -0,0 +1,239 @@
+from rest_framework.test import APITestCase
+from course.allocation import solve
+from course.models import Course, Group, CourseSubject, GroupSubject, GroupSubjectPreference
+from subject.models import Subject
+from accounts.models import User
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import datetime
+
+MAX_GROUPS = 12
+MAX_SUBJECTS = 4
+
+
+class AllocationSolverTestCase(SimpleTestCase):
+    """志愿分配算法测试"""
+
+    def test_lottery_order_and_capacity(self):
+        """测试按抽签顺序取得最靠前且有名额的志愿"""
+        capacity = {"a": 1, "b": 1, "c": 5}
+        preferences = {1: ["a", "b"], 2: ["a", "b"], 3: ["a", "b"], 4: []}
+        assignment, remaining = solve(capacity, preferences, [2, 1, 3, 4])
+        self.assertEqual(assignment, {2: ("a", 1), 1: ("b", 2)})
+        self.assertEqual(remaining, {"a": 0, "b": 0, "c": 5})
+
+    def test_assign_unmatched(self):
+        """测试志愿落空的小组分到剩余名额最多的课题"""
+        capacity = {"a": 1, "b": 2, "c": 1}
+        preferences = {1: ["a"], 2: ["a"], 3: ["a"]}
+        assignment, remaining = solve(capacity, preferences, [1, 2, 3], assign_unmatched=True)
+        self.assertEqual(assignment[1], ("a", 1))
+        self.assertEqual(assignment[2], ("b", None))
+        self.assertEqual(assignment[3][1], None)
+        self.assertEqual(sum(remaining.values()), 1)
+
+
+class SubjectAllocationTestCase(APITestCase):
+    """课题志愿提交与批量分配测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f"student{i}@example.com",
+                password="student123",
+                user_id=f"student{i:03d}",
+                name=f"student{i}",
+                school="student school",
+                role="STUDENT"
+            ) for i in range(1, MAX_GROUPS + 1)
+        ]
+        cls.subjects = [
+            Subject.objects.create(
+                title=f"subject_{i}",
+                description="subject description",
+                creator=cls.teacher,
+                languages=["PYTHON"],
+                status="APPROVED"
+            ) for i in range(MAX_SUBJECTS)
+        ]
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        Course.objects.all().delete()
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            course_code="ALLOC1",
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            max_subject_selections=3,
+            subject_selection_mode="preference",
+        )
+        self.course.students.add(*self.students)
+        self.course_subjects = [
+            CourseSubject.objects.create(course=self.course, subject_type="PRIVATE", private_subject=subject)
+            for subject in self.subjects
+        ]
+        self.groups = []
+        for student in self.students:
+            group = Group.objects.create(course=self.course, creator=student)
+            group.students.add(student)
+            self.groups.append(group)
+        self.teacher_token = self.login(self.teacher.email, "teacher123")
+        self.student_token = self.login(self.students[0].email, "student123")
+
+    def login(self, email, password):
+        return self.client.post(reverse("login"), {"email": email, "password": password}).data["data"]["access"]
+
+    def submit_preferences(self, group, course_subjects, token=None):
+        """提交小组志愿"""
+        return self.client.put(
+            f"{reverse('group-list')}{group.id}/preferences/",
+            data={"course_subject_ids": [str(cs.id) for cs in course_subjects]},
+            format="json",
+            headers={"Authorization": f"Bearer {token or self.student_token}"}
+        )
+
+    def allocate(self, data=None, token=None):
+        """触发批量分配"""
+        return self.client.post(
+            f"{reverse('course-list')}{self.course.id}/allocate_subjects/",
+            data=data or {},
+            format="json",
+            headers={"Authorization": f"Bearer {token or self.teacher_token}"}
+        )
+
+    def set_preferences(self, ranked):
+        """直接写入所有小组相同的志愿"""
+        GroupSubjectPreference.objects.bulk_create([
+            GroupSubjectPreference(group=group, course_subject=course_subject, rank=rank)
+            for group in self.groups
+            for rank, course_subject in enumerate(ranked, 1)
+        ])
+    # endregion
+
+    # region 志愿提交测试
+    def test_submit_preferences(self):
+        """测试组长提交并查看志愿"""
+        print("-----正在测试提交志愿-----")
+        ranked = [self.course_subjects[2], self.course_subjects[0]]
+        response = self.submit_preferences(self.groups[0], ranked)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["course_subject"] for row in response.data["data"]], [cs.id for cs in ranked])
+        # 再次提交整体替换
+        self.submit_preferences(self.groups[0], [self.course_subjects[1]])
+        response = self.client.get(
+            f"{reverse('group-list')}{self.groups[0].id}/preferences/",
+            headers={"Authorization": f"Bearer {self.teacher_token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["title"] for row in response.data["data"]], ["subject_1"])
+        print("-----提交志愿测试结束-----")
+
+    def test_submit_preferences_with_foreign_subject(self):
+        """测试志愿包含其他课程的课题"""
+        other = Course.objects.create(
+            name="other", teacher=self.teacher, course_code="ALLOC2",
+            start_date=self.course.start_date, end_date=self.course.end_date
+        )
+        foreign = CourseSubject.objects.create(course=other, subject_type="PRIVATE", private_subject=self.subjects[0])
+        response = self.submit_preferences(self.groups[0], [foreign])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_submit_preferences_after_deadline(self):
+        """测试截止后无法提交志愿"""
+        Course.objects.filter(id=self.course.id).update(preference_deadline=timezone.now() - datetime.timedelta(hours=1))
+        response = self.submit_preferences(self.groups[0], self.course_subjects[:1])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("志愿提交已截止", response.data["message"])
+
+    def test_student_cannot_select_directly(self):
+        """测试志愿分配模式下学生不能直接选题"""
+        response = self.client.post(
+            f"{reverse('group-list')}{self.groups[0].id}/select_subject/",
+            data={"course_subject_id": str(self.course_subjects[0].id)},
+            headers={"Authorization": f"Bearer {self.student_token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("本课程采用志愿分配", response.data["message"])
+    # endregion
+
+    # region 分配测试
+    def test_allocate(self):
+        """测试按志愿分配且不超过名额"""
+        self.set_preferences(self.course_subjects)
+        response = self.allocate({"seed": 11})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "课题分配成功")
+        summary = response.data["data"]["summary"]
+        self.assertEqual((summary["assigned"], summary["first_choice"]), (MAX_GROUPS, 3))
+        self.assertEqual([row["groups"] for row in summary["rank_distribution"]], [3, 3, 3, 3])
+        counts = [GroupSubject.objects.filter(course_subject=cs).count() for cs in self.course_subjects]
+        self.assertEqual(counts, [3, 3, 3, 3])
+
+    def test_allocate_dry_run_and_seed(self):
+        """测试预览不写入，且相同种子结果一致"""
+        self.set_preferences(self.course_subjects[:1])
+        preview = self.allocate({"seed": 5, "dry_run": True}).data["data"]
+        self.assertFalse(GroupSubject.objects.exists())
+        result = self.allocate({"seed": 5}).data["data"]
+        self.assertEqual(preview["assignments"], result["assignments"])
+        self.assertEqual(len(result["unassigned"]), MAX_GROUPS - 3)
+
+    def test_allocate_skips_groups_with_subject(self):
+        """测试已选题的小组不参与分配，且已占用的名额被扣除"""
+        GroupSubject.objects.create(group=self.groups[0], course_subject=self.course_subjects[0])
+        self.set_preferences(self.course_subjects[:1])
+        data = self.allocate({"seed": 1}).data["data"]
+        self.assertEqual(data["summary"]["groups"], MAX_GROUPS - 1)
+        self.assertEqual(data["summary"]["assigned"], 2)
+        self.assertEqual(GroupSubject.objects.filter(course_subject=self.course_subjects[0]).count(), 3)
+
+    def test_allocate_query_count_is_constant(self):
+        """测试查询数量不随小组数增长"""
+        with CaptureQueriesContext(connection) as small:
+            self.allocate({"seed": 1, "dry_run": True})
+        self.set_preferences(self.course_subjects)
+        with CaptureQueriesContext(connection) as large:
+            self.allocate({"seed": 1, "dry_run": True})
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_allocate_locks_groups_before_subjects(self):
+        """测试分配先按主键顺序锁住小组行，再锁课题行，与逐个选题的加锁顺序一致"""
+        self.set_preferences(self.course_subjects)
+        with CaptureQueriesContext(connection) as context:
+            self.allocate({"seed": 1})
+        locks = [q["sql"] for q in context.captured_queries if "FOR UPDATE" in q["sql"]]
+        tables = [next(t for t in ("course_course", "course_group", "course_coursesubject") if f'FROM "{t}"' in sql) for sql in locks]
+        self.assertEqual(tables, ["course_course", "course_group", "course_coursesubject"])
+        self.assertIn('ORDER BY "course_group"."id" ASC', locks[1])
+
+    def test_allocate_with_student(self):
+        """测试学生无法触发分配"""
+        response = self.allocate(token=self.student_token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_allocate_in_first_come_mode(self):
+        """测试先到先得模式下无法触发分配"""
+        Course.objects.filter(id=self.course.id).update(subject_selection_mode="first_come")
+        response = self.allocate()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    # endregion
@@ -0,0 +1,254 @@
+import datetime
+import io
+import threading
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from accounts.models import User
+from course.allocation import allocate_subjects
+from course.models import Course, CourseSubject, Group, GroupSubject, GroupSubjectPreference
+from subject.models import Subject
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+MAX_GROUPS = 40
+MAX_THREADS = 16
+MAX_SELECTIONS = 3
+
+
+def create_students(count):
+    """批量创建学生，跳过逐个密码哈希"""
+    return User.objects.bulk_create([
+        User(
+            email=f"student{i}@example.com",
+            user_id=f"student{i:03d}",
+            name=f"student{i}",
+            school="student school",
+            role="STUDENT",
+            password="!"
+        ) for i in range(1, count + 1)
+    ])
+
+
+class SubjectSelectionConcurrencyTestCase(TransactionTestCase):
+    """课题名额并发测试（线程使用各自的数据库连接，需要真实提交的事务）"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        print("\n-----开始准备测试数据-----")
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        self.students = create_students(MAX_GROUPS)
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            max_subject_selections=MAX_SELECTIONS,
+        )
+        self.course.students.add(*self.students)
+        subject = Subject.objects.create(
+            title="subject", description="subject description", creator=self.teacher,
+            languages=["PYTHON"], status="APPROVED"
+        )
+        self.course_subject = CourseSubject.objects.create(
+            course=self.course, subject_type="PRIVATE", private_subject=subject
+        )
+        self.groups = []
+        for student in self.students:
+            group = Group.objects.create(course=self.course, creator=student)
+            group.students.add(student)
+            self.groups.append(group)
+        print("-----测试数据准备完成-----\n")
+
+    def test_concurrent_select_last_slots(self):
+        """测试大量小组同时选择同一课题，不超过最大选择次数且计数与记录一致"""
+        print("-----正在测试并发选题-----")
+        codes = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(MAX_THREADS)
+        chunks = [self.groups[i::MAX_THREADS] for i in range(MAX_THREADS)]
+
+        def worker(chunk):
+            barrier.wait()
+            try:
+                for group in chunk:
+                    client = APIClient()
+                    client.force_authenticate(group.creator)
+                    code = client.post(
+                        f"{reverse('group-list')}{group.id}/select_subject/",
+                        {"course_subject_id": str(self.course_subject.id)},
+                        format="json"
+                    ).status_code
+                    with lock:
+                        codes.append(code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(codes.count(status.HTTP_201_CREATED), MAX_SELECTIONS)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), MAX_GROUPS - MAX_SELECTIONS)
+        self.assertEqual(GroupSubject.objects.count(), MAX_SELECTIONS)
+        self.course_subject.refresh_from_db()
+        self.assertEqual(self.course_subject.selected_count, MAX_SELECTIONS)
+        print("-----并发选题测试结束-----")
+
+
+class SubjectSelectionCounterTestCase(APITestCase):
+    """课题已选次数计数测试"""
+
+    # region 测试准备数据
+    @classmethod
+    def setUpTestData(cls):
+        """类级别的测试数据准备，只执行一次"""
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        cls.students = create_students(6)
+        cls.subjects = [
+            Subject.objects.create(
+                title=f"subject_{i}",
+                description="subject description",
+                creator=cls.teacher,
+                languages=["PYTHON"],
+                status="APPROVED"
+            ) for i in range(6)
+        ]
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        today = timezone.now().date()
+        self.course = Course.objects.create(
+            name="course",
+            teacher=self.teacher,
+            start_date=today + datetime.timedelta(days=1),
+            end_date=today + datetime.timedelta(days=2),
+            max_subject_selections=2,
+        )
+        self.course.students.add(*self.students)
+        self.course_subjects = [
+            CourseSubject.objects.create(course=self.course, subject_type="PRIVATE", private_subject=subject)
+            for subject in self.subjects[:2]
+        ]
+        self.groups = []
+        for student in self.students[:3]:
+            group = Group.objects.create(course=self.course, creator=student)
+            group.students.add(student)
+            self.groups.append(group)
+        self.client.force_authenticate(self.teacher)
+
+    def select(self, group, course_subject):
+        return self.client.post(
+            f"{reverse('group-list')}{group.id}/select_subject/",
+            {"course_subject_id": str(course_subject.id)},
+            format="json"
+        )
+
+    def selected_count(self, course_subject):
+        return CourseSubject.objects.values_list("selected_count", flat=True).get(pk=course_subject.pk)
+
+    def subjects_list(self):
+        return self.client.get(f"{reverse('course-list')}{self.course.id}/subjects_list/")
+    # endregion
+
+    # region 计数维护测试
+    def test_select_and_unselect(self):
+        """测试选题占用名额、退选归还名额，名额用完后拒绝选题"""
+        first = self.course_subjects[0]
+        self.assertEqual(self.select(self.groups[0], first).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.select(self.groups[1], first).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.selected_count(first), 2)
+        response = self.select(self.groups[2], first)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("该课题已被选择超过最大次数", response.data["message"])
+        response = self.select(self.groups[0], self.course_subjects[1])
+        self.assertIn("小组已经选择了课题", response.data["message"])
+        self.assertEqual(self.selected_count(self.course_subjects[1]), 0)
+
+        response = self.client.delete(f"{reverse('group-list')}{self.groups[0].id}/unselect_subject/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.selected_count(first), 1)
+        self.assertEqual(self.select(self.groups[2], first).status_code, status.HTTP_201_CREATED)
+
+    def test_select_does_not_count_selections(self):
+        """测试选题时不再统计选题记录"""
+        with CaptureQueriesContext(connection) as context:
+            self.select(self.groups[0], self.course_subjects[0])
+        self.assertFalse(any("COUNT(" in q["sql"] for q in context.captured_queries))
+
+    def test_cascade_delete_releases_slot(self):
+        """测试删除小组时级联删除的选题归还名额"""
+        self.select(self.groups[0], self.course_subjects[0])
+        self.groups[0].delete()
+        self.assertEqual(self.selected_count(self.course_subjects[0]), 0)
+
+    def test_allocation_updates_counter(self):
+        """测试志愿分配写入选题后同步增加计数"""
+        Course.objects.filter(pk=self.course.pk).update(subject_selection_mode="preference")
+        for group in self.groups:
+            GroupSubjectPreference.objects.create(group=group, course_subject=self.course_subjects[0], rank=1)
+        self.select(self.groups[0], self.course_subjects[0])
+        report = allocate_subjects(Course.objects.get(pk=self.course.pk), seed=1)
+        self.assertEqual(report["summary"]["assigned"], 1)
+        self.assertEqual(self.selected_count(self.course_subjects[0]), 2)
+    # endregion
+
+    # region 课题列表测试
+    def test_subjects_list_remaining_slots(self):
+        """测试课题列表返回已选次数与剩余名额"""
+        self.select(self.groups[0], self.course_subjects[0])
+        response = self.subjects_list()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slots = {item["id"]: (item["selected_count"], item["remaining_slots"]) for item in response.data["data"]["results"]}
+        self.assertEqual(slots[str(self.course_subjects[0].id)], (1, 1))
+        self.assertEqual(slots[str(self.course_subjects[1].id)], (0, 2))
+
+    def test_subjects_list_query_count(self):
+        """测试课题列表的查询数量与课题数无关"""
+        with CaptureQueriesContext(connection) as few:
+            self.subjects_list()
+        for subject in self.subjects[2:]:
+            CourseSubject.objects.create(course=self.course, subject_type="PRIVATE", private_subject=subject)
+        with CaptureQueriesContext(connection) as many:
+            response = self.subjects_list()
+        self.assertEqual(len(response.data["data"]["results"]), len(self.subjects))
+        self.assertEqual(len(many), len(few))
+    # endregion
+
+    # region 计数修复测试
+    def test_reconcile_command(self):
+        """测试修复命令按选题记录重算漂移的计数"""
+        self.select(self.groups[0], self.course_subjects[0])
+        CourseSubject.objects.filter(pk=self.course_subjects[0].pk).update(selected_count=5)
+        CourseSubject.objects.filter(pk=self.course_subjects[1].pk).update(selected_count=1)
+        out = io.StringIO()
+        call_command("reconcile_subject_selections", "--course", self.course.course_code, stdout=out)
+        self.assertIn("已修复 2 个课题", out.getvalue())
+        self.assertEqual(self.selected_count(self.course_subjects[0]), 1)
+        self.assertEqual(self.selected_count(self.course_subjects[1]), 0)
+        out = io.StringIO()
+        call_command("reconcile_subject_selections", stdout=out)
+        self.assertIn("已修复 0 个课题", out.getvalue())
+    # endregion
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .apis.views import CourseViewSet, GroupViewSet, GroupCodeVersionViewSet
+from .apis.views import CourseViewSet, GroupViewSet, GroupCodeVersionViewSet, GroupCodeFileViewSet
 
 router = DefaultRouter()
 router.register(r'courses', CourseViewSet)
 router.register(r'groups', GroupViewSet)
 router.register(r'groups/(?P<group_pk>[^/.]+)/versions', GroupCodeVersionViewSet, basename='group-version')
+router.register(r'groups/(?P<group_pk>[^/.]+)/versions/(?P<version_pk>[^/.]+)/files', GroupCodeFileViewSet, basename='group-version-file')
 urlpatterns = [
     path('api/v1/', include(router.urls)),
 ] 
\ No newline at end of file
@@ -6,9 +6,11 @@ echo "waiting for database..."
 until PGPASSWORD=$DB_PASSWORD psql -h "$DB_HOST" -U "$DB_USER" -d "$DB_NAME" -c '\q'; do
   sleep 2
 done
-# database migrate
-python manage.py makemigrations
-python manage.py migrate
+# database migrate (worker containers set RUN_MIGRATIONS=0 and leave it to backend)
+if [ "${RUN_MIGRATIONS:-1}" = "1" ]; then
+  python manage.py makemigrations
+  python manage.py migrate
+fi
 
 # execute COMMAND
 exec "$@"
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from accounts.models import User
 from CodeCollab import settings
 from subject.models import Subject, PublicSubject
+from subject.search import highlight_subject, search_terms
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -21,18 +22,23 @@ class SubjectSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     public_status_display = serializers.CharField(source='get_public_status_display', read_only=True)
     description_file_url = serializers.SerializerMethodField(read_only=True)
+    highlight = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Subject
         fields = [
             'id', 'title', 'description', 'description_file', 'description_file_url', 'creator',
             'languages', 'status', 'status_display', 'public_status', 'public_status_display', 'reviewer',
-            'review_comments', 'created_at', 'updated_at'
+            'review_comments', 'created_at', 'updated_at', 'highlight'
         ]
         read_only_fields = [
             'id', 'status', 'status_display', 'public_status', 'public_status_display', 'reviewer',
             'review_comments', 'created_at', 'updated_at'
         ]
+
+    def get_highlight(self, obj):
+        """搜索时返回标题与描述中匹配的高亮片段，否则为 null"""
+        return highlight_subject(obj, search_terms(self.context.get('request')))
         
     def get_description_file_url(self, obj):
         """动态生成可访问的文件URL"""
@@ -147,11 +153,16 @@ class SubjectPublicReviewSerializer(serializers.ModelSerializer):
 class PublicSubjectSerializer(serializers.ModelSerializer):
     creator = UserSerializer(read_only=True)
     description_file_url = serializers.SerializerMethodField(read_only=True)
+    highlight = serializers.SerializerMethodField(read_only=True)
     class Meta:
         model = PublicSubject
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('original_subject', 'creator', 'version') 
 
+    def get_highlight(self, obj):
+        """搜索时返回标题与描述中匹配的高亮片段，否则为 null"""
+        return highlight_subject(obj, search_terms(self.context.get('request')))
+
     def get_description_file_url(self, obj):
         """获取文件的完整URL"""
         if obj.description_file:
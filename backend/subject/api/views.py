@@ -12,7 +12,8 @@ from subject.api.serializers import (
 )
 from CodeCollab.api.decorators import standard_response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.pagination import PageNumberPagination
+from CodeCollab.api.pagination import CustomPagination
+from subject.search import SubjectSearchFilter
 from rest_framework import serializers
 from django.core.files.base import ContentFile
 import os
@@ -20,14 +21,6 @@ from django_filters import FilterSet, CharFilter
 
 logger = logging.getLogger(__name__)
 
-# region 分页
-class CustomPagination(PageNumberPagination):
-    """自定义分页类"""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-# endregion
-
 class SubjectFilter(FilterSet):
     languages = CharFilter(method='filter_languages', required=False)
 
@@ -60,11 +53,11 @@ class SubjectViewSet(viewsets.ModelViewSet):
     # region 配置
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SubjectSearchFilter, filters.OrderingFilter]
     filterset_class = SubjectFilter
-    search_fields = ['title', 'description']
     search_param = 'search'  # 指定搜索参数名为 search
-    ordering_fields = ['created_at', 'updated_at']
+    # rank 为搜索相关度，?ordering=-rank 按相关度从高到低
+    ordering_fields = ['created_at', 'updated_at', 'rank']
     ordering = ['-created_at']
     pagination_class = CustomPagination
     # endregion
@@ -104,7 +97,8 @@ class SubjectViewSet(viewsets.ModelViewSet):
     # region 查询集
     def get_queryset(self):
         """根据用户角色过滤课题"""
-        queryset = Subject.objects.all()
+        # 检索向量只在数据库中使用，不读取
+        queryset = Subject.objects.defer('search_vector')
         user = self.request.user
         if user.is_anonymous:
             return queryset.none()
@@ -265,17 +259,16 @@ class PublicSubjectViewSet(viewsets.ReadOnlyModelViewSet):
     """公开课题视图集"""
     queryset = PublicSubject.objects.all()
     serializer_class = PublicSubjectSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SubjectSearchFilter, filters.OrderingFilter]
     filterset_class = PublicSubjectFilter
-    search_fields = ['title', 'description']
-    ordering_fields = ['created_at']
+    ordering_fields = ['created_at', 'rank']
     ordering = ['-created_at']
     pagination_class = CustomPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """所有用户都可以查看公开的课题"""
-        return PublicSubject.objects.all()
+        return PublicSubject.objects.defer('search_vector')
     
     @standard_response("获取列表成功")
     def list(self, request, *args, **kwargs):
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subject', '0007_alter_publicsubject_languages_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='publicsubject',
+            index=models.Index(fields=['created_at', 'id'], name='public_subject_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['created_at', 'id'], name='subject_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['creator', 'created_at', 'id'], name='subject_creator_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:08
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+# 部分匹配（ILIKE）使用的三元组索引；数据库没有提供 pg_trgm 扩展时跳过，搜索结果不变，只是不走索引
+TRIGRAM_INDEXES = [
+    ('subject_title_trgm_idx', 'subject_subject', 'title'),
+    ('subject_description_trgm_idx', 'subject_subject', 'description'),
+    ('public_subject_title_trgm_idx', 'subject_publicsubject', 'title'),
+    ('public_subject_description_trgm_idx', 'subject_publicsubject', 'description'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subject', '0008_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicsubject',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField(), verbose_name='全文检索向量'),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField(), verbose_name='全文检索向量'),
+        ),
+        migrations.AddIndex(
+            model_name='publicsubject',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='public_subject_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicsubject',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['languages'], name='public_subject_languages_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='subject_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['languages'], name='subject_languages_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
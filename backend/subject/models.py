@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from accounts.models import User
+from .search import search_vector
 from .validators import validate_pdf_file, validate_file_size
 
 # Create your models here.
@@ -89,11 +92,21 @@ class Subject(models.Model):
         blank=True
     )
     public_review_comments = models.TextField(verbose_name="公开审核意见", blank=True, null=True)
+    # 标题与描述的全文检索向量，由数据库生成；标题与描述的三元组索引见迁移 0009
+    search_vector = models.GeneratedField(
+        expression=search_vector(), output_field=SearchVectorField(), db_persist=True, verbose_name="全文检索向量"
+    )
 
     class Meta:
         verbose_name = "课题"
         verbose_name_plural = "课题"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='subject_created_id_idx'),
+            models.Index(fields=['creator', 'created_at', 'id'], name='subject_creator_created_id_idx'),
+            GinIndex(fields=['search_vector'], name='subject_search_vector_idx'),
+            GinIndex(fields=['languages'], name='subject_languages_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -140,11 +153,19 @@ class PublicSubject(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="公开时间")
     version = models.PositiveIntegerField(default=1, verbose_name="版本号")
+    search_vector = models.GeneratedField(
+        expression=search_vector(), output_field=SearchVectorField(), db_persist=True, verbose_name="全文检索向量"
+    )
 
     class Meta:
         verbose_name = "公开课题"
         verbose_name_plural = "公开课题"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='public_subject_created_id_idx'),
+            GinIndex(fields=['search_vector'], name='public_subject_search_idx'),
+            GinIndex(fields=['languages'], name='public_subject_languages_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} (公开版本 v{self.version})"
@@ -0,0 +1,95 @@
+"""
+课题与公开课题的检索
+
+- 整词匹配：标题（权重 A）与描述（权重 B）的 tsvector 存在数据库生成列 search_vector 中，
+  以 GIN 索引查询，英文按词干匹配（sorting 可以匹配 sort）
+- 部分匹配：词出现在标题或描述中（ILIKE），由 pg_trgm 的三元组 GIN 索引加速；
+  少于 3 个字符的词无法使用三元组索引。中文没有分词，整句是一个词，主要依靠部分匹配
+- 每个搜索词都要以整词或部分匹配的方式命中，才是结果；结果注解 rank，可以用 ?ordering=-rank 按相关度排序，
+  相关度以全部搜索词组成的查询计算
+- 高亮片段在 Python 中对当前页的结果生成，先转义 HTML 再用 <mark> 标出匹配的词
+"""
+import html
+import re
+from functools import reduce
+from operator import and_
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import Case, F, FloatField, Q, Value, When
+from rest_framework import filters
+
+SEARCH_CONFIG = 'english'
+# 所有词都出现在标题中时额外加的相关度，高于通常的 ts_rank 值
+TITLE_MATCH_BOOST = 1.0
+SNIPPET_LENGTH = 120
+
+
+def search_vector():
+    """标题权重 A、描述权重 B 的 tsvector 表达式，作为 search_vector 生成列"""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+class SubjectSearchFilter(filters.SearchFilter):
+    """以全文检索与三元组索引代替逐字段的 ILIKE 搜索，结果注解相关度 rank"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            # 没有搜索词时 rank 为常量，?ordering=-rank 仍然有效
+            return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+
+        # 逐词匹配后取交集，避免一个词整词命中、另一个词完全没有出现的结果
+        condition = reduce(and_, [
+            Q(search_vector=SearchQuery(term, config=SEARCH_CONFIG))
+            | Q(title__icontains=term) | Q(description__icontains=term)
+            for term in terms
+        ])
+        in_title = reduce(and_, [Q(title__icontains=term) for term in terms])
+        query = SearchQuery(' '.join(terms), config=SEARCH_CONFIG)
+        return queryset.filter(condition).annotate(
+            rank=SearchRank(F('search_vector'), query) + Case(
+                When(in_title, then=Value(TITLE_MATCH_BOOST)), default=Value(0.0), output_field=FloatField(),
+            ),
+        )
+
+
+def search_terms(request):
+    """请求中的搜索词，与 SubjectSearchFilter 的解析方式一致"""
+    if request is None:
+        return []
+    return SubjectSearchFilter().get_search_terms(request)
+
+
+def highlight(text, terms, length=SNIPPET_LENGTH):
+    """
+    返回 text 中第一处匹配附近最多 length 个字符的片段，HTML 已转义，匹配的词以 <mark> 包围
+    text 中没有任何搜索词时返回 None
+    """
+    if not text or not terms:
+        return None
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    match = pattern.search(text)
+    if match is None:
+        return None
+    start = max(0, min(match.start() - length // 3, len(text) - length))
+    end = min(len(text), start + length)
+    snippet = text[start:end]
+    parts, position = [], 0
+    for found in pattern.finditer(snippet):
+        parts.append(html.escape(snippet[position:found.start()]))
+        parts.append(f'<mark>{html.escape(found.group())}</mark>')
+        position = found.end()
+    parts.append(html.escape(snippet[position:]))
+    return ('…' if start > 0 else '') + ''.join(parts) + ('…' if end < len(text) else '')
+
+
+def highlight_subject(subject, terms):
+    """课题标题与描述的高亮片段，没有搜索词时返回 None"""
+    if not terms:
+        return None
+    return {
+        'title': highlight(subject.title, terms, length=len(subject.title)),
+        'description': highlight(subject.description, terms),
+    }
@@ -0,0 +1,78 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from accounts.models import User
+from subject.models import Subject, PublicSubject
+
+MAX_SUBJECTS = 23
+
+
+class SubjectCursorPaginationTestCase(APITestCase):
+    """课题与公开课题键集分页测试"""
+
+    # region 测试数据准备
+    @classmethod
+    def setUpTestData(cls):
+        print("-----正在准备测试数据-----\n")
+        cls.teacher = User.objects.create_user(
+            email="teacher@example.com",
+            password="teacher123",
+            user_id="teacher001",
+            name="teacher",
+            school="teacher school",
+            role="TEACHER"
+        )
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        Subject.objects.all().delete()
+        PublicSubject.objects.all().delete()
+        self.teacher_token = self.client.post(
+            reverse("login"),
+            {"email": self.teacher.email, "password": "teacher123"}
+        ).data["data"]["access"]
+
+    def create_subjects(self):
+        """创建课题及对应的公开课题"""
+        for i in range(MAX_SUBJECTS):
+            subject = Subject.objects.create(
+                title=f"test_title_{i}",
+                description=f"test_description_{i}",
+                creator=self.teacher,
+                languages=["PYTHON"],
+                status="APPROVED"
+            )
+            PublicSubject.objects.create(
+                original_subject=subject,
+                title=subject.title,
+                description=subject.description,
+                creator=self.teacher,
+                languages=subject.languages
+            )
+
+    def walk(self, url):
+        """沿 next 链接遍历所有页"""
+        ids = []
+        while url:
+            response = self.client.get(url, headers={"Authorization": f"Bearer {self.teacher_token}"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in response.data["data"]["results"])
+            url = response.data["data"]["next"]
+        return ids
+    # endregion
+
+    # region 基础功能测试
+    def test_subject_cursor(self):
+        """测试课题列表键集分页"""
+        self.create_subjects()
+        ids = self.walk(f"{reverse('subject-list')}?pagination=cursor&page_size=10")
+        expected = list(Subject.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_public_subject_cursor(self):
+        """测试公开课题列表键集分页，并可与过滤条件组合"""
+        self.create_subjects()
+        ids = self.walk(f"{reverse('public-subject-list')}?pagination=cursor&page_size=4&languages=PYTHON")
+        expected = list(PublicSubject.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+    # endregion
@@ -0,0 +1,131 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.urls import reverse
+from accounts.models import User
+from subject.models import Subject, PublicSubject
+from subject.search import highlight
+
+
+class SubjectSearchTestCase(APITestCase):
+    """课题全文检索、部分匹配、相关度排序与高亮测试"""
+
+    # region 测试数据准备
+    @classmethod
+    def setUpTestData(cls):
+        print("\n-----开始准备测试数据-----")
+        cls.teacher = User.objects.create(
+            email="teacher@example.com", user_id="teacher001", name="teacher",
+            school="teacher school", role="TEACHER", password="!"
+        )
+        cls.student = User.objects.create(
+            email="student@example.com", user_id="student001", name="student",
+            school="student school", role="STUDENT", password="!"
+        )
+        subjects = [
+            ("Sorting algorithms", "Implement quick sort and merge sort.", ["C", "CPP"]),
+            ("Library system", "A book library with <b>sorting</b> by title.", ["JAVA"]),
+            ("学生管理系统", "实现一个学生信息管理系统，支持增删改查", ["PYTHON"]),
+            ("Chat server", "Socket programming with threads", ["JAVA", "PYTHON"]),
+        ]
+        cls.subjects = {}
+        for title, description, languages in subjects:
+            subject = Subject.objects.create(
+                title=title, description=description, creator=cls.teacher, languages=languages,
+                status="APPROVED", public_status="APPROVED", is_public=True
+            )
+            PublicSubject.objects.create(
+                original_subject=subject, title=title, description=description,
+                creator=cls.teacher, languages=languages
+            )
+            cls.subjects[title] = subject
+        cls.url = reverse("subject-list")
+        cls.public_url = reverse("public-subject-list")
+        print("-----测试数据准备完成-----\n")
+
+    def setUp(self):
+        self.client.force_authenticate(self.teacher)
+
+    def search(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["data"]["results"]
+    # endregion
+
+    # region 匹配测试
+    def test_full_text_matches_word_forms(self):
+        """测试整词匹配按词干，sort 可以匹配 sorting"""
+        titles = {item["title"] for item in self.search(search="sort")}
+        self.assertEqual(titles, {"Sorting algorithms", "Library system"})
+        titles = {item["title"] for item in self.search(search="algorithm")}
+        self.assertEqual(titles, {"Sorting algorithms"})
+
+    def test_partial_match(self):
+        """测试部分匹配，包括没有分词的中文"""
+        titles = {item["title"] for item in self.search(search="管理")}
+        self.assertEqual(titles, {"学生管理系统"})
+        titles = {item["title"] for item in self.search(search="ocke")}
+        self.assertEqual(titles, {"Chat server"})
+        # 多个词都要匹配，每个词可以分别以整词或部分匹配的方式命中
+        self.assertEqual(self.search(search="学生 socket"), [])
+        self.assertEqual(self.search(search="sort 管理"), [])
+        titles = {item["title"] for item in self.search(search="algorithm merg")}
+        self.assertEqual(titles, {"Sorting algorithms"})
+
+    def test_rank_ordering(self):
+        """测试按相关度排序，标题匹配排在前面；没有搜索词时也可以使用"""
+        results = self.search(search="sorting", ordering="-rank")
+        self.assertEqual([item["title"] for item in results], ["Sorting algorithms", "Library system"])
+        self.assertEqual(len(self.search(ordering="-rank")), len(self.subjects))
+
+    def test_languages_filter(self):
+        """测试适用语言过滤与搜索组合"""
+        titles = {item["title"] for item in self.search(languages="JAVA,PYTHON")}
+        self.assertEqual(titles, {"Chat server"})
+        titles = {item["title"] for item in self.search(languages="JAVA", search="sort")}
+        self.assertEqual(titles, {"Library system"})
+
+    def test_public_subjects(self):
+        """测试公开课题的搜索、排序与高亮"""
+        self.client.force_authenticate(self.student)
+        results = self.search(self.public_url, search="学生", ordering="-rank")
+        self.assertEqual([item["title"] for item in results], ["学生管理系统"])
+        self.assertEqual(results[0]["highlight"]["title"], "<mark>学生</mark>管理系统")
+        self.assertNotIn("search_vector", results[0])
+    # endregion
+
+    # region 高亮测试
+    def test_highlight(self):
+        """测试高亮片段转义 HTML，没有搜索时为 null"""
+        results = self.search(search="sorting")
+        library = next(item for item in results if item["title"] == "Library system")
+        self.assertIsNone(library["highlight"]["title"])
+        self.assertEqual(
+            library["highlight"]["description"], "A book library with &lt;b&gt;<mark>sorting</mark>&lt;/b&gt; by title."
+        )
+        self.assertIsNone(self.search()[0]["highlight"])
+        self.assertNotIn("search_vector", self.search()[0])
+
+    def test_highlight_snippet(self):
+        """测试长文本只返回匹配附近的片段"""
+        text = "a" * 200 + "Target" + "b" * 200
+        snippet = highlight(text, ["target"], length=40)
+        self.assertTrue(snippet.startswith("…") and snippet.endswith("…"))
+        self.assertIn("<mark>Target</mark>", snippet)
+        self.assertEqual(len(snippet.replace("<mark>", "").replace("</mark>", "")), 42)
+        self.assertIsNone(highlight(text, ["missing"]))
+    # endregion
+
+    # region 索引测试
+    def test_indexes(self):
+        """测试检索向量与适用语言的 GIN 索引"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename IN ('subject_subject', 'subject_publicsubject')"
+            )
+            indexes = dict(cursor.fetchall())
+        for name in ("subject_search_vector_idx", "subject_languages_idx", "public_subject_search_idx", "public_subject_languages_idx"):
+            self.assertIn("USING gin", indexes[name])
+        subject = Subject.objects.get(pk=self.subjects["Sorting algorithms"].pk)
+        self.assertIn("'sort':1A", subject.search_vector)
+    # endregion
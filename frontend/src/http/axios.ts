@@ -96,8 +96,8 @@ function createInstance() {
    */
   instance.interceptors.response.use(
     (response) => {
-      // 如果是文件下载，直接返回整个 response
-      if (response.config.responseType === "blob") {
+      // 如果是文件下载或需要读取响应头，直接返回整个 response
+      if (response.config.responseType === "blob" || response.config.rawResponse) {
         return response
       }
       // 其他情况返回 response.data
@@ -1,4 +1,5 @@
-import type { GroupCodeVersion, GroupCodeVersionListResponse, GroupCodeVersionResponse, GroupData } from "./type"
+import type { AxiosResponse } from "axios"
+import type { GroupCodeFileContentResponse, GroupCodeVersionListResponse, GroupCodeVersionResponse, GroupCodeVersionStatusResponse, GroupData } from "./type"
 import { request } from "@/http/axios"
 
 export function getGroupDetail(groupId: string) {
@@ -25,8 +26,9 @@ export function unselectSubject(groupId: string) {
   })
 }
 
+// 上传代码版本，返回 202 与处理状态，ZIP 由后台任务解析
 export function createGroupCodeVersion(groupId: string, data: FormData) {
-  return request<GroupCodeVersion>({
+  return request<GroupCodeVersionStatusResponse>({
     url: `/groups/${groupId}/versions/`,
     method: "POST",
     data,
@@ -50,10 +52,29 @@ export function getGroupCodeVersion(groupId: string, versionId: string) {
   })
 }
 
+// 获取单个文件的内容，etag 为上次响应的 ETag，内容未变化时返回 304
+export function getGroupCodeFile(groupId: string, versionId: string, fileId: string, etag?: string) {
+  return request<AxiosResponse<GroupCodeFileContentResponse>>({
+    url: `/groups/${groupId}/versions/${versionId}/files/${fileId}/`,
+    method: "GET",
+    headers: etag ? { "If-None-Match": etag } : {},
+    rawResponse: true,
+    validateStatus: status => (status >= 200 && status < 300) || status === 304
+  })
+}
+
+// 获取版本的处理状态、进度与失败原因
+export function getGroupCodeVersionStatus(groupId: string, versionId: string) {
+  return request<GroupCodeVersionStatusResponse>({
+    url: `/groups/${groupId}/versions/${versionId}/status/`,
+    method: "GET"
+  })
+}
+
 // 提交代码
 export function submitCode(groupId: string, data: {
   code_version_id: string
-  contributions: string[]
+  contributions: Array<{ student_id: string, contribution: number }>
 }) {
   return request({
     method: "post",
@@ -57,6 +57,7 @@ export interface GroupCodeVersion {
   id: string
   version: string
   description: string
+  status: GroupCodeVersionStatusValue
   total_files: number
   total_size: number
   created_at: string
@@ -64,12 +65,37 @@ export interface GroupCodeVersion {
   files: GroupCodeFile[]
 }
 
+/** 版本详情中的文件清单，不含文件内容 */
 export interface GroupCodeFile {
   id: string
   path: string
-  content: string | null
   size: number
   is_previewable: boolean
+  hash: string | null
+}
+
+/** 单个文件的内容，按需通过文件接口获取 */
+export interface GroupCodeFileContent extends GroupCodeFile {
+  content: string | null
+  total_lines: number | null
+  start_line: number | null
+  end_line: number | null
+  created_at: string
+  updated_at: string
+}
+
+/** 上传后由后台任务解析 ZIP，处理完成为 ready，失败为 failed */
+export type GroupCodeVersionStatusValue = "processing" | "ready" | "failed"
+
+export interface GroupCodeVersionStatus {
+  id: string
+  version: string
+  status: GroupCodeVersionStatusValue
+  processed_files: number
+  total_files: number
+  processed_size: number
+  total_size: number
+  error: string
   created_at: string
   updated_at: string
 }
@@ -81,6 +107,7 @@ export interface GroupCodeVersionList {
   results: Array<{
     id: string
     version: string
+    status: GroupCodeVersionStatusValue
   }>
 }
 
@@ -89,6 +116,16 @@ export interface GroupCodeVersionResponse {
   message: string
 }
 
+export interface GroupCodeFileContentResponse {
+  data: GroupCodeFileContent
+  message: string
+}
+
+export interface GroupCodeVersionStatusResponse {
+  data: GroupCodeVersionStatus
+  message: string
+}
+
 export interface GroupCodeVersionListResponse {
   data: GroupCodeVersionList
   message: string
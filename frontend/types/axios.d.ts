@@ -0,0 +1,13 @@
+import "axios"
+
+export {}
+
+declare module "axios" {
+  interface AxiosRequestConfig {
+    /**
+     * @description 默认 false，设置 true 时响应拦截器返回完整的 response（含状态码与响应头），而不只是 response.data
+     * @description 适合需要读取 ETag 等响应头的请求
+     */
+    rawResponse?: boolean
+  }
+}